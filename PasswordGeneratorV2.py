@@ -2,6 +2,7 @@ import sys
 # import os
 from PySide6.QtWidgets import QApplication
 # from PySide6.QtGui import QIcon
+import instrumentation
 from ui import PasswordGeneratorApp
 
 # def get_icon_path():
@@ -16,6 +17,11 @@ if __name__ == "__main__":
     # Получить абсолютный путь к иконке
     # icon_path = os.path.join(os.path.dirname(__file__), 'app_icon.ico')
     # icon_path = get_icon_path()  
+    # Замеры производительности: PASSGEN_PROFILE=1 или флаг --profile (до создания окон)
+    if "--profile" in sys.argv:
+        instrumentation.install()
+    else:
+        instrumentation.install_from_env()
     app = QApplication(sys.argv)
     # app.setWindowIcon(QIcon(icon_path))
     window = PasswordGeneratorApp()
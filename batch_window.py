@@ -0,0 +1,232 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QListView, QProgressBar, QMessageBox,
+    QApplication
+)
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QThreadPool, QTimer
+from qt_material import apply_stylesheet
+from workers import BatchGenerationTask, SaveBatchTask
+
+# Как часто (мс) пришедшие порции паролей добавляются в список: каждая вставка строк
+# заставляет список пересчитать раскладку, поэтому порции копятся и вставляются вместе
+APPEND_INTERVAL = 100
+
+
+class PasswordListModel(QAbstractListModel):
+    """Модель списка паролей: строки создаются только для видимых элементов."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.passwords = []
+        self.pending = []  # Пароли, которые еще не добавлены в список (см. append_later)
+        self.append_timer = QTimer(self)
+        self.append_timer.setSingleShot(True)
+        self.append_timer.setInterval(APPEND_INTERVAL)
+        self.append_timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.passwords)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self.passwords[index.row()]
+        return None
+
+    def append(self, passwords):
+        """Добавляет порцию паролей в конец списка."""
+        if not passwords:
+            return
+        start = len(self.passwords)
+        self.beginInsertRows(QModelIndex(), start, start + len(passwords) - 1)
+        self.passwords.extend(passwords)
+        self.endInsertRows()
+
+    def append_later(self, passwords):
+        """Откладывает порцию паролей: накопленные порции добавляются одной вставкой раз в APPEND_INTERVAL мс."""
+        self.pending.extend(passwords)
+        if not self.append_timer.isActive():
+            self.append_timer.start()
+
+    def flush(self):
+        """Сразу добавляет в список отложенные пароли."""
+        self.append_timer.stop()
+        pending, self.pending = self.pending, []
+        self.append(pending)
+
+    def clear(self):
+        self.append_timer.stop()
+        self.pending = []
+        self.beginResetModel()
+        self.passwords = []
+        self.endResetModel()
+
+
+class BatchGenerationWindow(QDialog):
+    def __init__(self, db, policy, language="ru", parent=None, theme_name=None):
+        super().__init__(parent)
+        self.db = db
+        self.policy = policy
+        self.language = language
+        self.theme_name = theme_name
+        self.task = None  # Текущая фоновая задача (генерация или сохранение)
+        self.setWindowTitle("Пакетная генерация" if self.language == "ru" else "Batch Generation")
+        self.setGeometry(150, 150, 600, 500)
+
+        # Основной layout
+        layout = QVBoxLayout()
+
+        # Количество паролей
+        count_layout = QHBoxLayout()
+        self.count_label = QLabel("Количество паролей:" if self.language == "ru" else "Number of passwords:")
+        self.count_input = QLineEdit("1000")
+        count_layout.addWidget(self.count_label)
+        count_layout.addWidget(self.count_input)
+        layout.addLayout(count_layout)
+
+        # Шаблоны сайта и логина для сохранения в базу данных
+        template_layout = QHBoxLayout()
+        self.site_template_input = QLineEdit()
+        self.site_template_input.setPlaceholderText("Сайт, например site-{n}" if self.language == "ru" else "Site, e.g. site-{n}")
+        self.login_template_input = QLineEdit()
+        self.login_template_input.setPlaceholderText("Логин, например user{n}" if self.language == "ru" else "Login, e.g. user{n}")
+        template_layout.addWidget(self.site_template_input)
+        template_layout.addWidget(self.login_template_input)
+        layout.addLayout(template_layout)
+
+        # Прогресс и список результатов
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        layout.addWidget(self.progress_bar)
+
+        self.model = PasswordListModel(self)
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setUniformItemSizes(True)  # Все строки одной высоты: список не измеряет каждую строку
+        # Раскладка порциями между событиями: после вставки строк список не пересчитывает все строки сразу.
+        # Порция в 1000 строк раскладывалась около 20 мс, поэтому порции небольшие
+        self.list_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.list_view.setBatchSize(100)
+        self.list_view.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        layout.addWidget(self.list_view)
+
+        # Кнопки
+        button_layout = QHBoxLayout()
+
+        self.generate_button = QPushButton("Сгенерировать" if self.language == "ru" else "Generate")
+        self.generate_button.clicked.connect(self.start_generation)
+        button_layout.addWidget(self.generate_button)
+
+        self.cancel_button = QPushButton("Отмена" if self.language == "ru" else "Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_task)
+        button_layout.addWidget(self.cancel_button)
+
+        self.copy_button = QPushButton("Копировать" if self.language == "ru" else "Copy")
+        self.copy_button.clicked.connect(self.copy_selected)
+        button_layout.addWidget(self.copy_button)
+
+        self.save_button = QPushButton("Сохранить в базу" if self.language == "ru" else "Save to Database")
+        self.save_button.setEnabled(False)
+        self.save_button.clicked.connect(self.save_to_database)
+        button_layout.addWidget(self.save_button)
+
+        self.back_button = QPushButton("Назад" if self.language == "ru" else "Back")
+        self.back_button.clicked.connect(self.close)
+        button_layout.addWidget(self.back_button)
+
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+        # Применяем стили qt_material
+        apply_stylesheet(self, theme=self.theme_name or 'dark_teal.xml')
+
+    def set_busy(self, busy):
+        """Блокирует кнопки на время фоновой задачи."""
+        self.generate_button.setEnabled(not busy)
+        self.save_button.setEnabled(not busy and bool(self.model.passwords))
+        self.cancel_button.setEnabled(busy)
+
+    def start_generation(self):
+        """Запускает генерацию в пуле потоков."""
+        try:
+            count = int(self.count_input.text())
+            if count <= 0:
+                raise ValueError
+        except ValueError:
+            QMessageBox.critical(
+                self,
+                "Ошибка" if self.language == "ru" else "Error",
+                "Введите количество паролей (целое число больше 0)." if self.language == "ru" else "Please enter the number of passwords (integer greater than 0)."
+            )
+            return
+
+        self.model.clear()
+        self.progress_bar.setValue(0)
+        self.set_busy(True)
+
+        self.task = BatchGenerationTask(self.policy, count)
+        self.task.signals.chunk.connect(self.model.append_later)
+        self.task.signals.progress.connect(self.progress_bar.setValue)
+        self.task.signals.finished.connect(self.task_finished)
+        QThreadPool.globalInstance().start(self.task)
+
+    def cancel_task(self):
+        if self.task:
+            self.task.cancel()
+
+    def task_finished(self, result):
+        self.model.flush()
+        self.task = None
+        self.set_busy(False)
+
+    def copy_selected(self):
+        """Копирует выделенные пароли в буфер обмена, по одному в строке."""
+        rows = sorted(index.row() for index in self.list_view.selectionModel().selectedIndexes())
+        if rows:
+            QApplication.clipboard().setText("\n".join(self.model.passwords[row] for row in rows))
+
+    def save_to_database(self):
+        """Сохраняет все пароли в базу данных, подставляя номер в шаблоны сайта и логина."""
+        site_template = self.site_template_input.text().strip()
+        login_template = self.login_template_input.text().strip()
+        try:
+            site_template.format(n=1)
+            login_template.format(n=1)
+        except (KeyError, IndexError, ValueError, AttributeError, TypeError):
+            QMessageBox.critical(
+                self,
+                "Ошибка" if self.language == "ru" else "Error",
+                "Шаблон может содержать только {n}." if self.language == "ru" else "A template may only contain {n}."
+            )
+            return
+
+        self.progress_bar.setValue(0)
+        self.set_busy(True)
+
+        self.task = SaveBatchTask(
+            str(self.db.db_path), self.model.passwords, site_template, login_template,
+            self.db.cipher.key if self.db.cipher is not None else None
+        )
+        self.task.signals.progress.connect(self.progress_bar.setValue)
+        self.task.signals.finished.connect(self.save_finished)
+        self.task.signals.failed.connect(self.save_failed)
+        QThreadPool.globalInstance().start(self.task)
+
+    def save_finished(self, result):
+        saved, reused = result
+        self.task_finished(result)
+        message = f"Сохранено паролей: {saved}." if self.language == "ru" else f"Passwords saved: {saved}."
+        if reused:
+            message += (
+                f"\nУже использовались в базе: {reused}." if self.language == "ru"
+                else f"\nAlready in use in the vault: {reused}."
+            )
+        QMessageBox.information(self, "Успех" if self.language == "ru" else "Success", message)
+
+    def save_failed(self, message):
+        self.task_finished(None)
+        QMessageBox.critical(self, "Ошибка" if self.language == "ru" else "Error", message)
+
+    def closeEvent(self, event):
+        """Отменяет фоновую задачу при закрытии окна."""
+        self.cancel_task()
+        event.accept()
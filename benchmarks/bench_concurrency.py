@@ -0,0 +1,99 @@
+"""
+Читатели во время массовой записи: журнал отката (прежние соединения по умолчанию)
+против WAL и соединений только для чтения из database.connect.
+
+Пишущий поток сохраняет записи порциями (по транзакции на порцию), а читатели в это
+время читают страницы базы. Для каждого режима выводится, сколько страниц прочитали
+читатели, сколько раз получили "database is locked" и самую долгую задержку чтения.
+
+Запуск: python benchmarks/bench_concurrency.py --rows 200000 --readers 2
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database
+from database import Database
+
+# Сколько записей пишется одной транзакцией
+WRITE_CHUNK = 20000
+
+
+def open_reader(path, mode):
+    if mode == "wal":
+        return database.connect(path, readonly=True)
+    # Прежнее поведение: соединение по умолчанию, ожидание блокировки — не больше 0,1 с
+    return sqlite3.connect(path, timeout=0.1)
+
+
+def reader(path, mode, stop, stats):
+    conn = open_reader(path, mode)
+    last_id = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            rows = conn.execute(
+                "SELECT id, site, login, password, created_at FROM passwords WHERE id > ? ORDER BY id LIMIT 256", (last_id,)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            stats["locked"] += 1
+            continue
+        stats["worst"] = max(stats["worst"], time.perf_counter() - start)
+        stats["pages"] += 1
+        last_id = rows[-1][0] if len(rows) == 256 else 0
+    conn.close()
+
+
+def run(directory, mode, rows, readers):
+    path = Path(directory) / f"{mode}.db"
+    db = Database(str(path))
+    if mode != "wal":
+        # Прежние настройки соединения по умолчанию
+        db.conn.execute("PRAGMA journal_mode = DELETE")
+        db.conn.execute("PRAGMA synchronous = FULL")
+        db.conn.execute("PRAGMA cache_size = -2000")
+        db.conn.execute("PRAGMA mmap_size = 0")
+    db.save_many((f"site{i}", f"user{i}", f"password{i}") for i in range(WRITE_CHUNK))
+
+    stop = threading.Event()
+    stats = [{"pages": 0, "locked": 0, "worst": 0.0} for _ in range(readers)]
+    threads = [threading.Thread(target=reader, args=(path, mode, stop, item)) for item in stats]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    for offset in range(0, rows, WRITE_CHUNK):
+        db.save_many((f"bulk{i}", "user", "password") for i in range(offset, min(offset + WRITE_CHUNK, rows)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in threads:
+        thread.join()
+    db.close()
+
+    pages = sum(item["pages"] for item in stats)
+    locked = sum(item["locked"] for item in stats)
+    worst = max(item["worst"] for item in stats) * 1000
+    print(
+        f"{mode:>8}: запись {elapsed:5.1f} с ({rows / elapsed:8,.0f} записей/с)  "
+        f"страниц прочитано {pages:7,}  'database is locked' {locked:5,}  худшее чтение {worst:7.1f} мс"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк чтения во время массовой записи")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--readers", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("rollback", "wal"):
+            run(directory, mode, args.rows, args.readers)
+
+
+if __name__ == "__main__":
+    main()
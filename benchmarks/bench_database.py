@@ -0,0 +1,76 @@
+"""
+Построчная запись в базу данных против пакетной (save_many/update_many/delete_many):
+количество фиксаций транзакций и время.
+
+Запуск: python benchmarks/bench_database.py --rows 10000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Database
+
+
+class CommitCounter:
+    """Считает фиксации транзакций через трассировку SQL-запросов соединения."""
+
+    def __init__(self, db):
+        self.commits = 0
+        db.conn.set_trace_callback(self.trace)
+
+    def trace(self, statement):
+        if statement.strip().upper().startswith("COMMIT"):
+            self.commits += 1
+
+
+def measure(name, db, action):
+    counter = CommitCounter(db)
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    db.conn.set_trace_callback(None)
+    print(f"{name:28} {elapsed * 1000:10.1f} мс  фиксаций: {counter.commits}")
+
+
+def run(db, rows, bulk):
+    records = [(f"site{i}", f"user{i}", f"password{i}") for i in range(rows)]
+    if bulk:
+        measure("save_many", db, lambda: db.save_many(records))
+    else:
+        measure("save_password", db, lambda: [db.save_password(*record) for record in records])
+
+    ids = [row[0] for row in db.iter_passwords()]
+    updates = [(id, f"site{id}", f"login{id}", f"new{id}") for id in ids]
+    if bulk:
+        measure("update_many", db, lambda: db.update_many(updates))
+    else:
+        measure("update_password", db, lambda: [db.update_password(*row) for row in updates])
+
+    ids = [row[0] for row in db.iter_passwords()]
+    if bulk:
+        measure("delete_many", db, lambda: db.delete_many(ids))
+    else:
+        measure("delete_password", db, lambda: [db.delete_password(id) for id in ids])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пакетной записи в базу данных")
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for bulk in (False, True):
+            print("Пакетная запись:" if bulk else "Построчная запись:")
+            db = Database(str(Path(directory) / f"bench-{int(bulk)}.db"))
+            try:
+                run(db, args.rows, bulk)
+            finally:
+                db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Проверка дубликата перед сохранением: просмотр таблицы без индекса
+(старый password_exists + INSERT) против upsert_password по индексу пары (site, login).
+
+Запуск: python benchmarks/bench_duplicates.py --rows 1000 100000 1000000
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Database
+
+
+def fill(cursor, rows):
+    cursor.executemany(
+        "INSERT INTO passwords (site, login, password) VALUES (?, ?, ?)",
+        ((f"site{i}", f"user{i}", f"password{i}") for i in range(rows))
+    )
+
+
+def per_call(action, calls):
+    """Среднее время одного вызова action(i) в микросекундах."""
+    start = time.perf_counter()
+    for i in range(calls):
+        action(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def bench_scan(directory, rows, calls):
+    """Старая схема: SELECT COUNT(*) по столбцу без индекса, затем отдельный INSERT."""
+    conn = sqlite3.connect(Path(directory) / f"scan-{rows}.db")
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE passwords (
+            id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL UNIQUE,
+            site TEXT, login TEXT, password TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    fill(cursor, rows)
+    conn.commit()
+
+    def save(i):
+        cursor.execute("SELECT COUNT(*) FROM passwords WHERE site = ?", (f"new{i}",))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("INSERT INTO passwords (site, login, password) VALUES (?, ?, ?)", (f"new{i}", "user", "password"))
+
+    elapsed = per_call(save, calls)
+    conn.rollback()
+    conn.close()
+    return elapsed
+
+
+def bench_index(directory, rows, calls):
+    """Новая схема: один INSERT ... WHERE NOT EXISTS по индексу пары (site, login)."""
+    db = Database(str(Path(directory) / f"index-{rows}.db"))
+    with db.transaction():
+        fill(db.cursor, rows)
+    # Фиксация не измеряется: в обоих вариантах она одинакова
+    with db.transaction():
+        elapsed = per_call(lambda i: db.upsert_password(f"new{i}", "user", "password"), calls)
+    db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк проверки дубликатов")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'записей':>10} {'просмотр, мкс':>15} {'индекс, мкс':>13} {'ускорение':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            scan = bench_scan(directory, rows, args.calls)
+            index = bench_index(directory, rows, args.calls)
+            print(f"{rows:>10,} {scan:>15.1f} {index:>13.1f} {scan / index:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Сравнение скорости генерации: generate_password_with_counts в цикле
+против пакетного generate_passwords и NumPy-движка (если NumPy установлен),
+а также скорость generate_passwords с разными источниками энтропии.
+
+Запуск: python benchmarks/bench_generation.py --count 100000 --length 16
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import entropy
+import numpy_generator
+from password_generator import PasswordPolicy, generate_password_with_counts, generate_passwords
+
+
+def measure(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк генерации паролей")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--length", type=int, default=16)
+    args = parser.parse_args()
+
+    policy = PasswordPolicy(args.length)
+
+    results = [
+        ("generate_password_with_counts", measure(lambda: [generate_password_with_counts(args.length, True, True, True) for _ in range(args.count)])),
+        ("generate_passwords", measure(lambda: generate_passwords(args.count, policy))),
+    ]
+    if numpy_generator.available():
+        results.append(("numpy: матрица", measure(lambda: numpy_generator.generate_password_matrix(args.count, policy))))
+        results.append(("numpy: строки", measure(lambda: numpy_generator.generate_passwords(args.count, policy))))
+
+    loop_time = results[0][1]
+    for name, elapsed in results:
+        print(
+            f"{name:32} {args.count / elapsed:12,.0f} паролей/с "
+            f"{args.count * args.length / elapsed:14,.0f} символов/с  x{loop_time / elapsed:.1f}"
+        )
+
+    # Источники энтропии: пакетная генерация и чтение мелкими порциями (по 16 байтов)
+    sources = {
+        "system (os.urandom)": entropy.SystemSource(),
+        "urandom (буфер)": entropy.UrandomPool(),
+        "drbg": entropy.DrbgSource(),
+        "deterministic (зерно)": entropy.DeterministicSource(0),
+    }
+    print()
+    small_reads = 200000
+    system_time = None
+    for name, source in sources.items():
+        elapsed = measure(lambda: generate_passwords(args.count, policy, source))
+        small = measure(lambda: [source.read(16) for _ in range(small_reads)])
+        system_time = system_time or elapsed
+        print(
+            f"{name:32} {args.count * args.length / elapsed:14,.0f} символов/с  x{system_time / elapsed:.2f}  "
+            f"{small_reads / small:12,.0f} чтений по 16 байтов/с"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Задержки цикла событий интерфейса при сохранении записей: вызовы Database
+в потоке интерфейса против очереди DatabaseWorker с групповой фиксацией.
+
+Таймер с интервалом 1 мс измеряет, насколько опаздывает каждое его срабатывание;
+гистограмма опозданий показывает, сколько цикл событий стоял. Трассировка SQLite
+считает запросы, выполненные в потоке интерфейса, и фиксации.
+
+Запуск: QT_QPA_PLATFORM=offscreen python benchmarks/bench_gui_latency.py --saves 500
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtCore import QCoreApplication, QTimer
+
+from database import Database
+from db_worker import DatabaseWorker
+from workers import FutureCallbacks
+
+# Границы столбцов гистограммы опозданий (мс)
+BUCKETS = (1, 2, 5, 10, 20, 50)
+
+
+def histogram(delays):
+    counts = [0] * (len(BUCKETS) + 1)
+    for delay in delays:
+        counts[sum(delay >= bound for bound in BUCKETS)] += 1
+    labels = [f"<{BUCKETS[0]}"] + [f"{a}-{b}" for a, b in zip(BUCKETS, BUCKETS[1:])] + [f">={BUCKETS[-1]}"]
+    return "  ".join(f"{label} мс: {count}" for label, count in zip(labels, counts))
+
+
+class Trace:
+    """Считает запросы SQLite по потокам и фиксации."""
+
+    def __init__(self):
+        self.gui_thread = threading.get_ident()
+        self.gui_statements = 0
+        self.statements = 0
+        self.commits = 0
+
+    def __call__(self, statement):
+        self.statements += 1
+        if threading.get_ident() == self.gui_thread:
+            self.gui_statements += 1
+        if statement.startswith("COMMIT"):
+            self.commits += 1
+
+
+def run(app, saves, submit):
+    """Сохраняет saves записей (по одной на срабатывание таймера) и возвращает опоздания таймера."""
+    delays = []
+    state = {"sent": 0, "done": 0, "last": time.perf_counter()}
+
+    def tick():
+        now = time.perf_counter()
+        delays.append((now - state["last"]) * 1000 - 1)
+        state["last"] = now
+        if state["sent"] < saves:
+            i = state["sent"]
+            state["sent"] += 1
+            submit(i, lambda: state.__setitem__("done", state["done"] + 1))
+        elif state["done"] >= saves:
+            app.quit()
+
+    timer = QTimer()
+    timer.setInterval(1)
+    timer.timeout.connect(tick)
+    timer.start()
+    app.exec()
+    timer.stop()
+    return delays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк задержек интерфейса при записи в базу")
+    parser.add_argument("--saves", type=int, default=500)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        # Синхронно: каждая запись — запрос и фиксация с fsync в потоке интерфейса
+        db = Database(str(Path(directory) / "sync.db"), journal=True)
+        trace = Trace()
+        db.conn.set_trace_callback(trace)
+
+        def save_sync(i, done):
+            db.upsert_password(f"site{i}", "user", "password")
+            done()
+
+        delays = run(app, args.saves, save_sync)
+        print(f"Синхронно:     запросов в потоке интерфейса {trace.gui_statements:5}, фиксаций {trace.commits:4}")
+        print(f"               {histogram(delays)}")
+        db.close()
+
+        # Через очередь: поток интерфейса только ставит запросы, результаты приходят сигналом
+        worker = DatabaseWorker(str(Path(directory) / "worker.db"), journal=True)
+        trace = Trace()
+        worker.call(lambda db: db.conn.set_trace_callback(trace))
+        callbacks = FutureCallbacks()
+
+        def save_async(i, done):
+            callbacks.watch(worker.submit(Database.upsert_password, f"site{i}", "user", "password"), lambda saved: done())
+
+        delays = run(app, args.saves, save_async)
+        print(f"DatabaseWorker: запросов в потоке интерфейса {trace.gui_statements:5}, фиксаций {trace.commits:4}")
+        print(f"               {histogram(delays)}")
+        worker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Потоковый импорт и экспорт (vault_io): скорость и пиковая память Python
+при импорте файла на миллион записей и его выгрузке обратно.
+
+Запуск: python benchmarks/bench_import.py --rows 1000000 --format jsonl --gzip
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import vault_io
+from database import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк импорта и экспорта")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--format", choices=vault_io.FORMATS, default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    suffix = (".jsonl" if args.format == "jsonl" else ".csv") + (".gz" if args.gzip else "")
+    with tempfile.TemporaryDirectory() as directory:
+        source = Path(directory) / f"source{suffix}"
+        rows = ((id, f"site{id}", f"user{id}", f"password{id}", "2024-01-01 00:00:00") for id in range(args.rows))
+        with vault_io.open_file(source, "w") as file:
+            vault_io.write_rows(file, rows, args.format)
+        print(f"Файл: {source.stat().st_size / 2**20:.1f} МБ, {args.rows:,} записей")
+
+        db = Database(str(Path(directory) / "import.db"))
+        tracemalloc.start()
+        start = time.perf_counter()
+        read, saved = vault_io.import_file(db, source, args.format)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        print(f"Импорт:  {elapsed:6.1f} с  {read / elapsed:10,.0f} записей/с  сохранено {saved:,}  пик памяти {peak / 2**20:.1f} МБ")
+
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        written = vault_io.export_file(db, Path(directory) / f"export{suffix}", args.format)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"Экспорт: {elapsed:6.1f} с  {written / elapsed:10,.0f} записей/с  пик памяти {peak / 2**20:.1f} МБ")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Масштабирование многопроцессной генерации: пароли/с для 1-16 процессов.
+
+Запуск: python benchmarks/bench_pool.py --count 1000000 --length 16
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import generation_pool
+from password_generator import PasswordPolicy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пула процессов")
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--length", type=int, default=16)
+    parser.add_argument("--backend", choices=("python", "numpy"), default="python")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    policy = PasswordPolicy(args.length)
+    print(f"Ядер процессора: {os.cpu_count()}")
+
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        total = 0
+        for chunk in generation_pool.iter_text_chunks(args.count, policy, workers, backend=args.backend):
+            total += len(chunk)
+        elapsed = time.perf_counter() - start
+        rate = args.count / elapsed
+        baseline = baseline or rate
+        print(f"процессов: {workers:2}  {rate:12,.0f} паролей/с  x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Задержка поиска по индексу триграмм при наборе запроса по одному символу.
+
+Запуск: python benchmarks/bench_search.py --rows 100000 --query github.com
+"""
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from search_index import TrigramIndex
+
+DOMAINS = ["github.com", "google.com", "mail.ru", "yandex.ru", "example.org", "steamcommunity.com", "bank.local"]
+
+
+def make_rows(count, seed=0):
+    """Синтетические записи: поддомены популярных сайтов и случайные логины."""
+    rng = random.Random(seed)
+    for id in range(1, count + 1):
+        prefix = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+        login = "".join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(5, 12)))
+        yield id, f"{prefix}.{rng.choice(DOMAINS)}", f"{login}@mail.com"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска по индексу триграмм")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--query", default="github.com")
+    parser.add_argument("--min-length", type=int, default=3, help="queries shorter than this are not looked up in the index")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = TrigramIndex(make_rows(args.rows))
+    print(f"Построение индекса ({args.rows:,} записей): {time.perf_counter() - start:.2f} с")
+
+    for length in range(args.min_length, len(args.query) + 1):
+        query = args.query[:length]
+        start = time.perf_counter()
+        matches = index.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{query!r:>14}  {elapsed:7.2f} мс  найдено: {len(matches):,}")
+
+
+if __name__ == "__main__":
+    main()
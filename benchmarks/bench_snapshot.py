@@ -0,0 +1,72 @@
+"""
+Снимок сеанса и отмена изменений: прежний путь через backup.json против
+онлайн-резервирования SQLite (Database.take_snapshot/restore_backup).
+
+Запуск: python benchmarks/bench_snapshot.py --rows 100000
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Database
+
+
+def json_snapshot(db, path):
+    """Прежний create_backup: вся база в JSON-файл с отступами."""
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(db.get_all_passwords(), f, ensure_ascii=False, indent=4)
+
+
+def json_restore(db, path):
+    """Прежний restore_backup: очистка таблицы и вставка каждой записи заново (id меняются)."""
+    with path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    with db.transaction():
+        db.cursor.execute("DELETE FROM passwords")
+        for item in data:
+            db.cursor.execute(
+                "INSERT INTO passwords (site, login, password, created_at) VALUES (?, ?, ?, ?)",
+                (item[1], item[2], item[3], item[4])
+            )
+
+
+def timed(action):
+    start = time.perf_counter()
+    action()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк снимков сеанса")
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(str(Path(directory) / "snapshot.db"))
+        db.save_many((f"site{i}", f"user{i}", f"password{i}") for i in range(args.rows))
+        # Изменение, которое будет отменяться: удаляем половину записей
+        ids = [row[0] for row in db.page(limit=args.rows // 2)]
+
+        path = Path(directory) / "backup.json"
+        snapshot = timed(lambda: json_snapshot(db, path))
+        db.delete_many(ids)
+        restore = timed(lambda: json_restore(db, path))
+        print(f"JSON:          снимок {snapshot:8.1f} мс  отмена {restore:8.1f} мс  (id записей меняются)")
+
+        opened = timed(db.create_backup)
+        snapshot = timed(db.take_snapshot)
+        ids = [row[0] for row in db.page(limit=args.rows // 2)]
+        db.delete_many(ids)
+        restore = timed(db.restore_backup)
+        assert db.count_passwords() == args.rows and db.page(limit=1)[0][0] == ids[0]
+        print(f"Backup API:    снимок {snapshot:8.1f} мс  отмена {restore:8.1f} мс  (открытие окна {opened:.3f} мс)")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
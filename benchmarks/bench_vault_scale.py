@@ -0,0 +1,350 @@
+"""
+Поведение приложения по мере роста базы: синтетические базы от 1 тыс. до 1 млн записей.
+
+Для каждого размера замеряются Database.get_all_passwords (через SQL и из кэша записей),
+password_exists, create_backup с первым изменением (снимок), restore_backup, а в окне
+SavedDataWindow (QT_QPA_PLATFORM=offscreen) — открытие, построение индекса поиска при первом
+запросе, load_data, filter_table, save_changes и delete_entry. Для каждой операции записываются
+время, пик RSS процесса во время операции и прирост RSS (пик минус RSS перед операцией). Каждый размер замеряется в отдельном процессе, чтобы пики памяти не смешивались,
+и --runs раз (по умолчанию 5): результат операции — медиана замеров и их разброс
+(медиана абсолютных отклонений).
+
+Результаты сохраняются в JSON (--output). С --baseline результаты сравниваются с прошлым
+запуском: операция, медиана которой стала больше чем на --threshold хуже, а разница
+превышает шум (NOISE_SPREADS разбросов), считается регрессией, и программа завершается с кодом 1.
+
+Запуск:
+    python benchmarks/bench_vault_scale.py --sizes 1000 10000 100000 --output before.json
+    python benchmarks/bench_vault_scale.py --sizes 1000 10000 100000 --baseline before.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Database, close_connections
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+# Сколько записей вставляется одной транзакцией при создании базы
+FILL_CHUNK = 50000
+# Сколько раз проверяется password_exists в одном замере
+LOOKUPS = 1000
+# Сколько строк изменяется перед save_changes и удаляется через delete_entry
+EDITED_ROWS = 100
+# Сколько раз по умолчанию замеряется каждый размер (каждый раз в новом процессе)
+DEFAULT_RUNS = 5
+# Разница медиан не считается регрессией, пока она не больше стольких разбросов замеров (шум измерения)
+NOISE_SPREADS = 3
+# Сколько ждать окончания асинхронной операции окна (с)
+WAIT_TIMEOUT = 600
+
+
+def reset_peak_rss():
+    """Сбрасывает пик RSS процесса (Linux); без этого пик считается с начала процесса."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            return int(re.search(r"VmHWM:\s+(\d+)", f.read()).group(1)) / 1024
+    except (OSError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            return int(re.search(r"VmRSS:\s+(\d+)", f.read()).group(1)) / 1024
+    except (OSError, AttributeError):
+        return 0.0
+
+
+def measure(results, name, action, repeat=1):
+    """Выполняет action repeat раз; добавляет время, пик и прирост RSS каждого выполнения к замерам операции."""
+    samples = results.setdefault(name, {"seconds": [], "peak_rss_mb": [], "rss_growth_mb": []})
+    for _ in range(repeat):
+        reset_peak_rss()
+        before = rss_mb()
+        start = time.perf_counter()
+        action()
+        samples["seconds"].append(time.perf_counter() - start)
+        peak = peak_rss_mb()
+        samples["peak_rss_mb"].append(peak)
+        samples["rss_growth_mb"].append(max(peak - before, 0.0))
+
+
+def summarize(samples):
+    """Медиана и разброс (медиана абсолютных отклонений) замеров каждой величины."""
+    summary = {"samples": len(samples["seconds"])}
+    for key, values in samples.items():
+        median = statistics.median(values)
+        summary[key] = median
+        summary[f"{key}_spread"] = statistics.median(abs(value - median) for value in values)
+    return summary
+
+
+def fill_vault(path, rows):
+    db = Database(str(path))
+    try:
+        for start in range(0, rows, FILL_CHUNK):
+            db.save_many(
+                (f"site{i:07d}", f"user{i % 997}", f"password-{i * 7919 % rows}")
+                for i in range(start, min(start + FILL_CHUNK, rows))
+            )
+    finally:
+        db.close()
+
+
+def bench_database(path, rows, results):
+    db = Database(str(path))
+    cached = Database(str(path), cache=True)
+    try:
+        measure(results, "get_all_passwords", db.get_all_passwords, repeat=3)
+        cached.get_all_passwords()  # Первое обращение читает кэш из базы
+        measure(results, "get_all_passwords (кэш)", cached.get_all_passwords, repeat=3)
+        sites = [f"site{i * rows // LOOKUPS:07d}" for i in range(LOOKUPS)]
+        measure(results, f"password_exists x{LOOKUPS}", lambda: [db.password_exists(site) for site in sites], repeat=3)
+
+        measure(results, "create_backup + первое изменение", lambda: (
+            db.create_backup(), db.save_password("bench", "user", "password")
+        ))
+        measure(results, "restore_backup", db.restore_backup)
+        db.delete_backup()
+    finally:
+        cached.close()
+        db.close()
+
+
+def bench_window(path, rows, results):
+    from PySide6.QtCore import QItemSelection, QItemSelectionModel
+    from PySide6.QtWidgets import QApplication, QMessageBox
+
+    from db_worker import DatabaseWorker
+    from saved_data_window import SavedDataWindow
+
+    app = QApplication.instance() or QApplication([])
+    # Окна сообщений не должны ждать пользователя: ответ "Да", сообщения только считаются
+    messages = []
+    QMessageBox.information = lambda *args, **kwargs: messages.append(args[2])
+    QMessageBox.warning = lambda *args, **kwargs: messages.append(args[2])
+    QMessageBox.critical = lambda *args, **kwargs: messages.append(args[2])
+    QMessageBox.question = lambda *args, **kwargs: QMessageBox.StandardButton.Yes
+
+    def wait(condition):
+        deadline = time.perf_counter() + WAIT_TIMEOUT
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("the window did not finish the operation")
+            app.processEvents()
+            time.sleep(0.0005)
+
+    def wait_message():
+        count = len(messages)
+        return lambda: wait(lambda: len(messages) > count)
+
+    # Так же, как в приложении: база в потоке DatabaseWorker с журналом и кэшем записей, чтение — через поток-читатель
+    worker = DatabaseWorker(str(path), journal=True, cache=True)
+    reader = DatabaseWorker(str(path), readonly=True)
+    window = None
+    try:
+        def open_window():
+            nonlocal window
+            window = SavedDataWindow(worker, "en", reader=reader)
+            wait(lambda: window.model.rowCount() > 0)
+
+        measure(results, "SavedDataWindow (открытие)", open_window)
+        model = window.model
+
+        # Запрос подходит примерно 100 записям из середины базы
+        query = f"site{rows // 2:07d}"[:-2]
+
+        def first_search():
+            # Индекс триграмм строится при первом длинном запросе
+            window.search_input.setText(query)
+            window.search_timer.stop()
+            window.filter_table()
+            wait(lambda: window.search_index is not None and not model.fetching)
+            window.search_input.setText("")
+            window.search_timer.stop()
+            window.filter_table()
+            wait(lambda: not model.fetching)
+
+        measure(results, "индекс поиска (первый запрос)", first_search)
+
+        def load_data():
+            window.load_data()
+            wait(lambda: model.rowCount() > 0 and not model.fetching)
+
+        measure(results, "load_data", load_data, repeat=3)
+
+        def filter_table():
+            window.search_input.setText(query)
+            window.search_timer.stop()
+            window.filter_table()
+            wait(lambda: not model.fetching)
+            window.search_input.setText("")
+            window.search_timer.stop()
+            window.filter_table()
+            wait(lambda: not model.fetching)
+
+        measure(results, "filter_table", filter_table, repeat=3)
+
+        for row in range(min(EDITED_ROWS, model.rowCount())):
+            model.setData(model.index(row, model.LOGIN), f"edited{row}")
+
+        def save_changes():
+            done = wait_message()
+            window.save_changes()
+            done()
+
+        measure(results, f"save_changes x{EDITED_ROWS}", save_changes)
+
+        proxy = window.proxy
+        last = min(EDITED_ROWS, proxy.rowCount()) - 1
+        window.table.selectionModel().select(
+            QItemSelection(proxy.index(0, 0), proxy.index(last, proxy.columnCount() - 1)),
+            QItemSelectionModel.SelectionFlag.Select | QItemSelectionModel.SelectionFlag.Rows
+        )
+
+        def delete_entry():
+            done = wait_message()
+            window.delete_entry()
+            done()
+
+        measure(results, f"delete_entry x{EDITED_ROWS}", delete_entry)
+    finally:
+        if window is not None:
+            window.close()
+        worker.close()
+        reader.close()
+        close_connections()
+
+
+def run_size(rows):
+    """Замеры одного размера (выполняется в отдельном процессе)."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / f"vault-{rows}.db"
+        measure(results, "создание базы", lambda: fill_vault(path, rows))
+        bench_database(path, rows, results)
+        bench_window(path, rows, results)
+    return results
+
+
+def run_child(rows):
+    """Запускает замеры размера rows в новом процессе и возвращает замеры операций."""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    process = subprocess.run(
+        [sys.executable, __file__, "--child", str(rows)], capture_output=True, text=True, env=env
+    )
+    lines = process.stdout.strip().splitlines()
+    try:
+        return json.loads(lines[-1])
+    except (IndexError, json.JSONDecodeError):
+        raise RuntimeError(f"benchmark for {rows} rows failed:\n{process.stderr}") from None
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).resolve().parent.parent
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+
+
+def compare(report, baseline, threshold):
+    """Возвращает строки с описанием регрессий относительно baseline."""
+    regressions = []
+    for size, operations in report["results"].items():
+        for name, result in operations.items():
+            base = baseline["results"].get(size, {}).get(name)
+            if base is None:
+                continue
+            for key, unit, scale in (("seconds", "мс", 1000), ("peak_rss_mb", "МБ", 1), ("rss_growth_mb", "МБ", 1)):
+                if key not in base:
+                    continue  # Величина не замерялась в прошлом запуске
+                noise = NOISE_SPREADS * max(result[f"{key}_spread"], base.get(f"{key}_spread", 0.0))
+                if result[key] > base[key] * (1 + threshold) and result[key] - base[key] > noise:
+                    regressions.append(
+                        f"{int(size):>9,} записей: {name}: {base[key] * scale:.1f} -> {result[key] * scale:.1f} {unit} "
+                        f"(+{(result[key] / base[key] - 1) * 100:.0f}%, шум {noise * scale:.1f} {unit})"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк операций с базой и окна сохраненных данных по размеру базы")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--output", help="Куда записать результаты (JSON)")
+    parser.add_argument("--baseline", help="Результаты прошлого запуска (JSON) для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимое ухудшение (0.2 — на 20%%)")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Сколько раз замерять каждый размер")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_size(args.child)), flush=True)
+        return
+
+    report = {"meta": metadata(), "results": {}}
+    report["meta"]["runs"] = args.runs
+    for rows in args.sizes:
+        samples = {}
+        for _ in range(args.runs):
+            for name, values in run_child(rows).items():
+                operation = samples.setdefault(name, {key: [] for key in values})
+                for key in operation:
+                    operation[key].extend(values[key])
+        results = {name: summarize(values) for name, values in samples.items()}
+        report["results"][str(rows)] = results
+        for name, result in results.items():
+            print(
+                f"{rows:>9,} записей: {name:34} {result['seconds'] * 1000:10.1f} ± {result['seconds_spread'] * 1000:6.1f} мс  "
+                f"пик RSS {result['peak_rss_mb']:8.1f} МБ (+{result['rss_growth_mb']:.1f})",
+                flush=True
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\nРегрессии (порог {args.threshold:.0%}):")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print(f"\nРегрессий нет (порог {args.threshold:.0%}, сравнение с {baseline['meta'].get('commit') or args.baseline})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,506 @@
+from bisect import bisect_right
+from contextlib import contextmanager
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 import sqlite3
-import json
+import threading
+
+import vault_crypto
+
+# Способы сохранения записи, если пара (site, login) уже есть в базе
+ON_CONFLICT = ("reject", "overwrite", "keep_both")
+
+# Вставка с сохранением дубликатов: новая запись получает следующий свободный dup_index
+# для своей пары (site, login). Номер ищется по уникальному индексу в том же запросе.
+# Пары сравниваются через IS, чтобы записи без сайта или логина тоже считались дубликатами.
+INSERT_KEEP_BOTH = """
+    INSERT INTO passwords (site, login, password, fingerprint, dup_index)
+    VALUES (?1, ?2, ?3, ?4, (SELECT COALESCE(MAX(dup_index) + 1, 0) FROM passwords WHERE site IS ?1 AND login IS ?2))
+"""
+
+# Вставка, только если пары (site, login) еще нет в базе. Проверяется вся пара, а не
+# ключ уникального индекса: после удаления записи с dup_index = 0 ее дубликаты остаются.
+INSERT_IF_NEW = """
+    INSERT INTO passwords (site, login, password, fingerprint)
+    SELECT ?1, ?2, ?3, ?4 WHERE NOT EXISTS (SELECT 1 FROM passwords WHERE site IS ?1 AND login IS ?2)
+"""
+
+# Замена пароля первой (с наименьшим dup_index) записи с парой (site, login)
+OVERWRITE_FIRST = """
+    UPDATE passwords SET password = ?3, fingerprint = ?4
+    WHERE id = (SELECT id FROM passwords WHERE site IS ?1 AND login IS ?2 ORDER BY dup_index LIMIT 1)
+"""
+
+# Столбцы, по которым можно сортировать страницы page(); у каждого есть индекс (столбец, id)
+ORDER_COLUMNS = ("id", "site", "created_at")
+
+# Обновление записи: если сайт или логин изменились и такая пара уже есть,
+# запись получает следующий свободный dup_index вместо ошибки уникальности.
+# Отпечаток ?4 равен NULL, если пароль передан уже зашифрованным: тогда он не меняется.
+UPDATE_KEEP_BOTH = """
+    UPDATE passwords SET
+        dup_index = CASE WHEN site IS ?1 AND login IS ?2 THEN dup_index
+            ELSE (SELECT COALESCE(MAX(p.dup_index) + 1, 0) FROM passwords AS p WHERE p.site IS ?1 AND p.login IS ?2) END,
+        site = ?1, login = ?2, password = ?3, fingerprint = COALESCE(?4, fingerprint)
+    WHERE id = ?5
+"""
+
+# Журнал изменений для пошаговой отмены: сколько последних шагов и записей журнала хранится
+MAX_JOURNAL_STEPS = 100
+MAX_JOURNAL_ROWS = 100000
+
+# Временные (для этого соединения) таблица и триггеры журнала. На каждое изменение строки
+# триггер записывает обратный запрос с номером шага из journal_state; пока номер не задан,
+# ничего не записывается. Отмена шага выполняет его запросы в обратном порядке, а триггеры
+# тем же способом записывают запросы для повтора.
+JOURNAL_SCHEMA = """
+    CREATE TEMP TABLE IF NOT EXISTS journal (
+        seq INTEGER PRIMARY KEY,
+        step INTEGER NOT NULL,
+        row_id INTEGER NOT NULL,
+        statement TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS temp.idx_journal_step ON journal (step);
+    CREATE TEMP TABLE IF NOT EXISTS journal_state (step INTEGER);
+    INSERT INTO journal_state (step) SELECT NULL WHERE NOT EXISTS (SELECT 1 FROM journal_state);
+    CREATE TEMP TRIGGER IF NOT EXISTS journal_insert AFTER INSERT ON passwords
+    WHEN (SELECT step FROM journal_state) IS NOT NULL BEGIN
+        INSERT INTO journal (step, row_id, statement) VALUES (
+            (SELECT step FROM journal_state), new.id,
+            'DELETE FROM passwords WHERE id = ' || new.id
+        );
+    END;
+    CREATE TEMP TRIGGER IF NOT EXISTS journal_delete AFTER DELETE ON passwords
+    WHEN (SELECT step FROM journal_state) IS NOT NULL BEGIN
+        INSERT INTO journal (step, row_id, statement) VALUES (
+            (SELECT step FROM journal_state), old.id,
+            'INSERT INTO passwords (id, site, login, password, fingerprint, created_at, dup_index) VALUES ('
+                || old.id || ', ' || quote(old.site) || ', ' || quote(old.login) || ', '
+                || quote(old.password) || ', ' || quote(old.fingerprint) || ', ' || quote(old.created_at) || ', '
+                || old.dup_index || ')'
+        );
+    END;
+    CREATE TEMP TRIGGER IF NOT EXISTS journal_update AFTER UPDATE ON passwords
+    WHEN (SELECT step FROM journal_state) IS NOT NULL BEGIN
+        INSERT INTO journal (step, row_id, statement) VALUES (
+            (SELECT step FROM journal_state), old.id,
+            'UPDATE passwords SET site = ' || quote(old.site) || ', login = ' || quote(old.login)
+                || ', password = ' || quote(old.password) || ', fingerprint = ' || quote(old.fingerprint)
+                || ', created_at = ' || quote(old.created_at)
+                || ', dup_index = ' || old.dup_index || ' WHERE id = ' || old.id
+        );
+    END;
+"""
+
+# Временные триггеры кэша записей: каждое изменение строки передается в Database.cache_changed
+# (старый id, новая строка или NULL для удаленной). Изменение только отпечатка кэш не затрагивает.
+CACHE_SCHEMA = """
+    CREATE TEMP TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON passwords BEGIN
+        SELECT cache_changed(NULL, new.id, new.site, new.login, new.password, new.created_at);
+    END;
+    CREATE TEMP TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON passwords BEGIN
+        SELECT cache_changed(old.id, NULL, NULL, NULL, NULL, NULL);
+    END;
+    CREATE TEMP TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF id, site, login, password, created_at ON passwords
+    BEGIN
+        SELECT cache_changed(old.id, new.id, new.site, new.login, new.password, new.created_at);
+    END;
+"""
+
+
+# Настройки соединений. WAL: читатели не ждут пишущего, а фиксация не переписывает базу;
+# synchronous=NORMAL в режиме WAL не делает fsync на каждую фиксацию, но не портит базу при сбое.
+BUSY_TIMEOUT = 5.0  # Сколько секунд ждать, пока база занята другим соединением
+MMAP_SIZE = 256 * 2**20  # Чтение файла базы через отображение в память
+CACHE_SIZE_KB = 16 * 1024  # Кэш страниц каждого соединения
+
+
+def connect(db_path, readonly=False, check_same_thread=True):
+    """
+    Открывает соединение с настроенными PRAGMA. Соединение только для чтения открывается
+    по URI с mode=ro: оно не может изменить базу и не мешает пишущему соединению.
+    """
+    if readonly:
+        conn = sqlite3.connect(
+            Path(db_path).resolve().as_uri() + "?mode=ro", uri=True,
+            timeout=BUSY_TIMEOUT, check_same_thread=check_same_thread
+        )
+    else:
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, check_same_thread=check_same_thread)
+        conn.execute("PRAGMA journal_mode = WAL")  # Режим сохраняется в файле базы
+        conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT * 1000)}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    return conn
+
+
+class ConnectionManager:
+    """
+    Раздает соединения с одной базой: каждому потоку — свое соединение для записи
+    и свое только для чтения (для окон просмотра, экспорта и построения индекса поиска),
+    которые переиспользуются следующими задачами этого потока.
+    prepared — таблицы уже созданы и миграции выполнены через одно из соединений для записи.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.prepared = False
+
+    def connection(self, readonly=False):
+        name = "readonly" if readonly else "writer"
+        conn = getattr(self.local, name, None)
+        if conn is None:
+            # Соединение используется только своим потоком, но закрывается из close()
+            conn = connect(self.db_path, readonly, check_same_thread=False)
+            setattr(self.local, name, conn)
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def close(self):
+        """Закрывает все выданные соединения (когда потоки, которые ими пользуются, закончили работу)."""
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            conn.close()
+        self.local = threading.local()
+
+
+# Менеджеры соединений по пути к базе (см. Database.shared)
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def connection_manager(db_path):
+    """Возвращает общий ConnectionManager для базы по этому пути."""
+    key = str(Path(db_path).resolve())
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = ConnectionManager(key)
+        return manager
+
+
+def close_connections():
+    """Закрывает соединения всех ConnectionManager (при выходе, когда фоновые задачи закончились)."""
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close()
+
+
+class RowCache:
+    """
+    Все записи базы в памяти: id -> (id, site, login, password, created_at) — те же кортежи,
+    что возвращают запросы, поэтому чтение из кэша ничего не преобразует. Отсортированный
+    список id для постраничного чтения пересобирается, только если порядок нарушен.
+    data_version — значение PRAGMA data_version, при котором кэш прочитан из базы.
+    """
+    __slots__ = ("rows", "ids", "data_version")
+
+    def __init__(self, rows, data_version):
+        self.rows = {row[0]: row for row in rows}  # Строки читаются в порядке id
+        self.ids = list(self.rows)
+        self.data_version = data_version
+
+    def apply(self, old_id, row):
+        """Применяет изменение строки old_id: row — новая строка или None, если запись удалена."""
+        if old_id is not None and (row is None or row[0] != old_id):
+            self.rows.pop(old_id, None)
+            self.ids = None
+        if row is None:
+            return
+        id = row[0]
+        if id not in self.rows and self.ids is not None:
+            if self.ids and id < self.ids[-1]:
+                self.ids = None  # Восстановленная запись со старым id: список пересоберется
+            else:
+                self.ids.append(id)
+        self.rows[id] = row
+
+    def sorted_ids(self):
+        if self.ids is None:
+            self.ids = sorted(self.rows)
+        return self.ids
+
+    def page(self, after, limit):
+        ids = self.sorted_ids()
+        start = 0 if after is None else bisect_right(ids, after)
+        return [self.rows[id] for id in ids[start:start + limit]]
+
+
+def upsert_queries(on_conflict):
+    """
+    Возвращает запросы сохранения записи для способа on_conflict (см. ON_CONFLICT).
+    Для каждой записи они выполняются по очереди до первого, который изменил строку.
+    """
+    if on_conflict == "reject":
+        return (INSERT_IF_NEW,)
+    if on_conflict == "overwrite":
+        return (OVERWRITE_FIRST, INSERT_IF_NEW)
+    if on_conflict == "keep_both":
+        return (INSERT_KEEP_BOTH,)
+    raise ValueError(f"on_conflict must be one of {ON_CONFLICT}")
+
 
 class Database:
-    def __init__(self, db_name="passwords.db"):
+    def __init__(self, db_name="passwords.db", journal=False, readonly=False, connection=None, cache=False, prepare=True):
+        """
+        readonly — открыть базу только для чтения (для окон просмотра, экспорта и фоновых читателей):
+        таблицы не создаются, а журнал и кэш записей не используются;
+        connection — использовать готовое соединение (например, из ConnectionManager) и не закрывать его;
+        cache — держать записи в памяти (RowCache) для чтения без запросов к таблице;
+        prepare — создать таблицы, выполнить миграции и заполнить отпечатки (False, если
+        это уже сделано через другое соединение с этой базой).
+        """
         current_dir = Path(__file__).parent  # Получаем текущую директорию
         self.data_dir = current_dir / "data"  # Путь к папке data
         self.data_dir.mkdir(exist_ok=True)  # Создаем папку, если она не существует
 
         self.db_path = self.data_dir / db_name  # Путь к базе данных
-        self.backup_path = self.data_dir / "backup.json"  # Путь к резервной копии JSON
 
-        self.conn = sqlite3.connect(self.db_path)
+        self.owns_connection = connection is None
+        self.conn = connect(self.db_path, readonly) if connection is None else connection
+        self.readonly = readonly
+        # Соединение только для чтения не может создавать таблицы, а журнал и кэш нужны только пишущему
+        prepare, journal, cache = (False, False, False) if readonly else (prepare, journal, cache)
         self.cursor = self.conn.cursor()
-        self.create_table()
+        # Служебные запросы журнала идут через свой курсор, чтобы не менять rowcount основного
+        self.journal_cursor = self.conn.cursor()
+        self.transaction_depth = 0  # Глубина вложенности transaction()
+        self.snapshot = None  # Снимок базы в памяти для отмены изменений сеанса
+        self.snapshot_pending = False  # Снимок нужно сделать перед первым изменением
+        self.journal_enabled = journal  # Записывать ли изменения для пошаговой отмены (undo/redo)
+        self.undo_steps = []  # Номера шагов, которые можно отменить (последний — сверху)
+        self.redo_steps = []  # Номера отмененных шагов, которые можно повторить
+        self.next_step = 1  # Номер, который получит следующий шаг
+        self.recorded_steps = []  # Шаги текущей транзакции, которые попадут в undo_steps после фиксации
+        self.replaying = None  # Номер шага, который сейчас отменяется или повторяется
+        self.cipher = None  # Ключ шифрования паролей (после unlock)
+        self.cache_enabled = cache
+        self.cache = None  # RowCache; читается из базы при первом обращении
+        self.cache_changes = []  # Изменения строк текущей транзакции: применяются к кэшу после фиксации
+        if prepare:
+            self.create_table()
+        self.encrypted = self.get_meta("kdf_salt") is not None  # Пароли зашифрованы мастер-паролем
+        # Ключ отпечатков незашифрованной базы; в зашифрованной ключ выводится из мастер-пароля
+        self.fingerprint_key = self.get_meta("fingerprint_key") or b""
+        if prepare and not self.encrypted:
+            self.fill_fingerprints()
+        if journal:
+            self.cursor.executescript(JOURNAL_SCHEMA)
+        if cache:
+            self.conn.create_function("cache_changed", 6, self.cache_changed)
+            self.cursor.executescript(CACHE_SCHEMA)
+
+    @classmethod
+    def shared(cls, db_name="passwords.db", readonly=False):
+        """
+        Database на соединении текущего потока из общего ConnectionManager: фоновые задачи
+        пула потоков не открывают новое соединение на каждый запуск, а таблицы и миграции
+        проверяются только при первом вызове для этой базы.
+        """
+        manager = connection_manager(Path(__file__).parent / "data" / db_name)
+        db = cls(db_name, readonly=readonly, connection=manager.connection(readonly), prepare=not manager.prepared)
+        if not readonly:
+            manager.prepared = True
+        return db
+
+    @contextmanager
+    def transaction(self):
+        """
+        Выполняет все изменения внутри блока with одной транзакцией.
+        Вложенные блоки входят во внешнюю транзакцию; при ошибке изменения откатываются.
+        Через этот блок проходят все изменения, поэтому здесь же делается отложенный снимок,
+        а при включенном журнале каждая внешняя транзакция становится одним шагом отмены
+        (или несколькими, если внутри есть блоки savepoint()).
+        """
+        if not self.transaction_depth:
+            if self.snapshot_pending:
+                self.take_snapshot()
+            # Явное начало: иначе sqlite3 начнет транзакцию только перед первым INSERT/UPDATE/DELETE,
+            # а SAVEPOINT без открытой транзакции сам начинает и фиксирует (RELEASE) отдельную
+            if not self.conn.in_transaction:
+                self.cursor.execute("BEGIN")
+            self.begin_step()
+        self.transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.transaction_depth -= 1
+            if not self.transaction_depth:
+                self.conn.rollback()
+                self.cache_changes = []
+                self.recorded_steps = []
+            raise
+        self.transaction_depth -= 1
+        if not self.transaction_depth:
+            dropped = 0
+            if self.journal_enabled and self.replaying is None:
+                self.finish_step()
+                if self.recorded_steps:
+                    dropped = self.compact_journal()
+            self.conn.commit()
+            self.apply_cache_changes()
+            if self.recorded_steps:
+                # Шаги становятся доступны для отмены только после фиксации
+                self.undo_steps = (self.undo_steps + self.recorded_steps)[dropped:]
+                self.recorded_steps = []
+                self.redo_steps = []
+
+    @contextmanager
+    def savepoint(self):
+        """
+        Точка сохранения внутри transaction(): если блок завершится ошибкой,
+        откатываются только его изменения, а транзакция продолжается.
+        При включенном журнале блок записывается отдельным шагом отмены.
+        """
+        mark = len(self.cache_changes)
+        self.split_step()
+        self.cursor.execute("SAVEPOINT request")
+        try:
+            yield self
+        except BaseException:
+            self.cursor.execute("ROLLBACK TO request")
+            del self.cache_changes[mark:]
+            raise
+        finally:
+            self.cursor.execute("RELEASE request")
+            self.split_step()
+
+    def cache_changed(self, old_id, id, site, login, password, created_at):
+        """Вызывается триггерами кэша (в том числе при отмене шага журнала) для каждой измененной строки."""
+        if self.cache is not None:
+            self.cache_changes.append((old_id, None if id is None else (id, site, login, password, created_at)))
+
+    def apply_cache_changes(self):
+        changes, self.cache_changes = self.cache_changes, []
+        if self.cache is not None:
+            for old_id, row in changes:
+                self.cache.apply(old_id, row)
+
+    def cached(self):
+        """
+        Возвращает кэш записей (None, если кэш выключен). Изменения этого соединения кэш получает
+        от триггеров; запись другим соединением или процессом меняет PRAGMA data_version,
+        и тогда кэш читается заново. Проверка не читает страниц таблицы.
+        """
+        if not self.cache_enabled or self.conn.in_transaction:
+            return None  # Внутри транзакции кэш еще не содержит ее изменений: читаем из базы
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if self.cache is None or self.cache.data_version != data_version:
+            cursor = self.conn.execute("SELECT id, site, login, password, created_at FROM passwords ORDER BY id")
+            self.cache = RowCache(cursor, data_version)
+        return self.cache
+
+    def begin_step(self):
+        """Начинает запись шага журнала: триггеры записывают изменения под номером next_step."""
+        if self.journal_enabled:
+            step = self.next_step if self.replaying is None else self.replaying
+            self.journal_cursor.execute("UPDATE journal_state SET step = ?", (step,))
+
+    def finish_step(self):
+        """
+        Завершает запись шага. Если шаг что-то изменил, он запоминается в recorded_steps
+        (в undo_steps он попадет после фиксации), а шаги для повтора удаляются:
+        после нового изменения их не повторить.
+        """
+        self.journal_cursor.execute("UPDATE journal_state SET step = NULL")
+        self.journal_cursor.execute("SELECT 1 FROM journal WHERE step = ? LIMIT 1", (self.next_step,))
+        if self.journal_cursor.fetchone() is not None:
+            self.journal_cursor.executemany("DELETE FROM journal WHERE step = ?", ((step,) for step in self.redo_steps))
+            self.recorded_steps.append(self.next_step)
+        self.next_step += 1
+
+    def split_step(self):
+        """Внутри транзакции завершает текущий шаг журнала и начинает следующий."""
+        if self.journal_enabled and self.replaying is None and self.transaction_depth:
+            self.finish_step()
+            self.begin_step()
+
+    def compact_journal(self):
+        """
+        Сжимает журнал перед фиксацией: старые шаги удаляются, пока их больше MAX_JOURNAL_STEPS
+        или записей больше MAX_JOURNAL_ROWS. Последний шаг не удаляется, даже если он один
+        больше ограничения. Возвращает, сколько первых шагов (undo_steps + recorded_steps) удалено.
+        """
+        steps = self.undo_steps + self.recorded_steps
+        dropped = max(len(steps) - MAX_JOURNAL_STEPS, 0)
+        # seq растет, поэтому MAX(seq) - MIN(seq) + 1 — верхняя оценка числа записей без подсчета
+        self.journal_cursor.execute("SELECT MAX(seq) - MIN(seq) + 1 FROM journal")
+        if self.journal_cursor.fetchone()[0] > MAX_JOURNAL_ROWS:
+            # Самый старый шаг, запись которого еще входит в последние MAX_JOURNAL_ROWS
+            self.journal_cursor.execute(
+                "SELECT step FROM journal ORDER BY seq DESC LIMIT 1 OFFSET ?", (MAX_JOURNAL_ROWS - 1,)
+            )
+            row = self.journal_cursor.fetchone()
+            if row is not None:
+                kept = row[0]
+                dropped = max(dropped, sum(step <= kept for step in steps))
+        dropped = min(dropped, len(steps) - 1)
+        self.journal_cursor.executemany("DELETE FROM journal WHERE step = ?", ((step,) for step in steps[:dropped]))
+        return dropped
+
+    def replay_step(self, step):
+        """
+        Выполняет одной транзакцией запросы шага в обратном порядке записи, удаляя их из журнала;
+        триггеры записывают под тем же номером обратные запросы. Время зависит только от размера шага.
+        Возвращает id затронутых записей.
+        """
+        self.replaying = step
+        try:
+            with self.transaction():
+                self.cursor.execute(
+                    "SELECT row_id, statement FROM journal WHERE step = ? ORDER BY seq DESC", (step,)
+                )
+                entries = self.cursor.fetchall()
+                self.cursor.execute("DELETE FROM journal WHERE step = ?", (step,))
+                for row_id, statement in entries:
+                    self.cursor.execute(statement)
+                self.cursor.execute("UPDATE journal_state SET step = NULL")
+        finally:
+            self.replaying = None
+        return list(dict.fromkeys(row_id for row_id, statement in entries))
+
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def history_state(self):
+        """Возвращает (можно ли отменить шаг, можно ли повторить шаг) — для кнопок окна."""
+        return self.can_undo(), self.can_redo()
+
+    def undo(self):
+        """Отменяет последний шаг. Возвращает id затронутых записей или None, если отменять нечего."""
+        if not self.undo_steps:
+            return None
+        ids = self.replay_step(self.undo_steps[-1])
+        self.redo_steps.append(self.undo_steps.pop())
+        return ids
+
+    def redo(self):
+        """Повторяет последний отмененный шаг. Возвращает id затронутых записей или None, если повторять нечего."""
+        if not self.redo_steps:
+            return None
+        ids = self.replay_step(self.redo_steps[-1])
+        self.undo_steps.append(self.redo_steps.pop())
+        return ids
+
+    def clear_journal(self):
+        """Удаляет все шаги журнала (например, после восстановления снимка)."""
+        if self.journal_enabled:
+            self.cursor.execute("DELETE FROM journal")
+            self.conn.commit()
+        self.undo_steps = []
+        self.redo_steps = []
 
     def create_table(self):
         self.cursor.execute("""
@@ -22,61 +509,430 @@ class Database:
                 site TEXT,
                 login TEXT,
                 password TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP  -- Добавляем столбец для даты
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,  -- Добавляем столбец для даты
+                dup_index INTEGER NOT NULL DEFAULT 0  -- Номер записи среди записей с той же парой (site, login)
             )
         """)
+        # Параметры шифрования: соль и параметры scrypt, контрольная строка для проверки мастер-пароля
+        self.cursor.execute("CREATE TABLE IF NOT EXISTS vault_meta (key TEXT PRIMARY KEY, value)")
+        self.cursor.execute(
+            "INSERT OR IGNORE INTO vault_meta (key, value) VALUES ('fingerprint_key', randomblob(32))"
+        )
+        self.migrate_dup_index()
+        self.migrate_fingerprint()
+        # Уникальный индекс: проверка дубликата — один поиск по индексу, а не просмотр таблицы
+        self.cursor.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_passwords_site_login ON passwords (site, login, dup_index)"
+        )
+        # Индексы для постраничного чтения в порядке сайта и даты создания
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_passwords_site_id ON passwords (site, id)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_passwords_created_at_id ON passwords (created_at, id)")
+        # Индекс отпечатков: проверка повторного пароля — один поиск, поиск повторов — группировка по индексу
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_passwords_fingerprint ON passwords (fingerprint)")
+        self.drop_search_index()
         self.conn.commit()
 
-    def save_password(self, site, login, password):
-        """Сохраняет пароль в базе данных без хэширования."""
-        self.cursor.execute("INSERT INTO passwords (site, login, password) VALUES (?, ?, ?)", 
-                        (site, login, password))
+    def drop_search_index(self):
+        """
+        Удаляет из старой базы полнотекстовый индекс FTS5 и его триггеры: поиск в окне
+        сохраненных данных идет по индексу триграмм в памяти (search_index.TrigramIndex),
+        а триггеры FTS5 замедляли каждую запись. Если индекса нет, выполняется только один запрос.
+        """
+        self.cursor.execute(
+            "SELECT type, name FROM sqlite_master WHERE name IN "
+            "('passwords_fts_insert', 'passwords_fts_delete', 'passwords_fts_update', 'passwords_fts') "
+            "ORDER BY type = 'table'"
+        )
+        for kind, name in self.cursor.fetchall():
+            try:
+                self.cursor.execute(f"DROP {kind.upper()} IF EXISTS {name}")
+            except sqlite3.OperationalError:
+                pass  # SQLite без FTS5 не может удалить таблицу; без триггеров она ни на что не влияет
+
+    def migrate_dup_index(self):
+        """Добавляет столбец dup_index в старую базу и нумерует уже сохраненные дубликаты."""
+        columns = [row[1] for row in self.cursor.execute("PRAGMA table_info(passwords)")]
+        if "dup_index" in columns:
+            return
+        self.cursor.execute("ALTER TABLE passwords ADD COLUMN dup_index INTEGER NOT NULL DEFAULT 0")
+        self.cursor.execute("""
+            UPDATE passwords SET dup_index = numbered.n
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY site, login ORDER BY id) - 1 AS n FROM passwords
+            ) AS numbered
+            WHERE passwords.id = numbered.id AND numbered.n > 0
+        """)
+
+    def migrate_fingerprint(self):
+        """Добавляет столбец fingerprint в старую базу; отпечатки заполняет fill_fingerprints."""
+        columns = [row[1] for row in self.cursor.execute("PRAGMA table_info(passwords)")]
+        if "fingerprint" not in columns:
+            self.cursor.execute("ALTER TABLE passwords ADD COLUMN fingerprint BLOB")
+
+    def fill_fingerprints(self, batch_size=1000):
+        """
+        Вычисляет отпечатки записей, у которых их нет (старая база или запись, сохраненная
+        уже зашифрованной). Изменение служебное и в журнал отмены не попадает.
+        """
+        if self.is_locked():
+            return
+        last_id = 0
+        while True:
+            self.cursor.execute(
+                "SELECT id, password FROM passwords WHERE fingerprint IS NULL AND id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            )
+            batch = self.cursor.fetchall()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            self.cursor.executemany(
+                "UPDATE passwords SET fingerprint = ? WHERE id = ?",
+                ((self.fingerprint(self.reveal(value)), id) for id, value in batch)
+            )
         self.conn.commit()
 
+    def save_password(self, site, login, password):
+        """Сохраняет пароль в базе данных без хэширования (дубликаты сохраняются) и возвращает id записи."""
+        with self.transaction():
+            self.cursor.execute(INSERT_KEEP_BOTH, (site, login, *self.seal(password)))
+        return self.cursor.lastrowid
+
+    def upsert_password(self, site, login, password, on_conflict="reject"):
+        """
+        Сохраняет пароль одним запросом. Если пара (site, login) уже есть в базе:
+        reject — ничего не сохраняет, overwrite — заменяет пароль существующей записи,
+        keep_both — сохраняет еще одну запись. Возвращает False, если запись отклонена.
+        """
+        with self.transaction():
+            return self.execute_upserts([(site, login, *self.seal(password))], on_conflict) > 0
+
+    def upsert_many(self, rows, on_conflict="reject"):
+        """
+        Сохраняет записи (site, login, password) одной транзакцией так же, как upsert_password.
+        Возвращает количество сохраненных (вставленных или перезаписанных) записей.
+        """
+        with self.transaction():
+            return self.execute_upserts(self.seal_rows(rows), on_conflict)
+
+    def execute_upserts(self, rows, on_conflict):
+        """Сохраняет зашифрованные записи (site, login, password, fingerprint); возвращает количество сохраненных."""
+        queries = upsert_queries(on_conflict)
+        if len(queries) == 1:
+            self.cursor.executemany(queries[0], rows)
+            return max(self.cursor.rowcount, 0)
+        # Запись за записью: повтор пары в том же пакете перезаписывает только что вставленную запись
+        saved = 0
+        for row in rows:
+            for query in queries:
+                self.cursor.execute(query, row)
+                if self.cursor.rowcount > 0:
+                    saved += 1
+                    break
+        return saved
+
+    def save_many(self, rows):
+        """Сохраняет записи (site, login, password) одной транзакцией (дубликаты сохраняются)."""
+        with self.transaction():
+            self.cursor.executemany(INSERT_KEEP_BOTH, self.seal_rows(rows))
+
+    def get_meta(self, key):
+        self.cursor.execute("SELECT value FROM vault_meta WHERE key = ?", (key,))
+        row = self.cursor.fetchone()
+        return None if row is None else row[0]
+
+    def unlock(self, master_password):
+        """
+        Выводит ключ из мастер-пароля (один раз за сеанс) и проверяет его по контрольной строке.
+        Вызывает InvalidMasterPasswordError, если пароль неверный.
+        """
+        salt = self.get_meta("kdf_salt")
+        if salt is None:
+            return
+        cipher = vault_crypto.Cipher(vault_crypto.derive_key(
+            master_password, salt, self.get_meta("kdf_n"), self.get_meta("kdf_r"), self.get_meta("kdf_p")
+        ))
+        cipher.check(self.get_meta("verifier"))
+        self.cipher = cipher
+        if not self.readonly:
+            self.fill_fingerprints()
+
+    def set_key(self, key):
+        """Использует уже выведенный ключ (например, ключ основного соединения в фоновом потоке)."""
+        self.cipher = vault_crypto.Cipher(key)
+
+    def is_locked(self):
+        return self.encrypted and self.cipher is None
+
+    def fingerprint(self, password):
+        """Отпечаток пароля ключом этой базы (в зашифрованной базе нужен мастер-пароль)."""
+        if not self.encrypted:
+            return vault_crypto.fingerprint(self.fingerprint_key, password)
+        if self.cipher is None:
+            raise vault_crypto.VaultLockedError("the vault is locked")
+        return vault_crypto.fingerprint(self.cipher.fingerprint_key, password)
+
+    def seal(self, password):
+        """
+        Готовит пароль к записи: возвращает (значение для столбца password, отпечаток).
+        В зашифрованной базе пароль шифруется; уже зашифрованное значение не меняется,
+        а отпечаток для него — None.
+        """
+        if isinstance(password, bytes):
+            return password, None
+        fingerprint = self.fingerprint(password)
+        if not self.encrypted:
+            return password, fingerprint
+        return self.cipher.encrypt(password), fingerprint
+
+    def seal_rows(self, rows):
+        """Готовит строки (site, login, password) к записи: (site, login, значение, отпечаток)."""
+        return ((site, login, *self.seal(password)) for site, login, password in rows)
+
+    def reveal(self, value):
+        """Возвращает пароль в открытом виде: зашифрованное значение расшифровывается только здесь."""
+        if not isinstance(value, bytes):
+            return value
+        if self.cipher is None:
+            raise vault_crypto.VaultLockedError("the vault is locked")
+        return self.cipher.decrypt(value)
+
+    def set_master_password(self, master_password, batch_size=1000, progress=None):
+        """
+        Включает шифрование, меняет мастер-пароль (новая соль и ключ) или, если master_password пустой,
+        расшифровывает базу. Все пароли перешифровываются (а их отпечатки пересчитываются новым ключом)
+        одной транзакцией, порциями по batch_size записей, поэтому в памяти одновременно находится
+        одна порция. progress(done) вызывается после каждой порции. Шаги журнала со старыми значениями удаляются, а сеанс отмены начинается заново.
+        """
+        if master_password:
+            salt = vault_crypto.new_salt()
+            params = (vault_crypto.SCRYPT_N, vault_crypto.SCRYPT_R, vault_crypto.SCRYPT_P)
+            cipher = vault_crypto.Cipher(vault_crypto.derive_key(master_password, salt, *params))
+        else:
+            cipher = None
+        fingerprint_key = self.fingerprint_key if cipher is None else cipher.fingerprint_key
+        with self.transaction():
+            last_id = 0
+            done = 0
+            while True:
+                self.cursor.execute(
+                    "SELECT id, password FROM passwords WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+                )
+                batch = self.cursor.fetchall()
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                revealed = [(id, self.reveal(value)) for id, value in batch]
+                self.cursor.executemany(
+                    "UPDATE passwords SET password = ?, fingerprint = ? WHERE id = ?",
+                    (
+                        (
+                            password if cipher is None else cipher.encrypt(password),
+                            vault_crypto.fingerprint(fingerprint_key, password), id
+                        )
+                        for id, password in revealed
+                    )
+                )
+                done += len(batch)
+                if progress is not None:
+                    progress(done)
+            self.cursor.execute(
+                "DELETE FROM vault_meta WHERE key IN ('kdf_salt', 'kdf_n', 'kdf_r', 'kdf_p', 'verifier')"
+            )
+            if cipher is not None:
+                self.cursor.executemany(
+                    "INSERT INTO vault_meta (key, value) VALUES (?, ?)",
+                    [
+                        ("kdf_salt", salt), ("kdf_n", params[0]), ("kdf_r", params[1]), ("kdf_p", params[2]),
+                        ("verifier", cipher.verifier())
+                    ]
+                )
+        self.cipher = cipher
+        self.encrypted = cipher is not None
+        self.clear_journal()
+        if self.snapshot is not None or self.snapshot_pending:
+            self.create_backup()
+
     def get_all_passwords(self):
-        """Возвращает все сохраненные пароли."""
-        self.cursor.execute("SELECT id, site, login, password, created_at FROM passwords")
+        """Возвращает все сохраненные пароли (весь список сразу; для больших баз — iter_passwords)."""
+        cache = self.cached()
+        if cache is not None:
+            return [cache.rows[id] for id in cache.sorted_ids()]
+        return list(self.iter_passwords())
+
+    def iter_passwords(self, batch_size=1000, order_by="id"):
+        """
+        Перебирает записи (id, site, login, password, created_at), читая их из базы
+        порциями по batch_size: в памяти одновременно находится не больше одной порции.
+        """
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"order_by must be one of {ORDER_COLUMNS}")
+        # Отдельный курсор: во время перебора можно выполнять другие запросы
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"SELECT id, site, login, password, created_at FROM passwords ORDER BY {order_by}, id")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def page(self, after=None, limit=100, order_by="id"):
+        """
+        Возвращает до limit записей, следующих в порядке order_by за записью after
+        (с начала, если after равен None). При order_by="id" after — id последней полученной записи,
+        иначе — пара (значение order_by, id) этой записи: страница продолжается с нужного места,
+        даже если сама запись уже удалена. Страница ищется по индексу (order_by, id),
+        поэтому время чтения не зависит от ее номера.
+        """
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"order_by must be one of {ORDER_COLUMNS}")
+        if order_by == "id":
+            cache = self.cached()
+            if cache is not None:
+                return cache.page(after, limit)
+        query = "SELECT id, site, login, password, created_at FROM passwords"
+        if after is None:
+            params = (limit,)
+        elif order_by == "id":
+            query += " WHERE id > ?"
+            params = (after, limit)
+        else:
+            value, after_id = after
+            if value is None:
+                # NULL идет в начале порядка: после него — остальные NULL с большим id и все значения
+                query += f" WHERE ({order_by} IS NULL AND id > ?) OR {order_by} IS NOT NULL"
+                params = (after_id, limit)
+            else:
+                query += f" WHERE ({order_by}, id) > (?, ?)"
+                params = (value, after_id, limit)
+        self.cursor.execute(query + f" ORDER BY {order_by}, id LIMIT ?", params)
+        return self.cursor.fetchall()
+
+    def get_passwords(self, ids):
+        """Возвращает записи с указанными id (не больше нескольких сотен за вызов) в порядке id."""
+        ids = list(ids)
+        if not ids:
+            return []
+        cache = self.cached()
+        if cache is not None:
+            return [cache.rows[id] for id in sorted(set(ids)) if id in cache.rows]
+        placeholders = ", ".join("?" * len(ids))
+        self.cursor.execute(
+            f"SELECT id, site, login, password, created_at FROM passwords WHERE id IN ({placeholders}) ORDER BY id", ids
+        )
         return self.cursor.fetchall()
 
+    def count_passwords(self):
+        """Возвращает количество сохраненных записей."""
+        cache = self.cached()
+        if cache is not None:
+            return len(cache.rows)
+        self.cursor.execute("SELECT COUNT(*) FROM passwords")
+        return self.cursor.fetchone()[0]
+
     def update_password(self, id, site, login, password):
         """Обновляет запись в базе данных без хэширования пароля."""
-        self.cursor.execute("UPDATE passwords SET site=?, login=?, password=? WHERE id=?", 
-                        (site, login, password, id))
-        self.conn.commit()
+        with self.transaction():
+            self.cursor.execute(UPDATE_KEEP_BOTH, (site, login, *self.seal(password), id))
+
+    def update_many(self, rows):
+        """Обновляет записи (id, site, login, password) одной транзакцией."""
+        with self.transaction():
+            self.cursor.executemany(
+                UPDATE_KEEP_BOTH,
+                ((site, login, *self.seal(password), id) for id, site, login, password in rows)
+            )
 
     def delete_password(self, id):
         """Удаляет запись из базы данных."""
-        self.cursor.execute("DELETE FROM passwords WHERE id = ?", (id,))
-        self.conn.commit()
+        with self.transaction():
+            self.cursor.execute("DELETE FROM passwords WHERE id = ?", (id,))
+
+    def delete_many(self, ids):
+        """Удаляет записи с указанными id одной транзакцией."""
+        with self.transaction():
+            self.cursor.executemany("DELETE FROM passwords WHERE id = ?", ((id,) for id in ids))
+
+    def password_exists(self, site, login=None):
+        """Проверяет, существует ли пароль для данного сайта (и логина, если он указан)."""
+        if login is None:
+            self.cursor.execute("SELECT 1 FROM passwords WHERE site = ? LIMIT 1", (site,))
+        else:
+            self.cursor.execute("SELECT 1 FROM passwords WHERE site = ? AND login = ? LIMIT 1", (site, login))
+        return self.cursor.fetchone() is not None
+
+    def password_in_use(self, password):
+        """Проверяет, сохранен ли уже такой пароль для какой-либо записи (один поиск по индексу отпечатков)."""
+        self.cursor.execute("SELECT 1 FROM passwords WHERE fingerprint = ? LIMIT 1", (self.fingerprint(password),))
+        return self.cursor.fetchone() is not None
+
+    def passwords_in_use(self, passwords, batch_size=500):
+        """Возвращает пароли из passwords, которые уже сохранены в базе (по поиску в индексе на пароль)."""
+        fingerprints = [self.fingerprint(password) for password in passwords]
+        found = set()
+        for start in range(0, len(fingerprints), batch_size):
+            batch = fingerprints[start:start + batch_size]
+            self.cursor.execute(
+                f"SELECT DISTINCT fingerprint FROM passwords WHERE fingerprint IN ({', '.join('?' * len(batch))})",
+                batch
+            )
+            found.update(row[0] for row in self.cursor)
+        return [password for password, fingerprint in zip(passwords, fingerprints) if fingerprint in found]
 
-    def password_exists(self, site):
-        """Проверяет, существует ли пароль для данного сайта."""
-        self.cursor.execute("SELECT COUNT(*) FROM passwords WHERE site = ?", (site,))
-        return self.cursor.fetchone()[0] > 0
+    def find_reused(self):
+        """
+        Находит пароли, сохраненные для нескольких записей. Группировка по отпечатку выполняется
+        в SQLite по индексу, пароли не расшифровываются. Возвращает списки id записей с одинаковым паролем.
+        """
+        self.cursor.execute("""
+            SELECT fingerprint, id FROM passwords
+            WHERE fingerprint IN (
+                SELECT fingerprint FROM passwords WHERE fingerprint IS NOT NULL
+                GROUP BY fingerprint HAVING COUNT(*) > 1
+            )
+            ORDER BY fingerprint, id
+        """)
+        return [[id for _, id in group] for _, group in groupby(self.cursor, key=itemgetter(0))]
 
     def create_backup(self):
-        """Создает резервную копию данных в JSON-файл."""
-        data = self.get_all_passwords()
-        with self.backup_path.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        """
+        Начинает сеанс, изменения которого можно отменить через restore_backup.
+        Снимок базы делается не сразу, а перед первым изменением: открытие окна
+        ничего не копирует, а если изменений не было, снимок не нужен вовсе.
+        """
+        self.snapshot = None
+        self.snapshot_pending = True
+
+    def take_snapshot(self):
+        """Копирует базу в память через онлайн-резервирование SQLite (постранично, без разбора строк)."""
+        self.snapshot_pending = False
+        self.snapshot = sqlite3.connect(":memory:")
+        self.conn.backup(self.snapshot)
 
     def restore_backup(self):
-        """Восстанавливает данные из JSON-файла."""
-        if self.backup_path.exists():
-            with self.backup_path.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.cursor.execute("DELETE FROM passwords")  # Очищаем таблицу
-                for item in data:
-                    self.cursor.execute(
-                        "INSERT INTO passwords (site, login, password, created_at) VALUES (?, ?, ?, ?)",
-                        (item[1], item[2], item[3], item[4])
-                    )
-                self.conn.commit()
+        """
+        Возвращает базу к снимку сеанса: страницы снимка копируются обратно одной
+        операцией, поэтому восстановление атомарно, а id записей сохраняются.
+        Снимок остается, и изменения можно отменить еще раз.
+        """
+        if self.snapshot is not None:
+            self.conn.commit()
+            self.snapshot.backup(self.conn)
+            self.cache = None  # Страницы заменены без триггеров: кэш прочитается заново
+            # Шаги журнала относятся к состоянию базы до восстановления
+            self.clear_journal()
 
     def delete_backup(self):
-        """Удаляет резервный JSON-файл."""
-        if self.backup_path.exists():
-            self.backup_path.unlink()
+        """Завершает сеанс и освобождает снимок."""
+        if self.snapshot is not None:
+            self.snapshot.close()
+        self.snapshot = None
+        self.snapshot_pending = False
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        self.delete_backup()
+        if self.owns_connection:
+            self.conn.close()
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""
+Поток, который владеет соединением с базой данных.
+
+Интерфейс не обращается к базе сам: он ставит запросы в очередь DatabaseWorker
+и получает результат через concurrent.futures.Future (в Qt — через сигнал,
+см. workers.FutureCallbacks). Запросы выполняются по порядку. Подряд идущие
+изменения (GROUP_COMMIT) выполняются одной транзакцией: на группу приходится
+одна фиксация с fsync, а ошибка одного запроса откатывает только его (SAVEPOINT).
+При включенном журнале каждый запрос группы остается отдельным шагом отмены.
+Future запроса завершается только после фиксации группы.
+
+Модуль не импортирует PySide6 и подходит и для консольных программ.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+from database import Database
+
+# Сколько запросов изменения объединяется в одну транзакцию
+MAX_GROUP = 64
+
+# Методы Database, которые можно выполнять в общей транзакции группы. Остальные
+# (чтение, undo/redo, восстановление снимка, смена мастер-пароля) выполняются отдельно:
+# они сами управляют транзакцией или журналом.
+GROUP_COMMIT = frozenset((
+    Database.save_password, Database.upsert_password, Database.save_many, Database.upsert_many,
+    Database.update_password, Database.update_many, Database.delete_password, Database.delete_many,
+))
+
+
+class DatabaseWorker:
+    def __init__(self, db_name="passwords.db", journal=False, cache=False, readonly=False):
+        """
+        readonly — поток-читатель: соединение только для чтения из общего ConnectionManager
+        (закрывается вместе с ним, см. database.close_connections); чтение не ждет очереди изменений.
+        """
+        self.requests = queue.Queue()
+        self.db = None
+        self.ready = threading.Event()
+        self.init_error = None
+        self.thread = threading.Thread(
+            target=self.run, args=(db_name, journal, cache, readonly),
+            name="DatabaseReader" if readonly else "DatabaseWorker", daemon=True
+        )
+        self.thread.start()
+        # Соединение создается в потоке, который будет им пользоваться
+        self.ready.wait()
+        if self.init_error is not None:
+            raise self.init_error
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Ставит в очередь вызов function(db, *args, **kwargs), например submit(Database.page, None, 100).
+        Возвращает Future с результатом.
+        """
+        future = Future()
+        self.requests.put((future, function, args, kwargs))
+        return future
+
+    def call(self, function, *args, **kwargs):
+        """Выполняет запрос и ждет результат (для консольных программ и тестов, не для интерфейса)."""
+        return self.submit(function, *args, **kwargs).result()
+
+    def close(self):
+        """Выполняет запросы, уже стоящие в очереди, и закрывает соединение."""
+        if self.thread.is_alive():
+            self.requests.put(None)
+            self.thread.join()
+
+    def run(self, db_name, journal, cache, readonly):
+        try:
+            if readonly:
+                self.db = Database.shared(db_name, readonly=True)
+            else:
+                self.db = Database(db_name, journal=journal, cache=cache)
+        except BaseException as e:
+            self.init_error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        pending = None
+        while True:
+            request = pending if pending is not None else self.requests.get()
+            pending = None
+            if request is None:
+                break
+            if request[1] not in GROUP_COMMIT:
+                self.execute(request)
+                continue
+            # Забираем из очереди следующие изменения, пока они идут подряд
+            group = [request]
+            while len(group) < MAX_GROUP:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None or request[1] not in GROUP_COMMIT:
+                    pending = request
+                    break
+                group.append(request)
+            self.execute_group(group)
+        self.db.close()
+
+    def execute(self, request):
+        future, function, args, kwargs = request
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = function(self.db, *args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def execute_group(self, group):
+        """Выполняет изменения одной транзакцией; каждое — в своей точке сохранения и своим шагом отмены."""
+        if len(group) == 1:
+            self.execute(group[0])
+            return
+        results = []
+        try:
+            with self.db.transaction():
+                for future, function, args, kwargs in group:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with self.db.savepoint():
+                            result = function(self.db, *args, **kwargs)
+                    except Exception as e:
+                        results.append((future, False, e))
+                    else:
+                        results.append((future, True, result))
+        except BaseException as e:
+            # Транзакция откатана: не сохранен ни один запрос группы
+            for future, function, args, kwargs in group:
+                if not future.cancelled():
+                    future.set_exception(e)
+            return
+        for future, ok, result in results:
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
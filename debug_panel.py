@@ -0,0 +1,127 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableView, QHeaderView, QFileDialog, QMessageBox
+)
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from qt_material import apply_stylesheet
+import instrumentation
+
+# Период обновления окна (мс)
+REFRESH_INTERVAL = 1000
+
+
+class TimingTableModel(QAbstractTableModel):
+    """Статистика замеров: строка на метод или обработчик, время в миллисекундах."""
+
+    COLUMNS = ("count", "total_ms", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+    def __init__(self, language="ru", parent=None):
+        super().__init__(parent)
+        self.headers = (
+            ["Метод", "Вызовов", "Всего, мс", "Среднее, мс", "p50, мс", "p95, мс", "p99, мс", "Макс., мс"]
+            if language == "ru" else
+            ["Method", "Calls", "Total, ms", "Mean, ms", "p50, ms", "p95, ms", "p99, ms", "Max, ms"]
+        )
+        self.rows = []  # (имя, статистика)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        name, stats = self.rows[index.row()]
+        if index.column() == 0:
+            return name
+        value = stats[self.COLUMNS[index.column() - 1]]
+        return str(value) if isinstance(value, int) else f"{value:.2f}"
+
+    def set_timings(self, timings):
+        """Показывает статистику; самые затратные (по общему времени) — сверху."""
+        self.beginResetModel()
+        self.rows = sorted(timings.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        self.endResetModel()
+
+
+class DebugPanel(QDialog):
+    """Окно замеров (instrumentation): время методов и обработчиков, число SQL-запросов и фиксаций."""
+
+    def __init__(self, language="ru", parent=None, theme_name=None):
+        super().__init__(parent)
+        self.language = language
+        self.setWindowTitle("Замеры производительности" if self.language == "ru" else "Performance Profile")
+        self.setGeometry(200, 200, 800, 450)
+
+        layout = QVBoxLayout()
+
+        self.counters_label = QLabel()
+        layout.addWidget(self.counters_label)
+
+        self.model = TimingTableModel(self.language, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+
+        self.reset_button = QPushButton("Сбросить" if self.language == "ru" else "Reset")
+        self.reset_button.clicked.connect(self.reset)
+        button_layout.addWidget(self.reset_button)
+
+        self.export_button = QPushButton("Экспорт в JSON" if self.language == "ru" else "Export JSON")
+        self.export_button.clicked.connect(self.export_json)
+        button_layout.addWidget(self.export_button)
+
+        self.back_button = QPushButton("Назад" if self.language == "ru" else "Back")
+        self.back_button.clicked.connect(self.close)
+        button_layout.addWidget(self.back_button)
+
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+        # Окно обновляется по таймеру, пока открыто
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_INTERVAL)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh()
+
+        apply_stylesheet(self, theme=theme_name or 'dark_teal.xml')
+
+    def refresh(self):
+        snapshot = instrumentation.profiler.snapshot()
+        counters = snapshot["counters"]
+        self.counters_label.setText(
+            f"SQL-запросов: {counters.get('sql_statements', 0)}, фиксаций: {counters.get('commits', 0)}"
+            if self.language == "ru" else
+            f"SQL statements: {counters.get('sql_statements', 0)}, commits: {counters.get('commits', 0)}"
+        )
+        self.model.set_timings(snapshot["timings"])
+
+    def reset(self):
+        instrumentation.profiler.reset()
+        self.refresh()
+
+    def export_json(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт в JSON" if self.language == "ru" else "Export JSON", "profile.json", "JSON (*.json)"
+        )
+        if not path:
+            return
+        try:
+            instrumentation.profiler.export_json(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка" if self.language == "ru" else "Error", str(e))
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        event.accept()
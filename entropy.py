@@ -0,0 +1,182 @@
+"""
+Источники случайных байтов для генерации паролей.
+
+SystemSource — os.urandom на каждый запрос (без буфера). Источник по умолчанию.
+UrandomPool — потокобезопасный буфер, который пополняется из os.urandom большими блоками.
+DrbgSource — генератор в пространстве пользователя (SHAKE-128 с затиранием ключа),
+    инициализируется из os.urandom и периодически подмешивает новые байты ОС.
+DeterministicSource — воспроизводимый поток из заданного зерна. Только для
+    бенчмарков и статистических тестов: для настоящих паролей не использовать.
+
+Генерация запрашивает байты большими блоками, а мелкие чтения через блокировку
+и срез буфера медленнее прямого os.urandom (см. benchmarks/bench_generation.py),
+поэтому UrandomPool и DrbgSource не ускоряют генерацию. Это альтернативные
+источники для систем, где системный вызов дорог, и для проверки подключаемых источников.
+
+После fork буферы всех источников в дочернем процессе сбрасываются, а DRBG
+заново инициализируется из ОС, чтобы процессы не выдали одинаковые байты.
+"""
+import hashlib
+import os
+import threading
+import weakref
+
+# Источники, которые нужно сбросить после fork
+_sources = weakref.WeakSet()
+
+
+class EntropySource:
+    """Базовый класс источника случайных байтов."""
+
+    def read(self, n):
+        """Возвращает n случайных байтов."""
+        raise NotImplementedError
+
+    def randbelow(self, n):
+        """Возвращает равномерно распределенное целое число в [0, n)."""
+        bits = n.bit_length()
+        size = (bits + 7) // 8
+        mask = (1 << bits) - 1
+        while True:
+            value = int.from_bytes(self.read(size), "little") & mask
+            if value < n:
+                return value
+
+
+class SystemSource(EntropySource):
+    """os.urandom на каждый запрос."""
+
+    def read(self, n):
+        return os.urandom(n)
+
+
+class _BufferedSource(EntropySource):
+    """
+    Выдает небольшие запросы из буфера, который пополняется блоками по block_size байтов.
+    Запросы не меньше блока получают остаток буфера и недостающие байты напрямую.
+    """
+
+    BLOCK_SIZE = 1 << 16
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size or self.BLOCK_SIZE
+        self._lock = threading.Lock()
+        self._buffer = b""
+        self._position = 0
+        _sources.add(self)
+
+    def _produce(self, n):
+        """Генерирует n новых байтов (вызывается под блокировкой)."""
+        raise NotImplementedError
+
+    def read(self, n):
+        with self._lock:
+            if n >= self.block_size:
+                data = self._buffer[self._position:]
+                self._buffer = b""
+                self._position = 0
+                return data + self._produce(n - len(data))
+            if len(self._buffer) - self._position < n:
+                self._buffer = self._buffer[self._position:] + self._produce(self.block_size)
+                self._position = 0
+            data = self._buffer[self._position:self._position + n]
+            self._position += n
+            return data
+
+    def _after_fork(self):
+        # Блокировка могла быть захвачена другим потоком родителя в момент fork
+        self._lock = threading.Lock()
+        self._buffer = b""
+        self._position = 0
+
+
+class UrandomPool(_BufferedSource):
+    """Буферизованный os.urandom: один системный вызов на block_size байтов."""
+
+    def _produce(self, n):
+        return os.urandom(n)
+
+
+class DrbgSource(_BufferedSource):
+    """
+    DRBG на SHAKE-128: из ключа выводится новый ключ и блок выходных данных,
+    старый ключ сразу затирается. Каждые RESEED_INTERVAL байтов в ключ
+    подмешиваются новые байты os.urandom.
+    """
+
+    RESEED_INTERVAL = 1 << 30
+
+    def __init__(self, block_size=None):
+        super().__init__(block_size)
+        self._reseed(os.urandom(32))
+
+    def _reseed(self, seed):
+        self._key = hashlib.shake_128(b"passgen-drbg-reseed" + getattr(self, "_key", b"") + seed).digest(32)
+        self._counter = 0
+        self._produced = 0
+
+    def _produce(self, n):
+        if self._produced >= self.RESEED_INTERVAL:
+            self._reseed(os.urandom(32))
+        self._counter += 1
+        output = hashlib.shake_128(self._key + self._counter.to_bytes(8, "little")).digest(32 + n)
+        self._key = output[:32]
+        self._produced += n
+        return output[32:]
+
+    def _after_fork(self):
+        super()._after_fork()
+        self._reseed(os.urandom(32))
+
+
+class DeterministicSource(DrbgSource):
+    """
+    Воспроизводимый поток байтов из зерна (для бенчмарков и статистических тестов):
+    одинаковые зерно и последовательность запросов дают одинаковые байты.
+    Никогда не подмешивает энтропию ОС, в том числе после fork.
+    """
+
+    def __init__(self, seed, block_size=None):
+        if isinstance(seed, int):
+            seed = seed.to_bytes((seed.bit_length() + 8) // 8, "little", signed=True)
+        elif isinstance(seed, str):
+            seed = seed.encode("utf-8")
+        _BufferedSource.__init__(self, block_size)
+        self._key = hashlib.shake_128(b"passgen-deterministic" + seed).digest(32)
+        self._counter = 0
+        self._produced = 0
+
+    def _reseed(self, seed):
+        self._counter = 0
+        self._produced = 0
+
+    def _after_fork(self):
+        _BufferedSource._after_fork(self)
+
+
+# Источники, доступные по имени (консольная утилита, процессы пула)
+SOURCES = {"urandom": UrandomPool, "drbg": DrbgSource, "system": SystemSource}
+
+_default_source = None
+
+
+def create_source(name):
+    """Создает источник по имени из SOURCES."""
+    return SOURCES[name]()
+
+
+def get_default_source():
+    """Возвращает общий для процесса источник по умолчанию (os.urandom без буфера)."""
+    global _default_source
+    if _default_source is None:
+        _default_source = SystemSource()
+    return _default_source
+
+
+def _reset_after_fork():
+    for source in list(_sources):
+        source._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
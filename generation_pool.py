@@ -0,0 +1,102 @@
+"""
+Многопроцессная пакетная генерация паролей.
+
+Запрос на N паролей делится на порции, которые генерируются в пуле процессов
+и возвращаются строго по порядку. В работе одновременно находится не больше
+max_in_flight порций: новая порция отправляется в пул только после того, как
+потребитель забрал очередную, поэтому медленный потребитель (диск, база данных)
+притормаживает генерацию, а память не растет.
+
+Каждый процесс при запуске создает собственный источник энтропии (см. entropy),
+а источники сбрасывают буферы и заново инициализируются после fork, поэтому
+процессы пула не разделяют состояние генератора.
+"""
+import os
+from collections import deque
+
+import entropy
+import password_generator
+
+# Размер порции по умолчанию (паролей)
+CHUNK_SIZE = 65536
+
+
+# Источник энтропии процесса пула (создается в _init_worker)
+_worker_source = None
+
+
+def _init_worker(source_name):
+    global _worker_source
+    _worker_source = entropy.create_source(source_name)
+
+
+def _generate_chunk(n, policy, backend):
+    """Генерирует порцию паролей в процессе пула и возвращает их одной строкой через \\n."""
+    if backend == "numpy":
+        import numpy_generator
+        return "\n".join(numpy_generator.generate_passwords(n, policy, _worker_source))
+    return "\n".join(password_generator.generate_passwords(n, policy, _worker_source))
+
+
+def iter_text_chunks(n, policy, workers=None, chunk_size=CHUNK_SIZE, max_in_flight=None, backend="python",
+                     source_name="system"):
+    """
+    Генерирует n паролей в workers процессах и по порядку возвращает порции
+    в виде строк, где пароли разделены переводом строки.
+    source_name — имя источника энтропии из entropy.SOURCES для каждого процесса.
+    """
+    if n < 0:
+        raise password_generator.PasswordGenerationError("batch")
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    sizes = (min(chunk_size, n - start) for start in range(0, n, chunk_size))
+
+    # Импортируем здесь: модуль используется и консольной утилитой, где важна скорость запуска
+    from concurrent.futures import ProcessPoolExecutor
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(source_name,))
+    pending = deque()
+    try:
+        for size in sizes:
+            pending.append(executor.submit(_generate_chunk, size, policy, backend))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Если потребитель остановился раньше, отменяем еще не начатые порции
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def generate_parallel(n, policy, workers=None, chunk_size=CHUNK_SIZE, max_in_flight=None, backend="python",
+                      source_name="system"):
+    """То же, что iter_text_chunks, но каждая порция — список паролей."""
+    for text in iter_text_chunks(n, policy, workers, chunk_size, max_in_flight, backend, source_name):
+        yield text.split("\n") if text else []
+
+
+def write_chunks(chunks, out):
+    """Записывает порции паролей в текстовый поток, по паролю в строке."""
+    for text in chunks:
+        if text:
+            out.write(text)
+            out.write("\n")
+    out.flush()
+
+
+def save_chunks(chunks, db, site_template="", login_template=""):
+    """
+    Сохраняет порции паролей в Database, по одной транзакции на порцию.
+    В шаблонах сайта и логина можно использовать {n} — номер пароля, начиная с 1.
+    Возвращает (количество сохраненных паролей, сколько из них уже было в базе до сохранения).
+    """
+    number = 0
+    reused = 0
+    for text in chunks:
+        rows = []
+        for password in text.split("\n") if text else []:
+            number += 1
+            rows.append((site_template.format(n=number), login_template.format(n=number), password))
+        reused += len(db.passwords_in_use([password for site, login, password in rows]))
+        db.save_many(rows)
+    return number, reused
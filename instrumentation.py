@@ -0,0 +1,249 @@
+"""
+Необязательные замеры горячих путей: время методов Database и обработчиков интерфейса,
+количество SQL-запросов и фиксаций.
+
+Замеры включаются переменной окружения PASSGEN_PROFILE=1 (или флагом --profile
+у PasswordGeneratorV2.py) и вызовом install() до создания окон. Пока install() не вызван,
+ничего не оборачивается и трассировка SQL не включается, поэтому выключенные замеры
+ничего не стоят. Время копится в гистограммах с корзинами по степеням двойки
+(микросекунды): запись — несколько сложений, память не растет с числом вызовов.
+Результаты можно выгрузить в JSON (export_json, или автоматически при выходе в файл
+из PASSGEN_PROFILE_OUTPUT) и посмотреть в окне debug_panel.DebugPanel.
+
+Модуль не импортирует PySide6, пока не включены замеры интерфейса (install(gui=True)),
+а inspect и json — пока замеры не включены: консольная утилита импортирует его при каждом запуске.
+"""
+import atexit
+import functools
+import os
+import threading
+from time import perf_counter
+
+ENV_VAR = "PASSGEN_PROFILE"
+OUTPUT_ENV_VAR = "PASSGEN_PROFILE_OUTPUT"
+# Корзина i гистограммы — длительности меньше 2**i мкс (последняя — все более долгие)
+BUCKETS = 32
+# Методы Database, которые не замеряются: менеджеры контекста (время их создания ничего
+# не говорит, а транзакции видны по фиксациям) и обработчик триггеров кэша (вызывается на каждую строку)
+SKIPPED_METHODS = frozenset(("transaction", "savepoint", "cache_changed"))
+
+
+class Histogram:
+    """Распределение длительностей по корзинам степеней двойки микросекунд."""
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * BUCKETS
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Верхняя граница корзины, в которую попадает доля fraction вызовов (в секундах)."""
+        rank = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(2 ** i / 1e6, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "min_ms": self.min * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "buckets_us": {f"<{2 ** i}": count for i, count in enumerate(self.buckets) if count},
+        }
+
+
+class Profiler:
+    """Гистограммы времени по именам и счетчики; запись возможна из любого потока."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def record(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+
+    def snapshot(self):
+        """Текущие результаты: {"timings": {имя: статистика}, "counters": {имя: значение}}."""
+        with self.lock:
+            return {
+                "timings": {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def export_json(self, path):
+        import json
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+
+profiler = Profiler()
+_installed = set()  # Что уже обернуто: "database", "gui"
+
+
+def enabled():
+    return bool(_installed)
+
+
+def env_enabled():
+    return os.environ.get(ENV_VAR, "") not in ("", "0")
+
+
+def timed(name, function):
+    """Оборачивает функцию замером времени; у генератора замеряется весь перебор."""
+    import inspect
+    if inspect.isgeneratorfunction(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                yield from function(*args, **kwargs)
+            finally:
+                profiler.record(name, perf_counter() - start)
+    else:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record(name, perf_counter() - start)
+    return wrapper
+
+
+class SqlTrace:
+    """
+    Обработчик трассировки соединения: считает запросы (без запросов внутри триггеров) и фиксации.
+    Кроме COMMIT, транзакцию фиксирует RELEASE точки сохранения, которая сама ее начала
+    (SAVEPOINT без открытой транзакции), поэтому для соединения хранится стек точек сохранения.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.savepoints = []  # (имя, начала ли точка транзакцию)
+
+    def __call__(self, statement):
+        if statement.startswith("--"):
+            return  # Запрос программы триггера
+        profiler.count("sql_statements")
+        words = statement.split(None, 3)
+        command = words[0].upper() if words else ""
+        if command in ("COMMIT", "END"):
+            self.savepoints.clear()
+            profiler.count("commits")
+        elif command == "ROLLBACK" and (len(words) < 2 or words[1].upper() == "TRANSACTION"):
+            self.savepoints.clear()
+        elif command == "SAVEPOINT" and len(words) > 1:
+            # Обработчик вызывается до выполнения запроса: in_transaction — состояние до SAVEPOINT
+            self.savepoints.append((words[1].lower(), not self.conn.in_transaction))
+        elif command == "RELEASE" and len(words) > 1:
+            name = (words[2] if words[1].upper() == "SAVEPOINT" and len(words) > 2 else words[1]).lower()
+            # RELEASE снимает самую позднюю точку с этим именем и все более поздние
+            for i in range(len(self.savepoints) - 1, -1, -1):
+                if self.savepoints[i][0] == name:
+                    started = self.savepoints[i][1]
+                    del self.savepoints[i:]
+                    if started:
+                        profiler.count("commits")
+                    break
+
+
+def instrument_methods(cls, names=None, skip=()):
+    """Оборачивает методы класса (все открытые, если names не задан)."""
+    import inspect
+    if names is None:
+        names = [
+            name for name, value in vars(cls).items()
+            if inspect.isfunction(value) and not name.startswith("_") and name not in skip
+        ]
+    for name in names:
+        setattr(cls, name, timed(f"{cls.__name__}.{name}", getattr(cls, name)))
+
+
+def install_database():
+    import database
+    import db_worker
+
+    Database = database.Database
+    # Запоминаем, какие методы выполнялись общей транзакцией, до того как они будут обернуты
+    group_commit = [name for name, value in vars(Database).items() if value in db_worker.GROUP_COMMIT]
+    instrument_methods(Database, skip=SKIPPED_METHODS)
+    db_worker.GROUP_COMMIT = frozenset(getattr(Database, name) for name in group_commit)
+
+    init = Database.__init__
+
+    @functools.wraps(init)
+    def traced_init(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        self.conn.set_trace_callback(SqlTrace(self.conn))
+
+    Database.__init__ = traced_init
+
+
+def install_gui():
+    import batch_window
+    import saved_data_window
+    import ui
+
+    instrument_methods(ui.PasswordGeneratorApp, ["generate_password", "save_data"])
+    instrument_methods(saved_data_window.SavedDataWindow, ["load_data", "filter_table", "save_changes"])
+    # apply_stylesheet импортирован в модули окон по имени: заменяем его там
+    stylesheet = timed("apply_stylesheet", ui.apply_stylesheet)
+    for module in (ui, saved_data_window, batch_window):
+        module.apply_stylesheet = stylesheet
+
+
+def install(gui=True):
+    """
+    Включает замеры: методы Database и (если gui) обработчики окон. Вызывается до создания
+    баз и окон, потому что сигналы связываются с методами, которые были на момент связывания.
+    """
+    if "database" not in _installed:
+        install_database()
+        _installed.add("database")
+        output = os.environ.get(OUTPUT_ENV_VAR)
+        if output:
+            atexit.register(profiler.export_json, output)
+    if gui and "gui" not in _installed:
+        install_gui()
+        _installed.add("gui")
+
+
+def install_from_env(gui=True):
+    """Включает замеры, если задана переменная PASSGEN_PROFILE. Возвращает, включены ли они."""
+    if env_enabled():
+        install(gui)
+    return enabled()
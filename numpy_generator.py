@@ -0,0 +1,126 @@
+"""
+Векторизованная генерация паролей на NumPy.
+
+Пароли строятся как матрица N×L байтов (uint8) из одного буфера случайных байтов
+и превращаются в строки только по запросу. Если NumPy не установлен,
+generate_passwords использует обычный движок из password_generator.
+"""
+import password_generator
+from entropy import get_default_source
+from password_generator import PasswordGenerationError
+
+try:
+    import numpy as np
+except ImportError:  # NumPy — необязательная зависимость
+    np = None
+
+# Ограничение на объем ключей сортировки, создаваемых за один раз (элементов)
+MAX_BLOCK_CHARS = 1 << 22
+
+
+def available():
+    """Возвращает True, если NumPy установлен."""
+    return np is not None
+
+
+def _fill_classes(matrix, policy, source):
+    """
+    Заполняет столбцы матрицы символами: сначала цифры, затем буквы и символы.
+    Случайные байты для всех классов берутся из одного буфера источника.
+    """
+    n = matrix.shape[0]
+    # Ожидаемое количество байтов с учетом доли отклоненных значений
+    needed = [n * count * 256 // tables[2] + 64 if count else 0 for tables, count in zip(policy.tables, policy.counts)]
+    buffer = np.frombuffer(source.read(sum(needed)), dtype=np.uint8)
+
+    offset = 0
+    position = 0
+    for tables, count, size in zip(policy.tables, policy.counts, needed):
+        if not count:
+            continue
+        table = np.frombuffer(tables[0], dtype=np.uint8)
+        limit = tables[2]
+        accepted = buffer[position:position + size]
+        position += size
+        accepted = accepted[accepted < limit]
+        # Редкий случай: отклонено больше байтов, чем ожидалось
+        while accepted.size < n * count:
+            extra = np.frombuffer(source.read(size), dtype=np.uint8)
+            accepted = np.concatenate((accepted, extra[extra < limit]))
+        matrix[:, offset:offset + count] = table[accepted[:n * count]].reshape(n, count)
+        offset += count
+
+
+def _shuffle_rows(matrix, source):
+    """Перемешивает каждую строку матрицы независимо с помощью случайных ключей сортировки."""
+    n, length = matrix.shape
+    block = max(1, MAX_BLOCK_CHARS // length)
+    for start in range(0, n, block):
+        rows = matrix[start:start + block]
+        keys = np.frombuffer(source.read(8 * rows.size), dtype=np.uint64).reshape(rows.shape)
+        rows[:] = np.take_along_axis(rows, np.argsort(keys, axis=1), axis=1)
+
+
+def _excluded_mask(chars):
+    """Таблица из 256 флагов: True для запрещенных символов."""
+    mask = np.zeros(256, dtype=bool)
+    mask[[ord(ch) for ch in chars]] = True
+    return mask
+
+
+def _generate_rows(n, policy, source):
+    matrix = np.empty((n, policy.password_length), dtype=np.uint8)
+    _fill_classes(matrix, policy, source)
+    if max(policy.counts) != policy.password_length:
+        # Если используется один тип символов, перемешивание ничего не меняет
+        _shuffle_rows(matrix, source)
+    return matrix
+
+
+def generate_password_matrix(n, policy, source=None):
+    """
+    Возвращает матрицу n×L (uint8) с кодами символов паролей по политике PasswordPolicy.
+    Количество символов каждого типа совпадает с generate_password_with_counts,
+    строки с запрещенным первым/последним символом генерируются заново.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is not installed")
+    if n < 0:
+        raise PasswordGenerationError("batch")
+
+    length = policy.password_length
+    if not n or not length:
+        return np.empty((n, length), dtype=np.uint8)
+
+    source = source or get_default_source()
+    matrix = _generate_rows(n, policy, source)
+    if not policy.has_position_rules:
+        return matrix
+
+    first_mask = _excluded_mask(policy.first_excluded)
+    last_mask = _excluded_mask(policy.last_excluded)
+    rejected = np.flatnonzero(first_mask[matrix[:, 0]] | last_mask[matrix[:, -1]])
+    while rejected.size:
+        replacement = _generate_rows(rejected.size, policy, source)
+        matrix[rejected] = replacement
+        rejected = rejected[first_mask[replacement[:, 0]] | last_mask[replacement[:, -1]]]
+    return matrix
+
+
+def decode_passwords(matrix, start=0, stop=None):
+    """Преобразует строки матрицы [start, stop) в список строк."""
+    rows = matrix[start:stop]
+    length = rows.shape[1]
+    if not length:
+        return [""] * rows.shape[0]
+    text = rows.tobytes().decode("latin-1")
+    return [text[i:i + length] for i in range(0, len(text), length)]
+
+
+def generate_passwords(n, policy, source=None):
+    """
+    Генерирует список из n паролей на NumPy, а без NumPy — обычным движком.
+    """
+    if np is None:
+        return password_generator.generate_passwords(n, policy, source)
+    return decode_passwords(generate_password_matrix(n, policy, source))
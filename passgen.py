@@ -0,0 +1,323 @@
+"""
+Консольный генератор паролей без графического интерфейса.
+
+Пример: python -m passgen generate --length 32 --count 100000 --digits 4
+
+Модуль не импортирует PySide6, поэтому запускается за несколько десятков миллисекунд.
+Модули базы, импорта/экспорта и пула процессов импортируются только командами,
+которые с ними работают: обычная генерация их не загружает. Модуль замеров легкий
+и загружает базу только при включенных замерах.
+"""
+import argparse
+import getpass
+import os
+import sys
+import time
+
+from password_generator import PasswordGenerationError, PasswordPolicy, generate_passwords
+
+# Переменная окружения с мастер-паролем зашифрованной базы (иначе он запрашивается с терминала)
+MASTER_PASSWORD_ENV = "PASSGEN_MASTER_PASSWORD"
+
+# Сколько паролей генерируется и выводится за один раз
+CHUNK_SIZE = 65536
+# Начиная с какого объема вывода (символов) режим auto использует NumPy:
+# для коротких запусков импорт NumPy дольше самой генерации
+NUMPY_MIN_CHARS = 1 << 20
+
+# Названия классов символов в командной строке -> классы PasswordPolicy
+CLASS_NAMES = {"digits": "numbers", "letters": "letters", "symbols": "symbols"}
+
+
+def non_negative_int(text):
+    """Тип аргумента argparse: целое число не меньше 0."""
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError("must be a non-negative integer")
+    return value
+
+
+def vault_format(text):
+    """Тип аргумента argparse: формат файла из vault_io.FORMATS."""
+    from vault_io import FORMATS
+    if text not in FORMATS:
+        raise argparse.ArgumentTypeError(f"must be one of {', '.join(FORMATS)}")
+    return text
+
+
+def on_conflict_rule(text):
+    """Тип аргумента argparse: правило из database.ON_CONFLICT."""
+    from database import ON_CONFLICT
+    if text not in ON_CONFLICT:
+        raise argparse.ArgumentTypeError(f"must be one of {', '.join(ON_CONFLICT)}")
+    return text
+
+
+def name_template(text):
+    """Тип аргумента argparse: шаблон сайта или логина, в котором можно использовать только {n}."""
+    try:
+        text.format(n=1)
+    except (KeyError, IndexError, ValueError, AttributeError, TypeError):
+        raise argparse.ArgumentTypeError("a template may only contain {n}") from None
+    return text
+
+
+def add_policy_arguments(parser, default_length):
+    """Добавляет параметры PasswordPolicy и источника энтропии."""
+    parser.add_argument("--length", type=int, default=default_length, help=f"password length (default: {default_length})")
+    parser.add_argument("--digits", type=non_negative_int, help="exact number of digits")
+    parser.add_argument("--letters", type=non_negative_int, help="exact number of letters")
+    parser.add_argument("--symbols", type=non_negative_int, help="exact number of symbols")
+    parser.add_argument("--no-digits", dest="use_digits", action="store_false", help="do not use digits")
+    parser.add_argument("--no-letters", dest="use_letters", action="store_false", help="do not use letters")
+    parser.add_argument("--no-symbols", dest="use_symbols", action="store_false", help="do not use symbols")
+    parser.add_argument("--exclude-ambiguous", action="store_true", help="exclude look-alike characters such as 0/O and 1/l")
+    parser.add_argument("--min-digits", type=non_negative_int, default=0, help="minimum number of digits")
+    parser.add_argument("--min-letters", type=non_negative_int, default=0, help="minimum number of letters")
+    parser.add_argument("--min-symbols", type=non_negative_int, default=0, help="minimum number of symbols")
+    parser.add_argument("--digit-chars", help="custom alphabet for digits")
+    parser.add_argument("--letter-chars", help="custom alphabet for letters")
+    parser.add_argument("--symbol-chars", help="custom alphabet for symbols")
+    parser.add_argument(
+        "--forbid-first", action="append", choices=CLASS_NAMES, default=[],
+        help="character class that must not start a password (repeatable)"
+    )
+    parser.add_argument(
+        "--forbid-last", action="append", choices=CLASS_NAMES, default=[],
+        help="character class that must not end a password (repeatable)"
+    )
+    parser.add_argument(
+        "--entropy", choices=("system", "urandom", "drbg"), default="system",
+        help="entropy source: os.urandom, buffered os.urandom or userspace DRBG (default: system)"
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="passgen", description="Password generator (headless).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="generate passwords and print them to stdout")
+    add_policy_arguments(generate, 16)
+    generate.add_argument("--count", type=non_negative_int, default=1, help="number of passwords (default: 1)")
+    generate.add_argument(
+        "--backend", choices=("auto", "python", "numpy"), default="auto",
+        help="generation engine; auto uses NumPy for large outputs when it is installed (default: auto)"
+    )
+    generate.add_argument("--workers", type=int, default=1, help="number of worker processes (default: 1)")
+    generate.add_argument("--output", help="write passwords to this file instead of stdout")
+    generate.add_argument("--db", metavar="NAME", help="save passwords to this database in the data folder")
+    generate.add_argument("--site", type=name_template, default="", help="site for saved passwords; {n} is replaced with the number")
+    generate.add_argument("--login", type=name_template, default="", help="login for saved passwords; {n} is replaced with the number")
+    generate.set_defaults(handler=cmd_generate)
+
+    secret = commands.add_parser("secret", help="stream one long secret (e.g. key material) with bounded memory")
+    add_policy_arguments(secret, 1 << 20)
+    target = secret.add_mutually_exclusive_group()
+    target.add_argument("--output", help="write the secret to this file instead of stdout")
+    target.add_argument("--fd", type=non_negative_int, help="write the secret to this file descriptor")
+    secret.set_defaults(handler=cmd_secret)
+
+    vault_import = commands.add_parser("import", help="import entries from CSV, JSONL, Bitwarden or KeePass CSV (.gz supported)")
+    vault_import.add_argument("path", help="file to import")
+    vault_import.add_argument("--db", metavar="NAME", default="passwords.db", help="database in the data folder (default: passwords.db)")
+    vault_import.add_argument(
+        "--format", type=vault_format, help="csv, jsonl, bitwarden or keepass (default: by extension; CSV flavour by header)"
+    )
+    vault_import.add_argument(
+        "--on-conflict", type=on_conflict_rule, default="reject",
+        help="reject, overwrite or keep_both: what to do with entries whose site and login are already saved (default: reject)"
+    )
+    vault_import.set_defaults(handler=cmd_import)
+
+    vault_export = commands.add_parser("export", help="export saved entries to CSV, JSONL, Bitwarden or KeePass CSV (.gz supported)")
+    vault_export.add_argument("path", help="file to write")
+    vault_export.add_argument("--db", metavar="NAME", default="passwords.db", help="database in the data folder (default: passwords.db)")
+    vault_export.add_argument("--format", type=vault_format, help="csv, jsonl, bitwarden or keepass (default: by extension)")
+    vault_export.set_defaults(handler=cmd_export)
+
+    return parser
+
+
+def policy_from_args(args):
+    return PasswordPolicy(
+        args.length, args.use_digits, args.use_letters, args.use_symbols,
+        args.digits, args.letters, args.symbols,
+        exclude_ambiguous=args.exclude_ambiguous,
+        alphabets=(args.digit_chars, args.letter_chars, args.symbol_chars),
+        min_counts=(args.min_digits, args.min_letters, args.min_symbols),
+        forbidden_first=[CLASS_NAMES[name] for name in args.forbid_first],
+        forbidden_last=[CLASS_NAMES[name] for name in args.forbid_last],
+    )
+
+
+def use_numpy(args):
+    """Определяет, генерировать ли пароли на NumPy."""
+    if args.backend == "python":
+        return False
+    if args.backend == "auto" and args.count * args.length < NUMPY_MIN_CHARS:
+        return False
+    import numpy_generator
+    if not numpy_generator.available():
+        if args.backend == "numpy":
+            raise SystemExit("passgen: error: NumPy is not installed")
+        return False
+    return True
+
+
+def iter_local_chunks(args, policy, numpy_backend):
+    """Генерирует пароли в текущем процессе порциями-строками, по паролю в строке."""
+    import entropy
+    source = entropy.create_source(args.entropy)
+    remaining = args.count
+    if numpy_backend:
+        import numpy_generator
+        np = numpy_generator.np
+    while remaining > 0:
+        chunk = min(CHUNK_SIZE, remaining)
+        if numpy_backend:
+            # Добавляем к матрице столбец с переводом строки и декодируем ее целиком
+            matrix = numpy_generator.generate_password_matrix(chunk, policy, source)
+            lines = np.empty((chunk, matrix.shape[1] + 1), dtype=matrix.dtype)
+            lines[:, :-1] = matrix
+            lines[:, -1] = ord("\n")
+            yield lines.tobytes().decode("latin-1")[:-1]
+        else:
+            yield "\n".join(generate_passwords(chunk, policy, source))
+        remaining -= chunk
+
+
+def open_database(name, readonly=False):
+    """
+    Открывает базу из папки data (readonly — соединением только для чтения);
+    для зашифрованной базы вводится мастер-пароль.
+    """
+    from database import Database
+    db = Database(name, readonly=readonly)
+    if db.encrypted:
+        try:
+            db.unlock(os.environ.get(MASTER_PASSWORD_ENV) or getpass.getpass("Master password: "))
+        except BaseException:
+            db.close()
+            raise
+    return db
+
+
+def cmd_generate(args):
+    """Генерирует пароли порциями и сразу выводит их, не накапливая в памяти."""
+    import generation_pool
+    policy = policy_from_args(args)
+    numpy_backend = use_numpy(args)
+
+    if args.workers > 1:
+        chunks = generation_pool.iter_text_chunks(
+            args.count, policy, args.workers, CHUNK_SIZE, backend="numpy" if numpy_backend else "python", source_name=args.entropy
+        )
+    else:
+        chunks = iter_local_chunks(args, policy, numpy_backend)
+
+    if args.db:
+        db = open_database(args.db)
+        try:
+            saved, reused = generation_pool.save_chunks(chunks, db, args.site, args.login)
+        finally:
+            db.close()
+        if reused:
+            print(f"{reused:,} of {saved:,} passwords were already in use", file=sys.stderr)
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            generation_pool.write_chunks(chunks, out)
+    else:
+        generation_pool.write_chunks(chunks, sys.stdout)
+
+
+def cmd_secret(args):
+    """Записывает один длинный секрет порциями, без перевода строки в конце."""
+    import entropy
+    from password_generator import stream_secret
+    policy = policy_from_args(args)
+    source = entropy.create_source(args.entropy)
+
+    if args.fd is not None:
+        stream_secret(policy, args.fd, source=source)
+    elif args.output:
+        with open(args.output, "wb") as out:
+            stream_secret(policy, out, source=source)
+    else:
+        sys.stdout.flush()
+        stream_secret(policy, sys.stdout.buffer, source=source)
+        sys.stdout.buffer.flush()
+
+
+def report_progress(action, count, start):
+    """Печатает в stderr количество обработанных записей и скорость."""
+    elapsed = time.perf_counter() - start
+    print(f"\r{action}: {count:,} rows, {count / elapsed if elapsed else 0:,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+
+def cmd_import(args):
+    """Импортирует записи из файла порциями, по транзакции на порцию."""
+    import vault_io
+    db = open_database(args.db)
+    start = time.perf_counter()
+    try:
+        read, saved = vault_io.import_file(
+            db, args.path, args.format, args.on_conflict,
+            progress=lambda read, saved: report_progress("read", read, start)
+        )
+    finally:
+        db.close()
+    report_progress("read", read, start)
+    print(f"\nsaved {saved:,} of {read:,} entries", file=sys.stderr)
+
+
+def cmd_export(args):
+    """Выгружает записи в файл, читая их из базы порциями."""
+    import vault_io
+    db = open_database(args.db, readonly=True)
+    start = time.perf_counter()
+    try:
+        count = vault_io.export_file(
+            db, args.path, args.format, progress=lambda count: report_progress("written", count, start)
+        )
+    finally:
+        db.close()
+    report_progress("written", count, start)
+    print(file=sys.stderr)
+
+
+def expected_errors():
+    """
+    Ошибки, о которых достаточно сообщения без traceback. Модули базы импортируются
+    только при обработке исключения, чтобы не замедлять запуск.
+    """
+    import sqlite3
+    from vault_crypto import InvalidMasterPasswordError, VaultLockedError
+    from vault_io import VaultFormatError
+    return VaultFormatError, VaultLockedError, InvalidMasterPasswordError, sqlite3.Error, OSError
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # PASSGEN_PROFILE=1: замеры методов Database, результаты — в файл из PASSGEN_PROFILE_OUTPUT
+    import instrumentation
+    instrumentation.install_from_env(gui=False)
+    try:
+        args.handler(args)
+    except PasswordGenerationError as e:
+        parser.exit(2, f"{parser.prog}: error: {e.translate('en')}\n")
+    except BrokenPipeError:
+        # Вывод передан в head и т.п.: перенаправляем stdout в devnull,
+        # чтобы Python не выдал ошибку при завершении
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    except Exception as e:
+        if not isinstance(e, expected_errors()):
+            raise
+        parser.exit(2, f"{parser.prog}: error: {e}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,134 @@
-import secrets
+import io
+import os
 import string
-from PySide6.QtWidgets import QMessageBox
+from array import array
+from functools import lru_cache
 
-def generate_password(length_input, numbers_check, letters_check, symbols_check, numbers_count_input, letters_count_input, symbols_count_input, language, parent):
+from entropy import get_default_source
+
+# Классы символов и их алфавиты по умолчанию: цифры, буквы, символы
+CLASSES = ("numbers", "letters", "symbols")
+ALPHABETS = (string.digits, string.ascii_letters, string.punctuation)
+
+# Символы, которые легко перепутать при чтении пароля
+AMBIGUOUS_CHARACTERS = "0Oo1lI|`'\""
+
+# Максимальное количество паролей в одной порции пакетной генерации:
+# номер пароля в порции должен помещаться в 2 старших байта ключа сортировки
+MAX_BATCH = 1 << 16
+# Ограничение на объем одной порции (символов), чтобы длинные пароли не раздували память
+MAX_BATCH_CHARS = 1 << 20
+# Размер порции при потоковой записи длинных секретов (символов)
+STREAM_CHUNK = 1 << 16
+
+class PasswordGenerationError(ValueError):
+    """Ошибка параметров генерации. Текст сообщения доступен на русском и английском."""
+
+    MESSAGES = {
+        "ru": {
+            "length": "Введите корректную длину пароля (целое число больше 0).",
+            "types": "Выберите хотя бы один тип символов.",
+            "count": "Количество символов должно быть целым неотрицательным числом.",
+            "total": "Сумма заданных количеств символов превышает длину пароля.",
+            "batch": "Количество паролей не может быть отрицательным.",
+            "minimum": "Минимальное количество символов нельзя выполнить при заданной длине и количествах.",
+            "alphabet": "Алфавит должен содержать печатные символы Latin-1 без пробелов и не пересекаться с другими алфавитами.",
+            "position": "Ограничения на первый и последний символ нельзя выполнить."
+        },
+        "en": {
+            "length": "Please enter a valid password length (integer greater than 0).",
+            "types": "Please select at least one type of symbols.",
+            "count": "The number of characters must be a non-negative integer.",
+            "total": "The sum of the specified character counts exceeds the password length.",
+            "batch": "The number of passwords cannot be negative.",
+            "minimum": "The minimum character counts cannot be met with the given length and counts.",
+            "alphabet": "An alphabet must consist of printable Latin-1 characters without spaces and must not overlap other alphabets.",
+            "position": "The first and last character restrictions cannot be met."
+        }
+    }
+
+    def __init__(self, key):
+        self.key = key
+        super().__init__(self.MESSAGES["ru"][key])
+
+    def translate(self, language):
+        """Возвращает текст ошибки на нужном языке."""
+        return self.MESSAGES.get(language, self.MESSAGES["en"])[self.key]
+
+def parse_count(text):
+    """Преобразует текст поля количества в число (None, если поле пустое)."""
+    if not text:
+        return None
+    try:
+        count = int(text)
+    except ValueError:
+        raise PasswordGenerationError("count") from None
+    if count < 0:
+        raise PasswordGenerationError("count")
+    return count
+
+def policy_from_inputs(length_input, numbers_check, letters_check, symbols_check, numbers_count_input, letters_count_input, symbols_count_input):
     """
-    Генерирует пароль на основе введенных параметров.
+    Создает PasswordPolicy по значениям полей ввода.
+    При некорректных параметрах выбрасывает PasswordGenerationError.
     """
     try:
         length = int(length_input.text())
-        if length <= 0:
-            raise ValueError("Длина пароля должна быть больше 0.")
     except ValueError:
-        QMessageBox.critical(parent, "Ошибка", "Введите корректную длину пароля (целое число больше 0)." if language == "ru" else "Please enter a valid password length (integer greater than 0).")
-        return ""
+        raise PasswordGenerationError("length") from None
 
     use_numbers = numbers_check.isChecked()
     use_letters = letters_check.isChecked()
     use_symbols = symbols_check.isChecked()
 
-    if not (use_numbers or use_letters or use_symbols):
-        QMessageBox.critical(parent, "Ошибка", "Выберите хотя бы один тип символов." if language == "ru" else "Please select at least one type of symbols.")
-        return ""
-
-    # Получаем количество цифр, букв и символов из полей ввода
-    numbers_count = numbers_count_input.text()
-    letters_count = letters_count_input.text()
-    symbols_count = symbols_count_input.text()
-
     # Если поля пустые, количество будет задано автоматически
-    numbers_count = int(numbers_count) if numbers_count else None
-    letters_count = int(letters_count) if letters_count else None
-    symbols_count = int(symbols_count) if symbols_count else None
+    numbers_count = parse_count(numbers_count_input.text())
+    letters_count = parse_count(letters_count_input.text())
+    symbols_count = parse_count(symbols_count_input.text())
 
-    # Генерация пароля
-    password = generate_password_with_counts(length, use_numbers, use_letters, use_symbols, numbers_count, letters_count, symbols_count, parent)
-    return password
+    return PasswordPolicy(length, use_numbers, use_letters, use_symbols, numbers_count, letters_count, symbols_count)
+
+def generate_password(length_input, numbers_check, letters_check, symbols_check, numbers_count_input, letters_count_input, symbols_count_input):
+    """
+    Генерирует пароль на основе введенных параметров.
+    При некорректных параметрах выбрасывает PasswordGenerationError.
+    """
+    return policy_from_inputs(
+        length_input, numbers_check, letters_check, symbols_check,
+        numbers_count_input, letters_count_input, symbols_count_input
+    ).generate()
 
-def generate_password_with_counts(length, use_numbers, use_letters, use_symbols, numbers_count=None, letters_count=None, symbols_count=None, parent=None):
+def generate_password_with_counts(length, use_numbers, use_letters, use_symbols, numbers_count=None, letters_count=None, symbols_count=None, source=None):
     """
     Генерирует пароль с учетом заданного количества цифр, букв и символов.
+    Случайные числа берутся из source (по умолчанию — entropy.get_default_source).
     """
+    counts = class_counts(length, use_numbers, use_letters, use_symbols, numbers_count, letters_count, symbols_count)
+    source = source or get_default_source()
+
     characters = []
-    
+
+    # Наполняем список символов
+    for alphabet, count in zip(ALPHABETS, counts):
+        characters.extend(alphabet[source.randbelow(len(alphabet))] for _ in range(count))
+
+    # Перемешиваем символы для случайного порядка (тасование Фишера — Йетса)
+    for i in range(len(characters) - 1, 0, -1):
+        j = source.randbelow(i + 1)
+        characters[i], characters[j] = characters[j], characters[i]
+
+    return ''.join(characters)
+
+def class_counts(length, use_numbers, use_letters, use_symbols, numbers_count=None, letters_count=None, symbols_count=None):
+    """
+    Возвращает количество цифр, букв и символов в пароле (в порядке ALPHABETS).
+    Проверяет параметры и выбрасывает PasswordGenerationError при ошибке.
+    """
+    if length <= 0:
+        raise PasswordGenerationError("length")
+    if not (use_numbers or use_letters or use_symbols):
+        raise PasswordGenerationError("types")
+
     # Определяем количество каждого типа символов
     specified_counts = {
         "numbers": numbers_count if numbers_count is not None else 0,
@@ -60,8 +147,7 @@ def generate_password_with_counts(length, use_numbers, use_letters, use_symbols,
     
     # Проверяем, не превышает ли сумма длину пароля
     if total_specified > length:
-        QMessageBox.critical(parent, "Ошибка", "Сумма заданных количеств символов превышает длину пароля.")
-        return ""
+        raise PasswordGenerationError("total")
     
     # Определяем оставшееся количество символов, которые нужно распределить
     remaining_length = length - total_specified
@@ -77,15 +163,385 @@ def generate_password_with_counts(length, use_numbers, use_letters, use_symbols,
         for i, t in enumerate(unspecified_types):
             specified_counts[t] = add_per_type + (1 if i < extra else 0)  # Распределяем остатки
     
-    # Наполняем список символов
-    if used_types["numbers"]:
-        characters.extend(secrets.choice(string.digits) for _ in range(specified_counts["numbers"]))
-    if used_types["letters"]:
-        characters.extend(secrets.choice(string.ascii_letters) for _ in range(specified_counts["letters"]))
-    if used_types["symbols"]:
-        characters.extend(secrets.choice(string.punctuation) for _ in range(specified_counts["symbols"]))
-
-    # Перемешиваем символы для случайного порядка
-    secrets.SystemRandom().shuffle(characters)
-    
-    return ''.join(characters)
\ No newline at end of file
+    # Неиспользуемые типы в пароль не попадают
+    return [specified_counts[t] if used_types[t] else 0 for t in CLASSES]
+
+def _per_class(value, default):
+    """Приводит словарь {класс: значение} или последовательность из трех значений к кортежу."""
+    if value is None:
+        return (default,) * len(CLASSES)
+    if isinstance(value, dict):
+        unknown = set(value) - set(CLASSES)
+        if unknown:
+            raise KeyError(f"Unknown character class: {unknown.pop()}")
+        return tuple(value.get(name, default) for name in CLASSES)
+    return tuple(value)
+
+def _apply_minimums(counts, exact_counts, flags, min_counts):
+    """
+    Поднимает количество символов класса до минимума, забирая по одному символу
+    у классов с наибольшим запасом. Явно заданные количества не меняются.
+    """
+    counts = list(counts)
+    for i, minimum in enumerate(min_counts):
+        if minimum < 0 or (minimum and not flags[i]):
+            raise PasswordGenerationError("minimum")
+        while counts[i] < minimum:
+            donors = [j for j in range(len(CLASSES)) if j != i and not exact_counts[j] and counts[j] > min_counts[j]]
+            if exact_counts[i] or not donors:
+                raise PasswordGenerationError("minimum")
+            donor = max(donors, key=lambda j: counts[j] - min_counts[j])
+            counts[donor] -= 1
+            counts[i] += 1
+    return tuple(counts)
+
+def _effective_alphabet(alphabet, exclude_ambiguous):
+    """Убирает повторы (и неоднозначные символы) из алфавита и проверяет его."""
+    if exclude_ambiguous:
+        alphabet = "".join(ch for ch in alphabet if ch not in AMBIGUOUS_CHARACTERS)
+    alphabet = "".join(dict.fromkeys(alphabet))
+    if any(ord(ch) > 255 or ch.isspace() or not ch.isprintable() for ch in alphabet):
+        raise PasswordGenerationError("alphabet")
+    return alphabet
+
+class PasswordPolicy:
+    """
+    Неизменяемая скомпилированная политика генерации паролей.
+
+    Параметры проверяются один раз при создании: вычисляется план количества
+    символов каждого класса (counts) и таблицы выборки для алфавитов (tables),
+    поэтому генерация по политике не требует подготовки на каждый вызов.
+
+    Дополнительные ограничения (только именованные аргументы):
+    exclude_ambiguous — исключить похожие символы (AMBIGUOUS_CHARACTERS);
+    alphabets — свои алфавиты классов, например {"symbols": "!@#$%"};
+    min_counts — минимальное количество символов классов, например {"numbers": 2};
+    forbidden_first, forbidden_last — классы, которые не могут стоять первыми/последними.
+    """
+
+    __slots__ = (
+        "length", "use_numbers", "use_letters", "use_symbols",
+        "numbers_count", "letters_count", "symbols_count",
+        "exclude_ambiguous", "custom_alphabets", "min_counts", "forbidden_first", "forbidden_last",
+        "alphabets", "counts", "password_length", "tables", "first_excluded", "last_excluded"
+    )
+
+    def __init__(self, length, use_numbers=True, use_letters=True, use_symbols=True,
+                 numbers_count=None, letters_count=None, symbols_count=None, *,
+                 exclude_ambiguous=False, alphabets=None, min_counts=None, forbidden_first=(), forbidden_last=()):
+        custom_alphabets = _per_class(alphabets, None)
+        min_counts = _per_class(min_counts, 0)
+        forbidden_first = frozenset(forbidden_first)
+        forbidden_last = frozenset(forbidden_last)
+        if not (forbidden_first | forbidden_last) <= set(CLASSES):
+            raise KeyError(f"Unknown character class: {(forbidden_first | forbidden_last) - set(CLASSES)}")
+
+        flags = (use_numbers, use_letters, use_symbols)
+        exact_counts = (numbers_count, letters_count, symbols_count)
+
+        # План: сколько символов каждого класса будет в пароле
+        counts = class_counts(length, *flags, *exact_counts)
+        counts = _apply_minimums(counts, exact_counts, flags, min_counts)
+
+        # Алфавиты и таблицы выборки для используемых классов
+        effective = tuple(
+            _effective_alphabet(custom if custom is not None else default, exclude_ambiguous) if count else ""
+            for custom, default, count in zip(custom_alphabets, ALPHABETS, counts)
+        )
+        if any(count and not alphabet for alphabet, count in zip(effective, counts)):
+            raise PasswordGenerationError("alphabet")
+        if sum(len(alphabet) for alphabet in effective) != len(set("".join(effective))):
+            raise PasswordGenerationError("alphabet")
+
+        password_length = sum(counts)
+        _check_positions(counts, password_length, forbidden_first, forbidden_last)
+
+        values = {
+            "length": length, "use_numbers": use_numbers, "use_letters": use_letters, "use_symbols": use_symbols,
+            "numbers_count": numbers_count, "letters_count": letters_count, "symbols_count": symbols_count,
+            "exclude_ambiguous": exclude_ambiguous, "custom_alphabets": custom_alphabets, "min_counts": min_counts,
+            "forbidden_first": forbidden_first, "forbidden_last": forbidden_last,
+            "alphabets": effective, "counts": counts, "password_length": password_length,
+            "tables": tuple(_rejection_table(alphabet) if alphabet else None for alphabet in effective),
+            # Символы, с которых пароль не может начинаться / которыми не может заканчиваться
+            "first_excluded": frozenset("".join(a for a, name in zip(effective, CLASSES) if name in forbidden_first)),
+            "last_excluded": frozenset("".join(a for a, name in zip(effective, CLASSES) if name in forbidden_last)),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PasswordPolicy is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("PasswordPolicy is immutable")
+
+    def _arguments(self):
+        """Возвращает аргументы, с которыми была создана политика."""
+        args = (self.length, self.use_numbers, self.use_letters, self.use_symbols,
+                self.numbers_count, self.letters_count, self.symbols_count)
+        kwargs = {
+            "exclude_ambiguous": self.exclude_ambiguous,
+            "alphabets": self.custom_alphabets,
+            "min_counts": self.min_counts,
+            "forbidden_first": tuple(sorted(self.forbidden_first)),
+            "forbidden_last": tuple(sorted(self.forbidden_last)),
+        }
+        return args, kwargs
+
+    def __reduce__(self):
+        # Для передачи в процессы пула: политика заново компилируется при распаковке
+        return (_make_policy, self._arguments())
+
+    def __eq__(self, other):
+        if not isinstance(other, PasswordPolicy):
+            return NotImplemented
+        return self._arguments() == other._arguments()
+
+    def __hash__(self):
+        args, kwargs = self._arguments()
+        return hash((args, tuple(kwargs.items())))
+
+    def __repr__(self):
+        return f"PasswordPolicy(length={self.length}, counts={self.counts})"
+
+    @property
+    def has_position_rules(self):
+        """Есть ли ограничения на первый или последний символ."""
+        return bool(self.first_excluded or self.last_excluded)
+
+    def accepts(self, password):
+        """Проверяет ограничения на первый и последний символ."""
+        return not password or (password[0] not in self.first_excluded and password[-1] not in self.last_excluded)
+
+    def generate(self, source=None):
+        """Генерирует один пароль по политике."""
+        return generate_passwords(1, self, source)[0]
+
+def _make_policy(args, kwargs):
+    return PasswordPolicy(*args, **kwargs)
+
+def _check_positions(counts, password_length, forbidden_first, forbidden_last):
+    """Проверяет, что хотя бы одна расстановка удовлетворяет ограничениям на первый и последний символ."""
+    if not (forbidden_first or forbidden_last) or not password_length:
+        return
+    first = [i for i, name in enumerate(CLASSES) if counts[i] and name not in forbidden_first]
+    last = [i for i, name in enumerate(CLASSES) if counts[i] and name not in forbidden_last]
+    if password_length == 1:
+        feasible = any(i in last for i in first)
+    else:
+        feasible = any(a != b or counts[a] >= 2 for a in first for b in last)
+    if not feasible:
+        raise PasswordGenerationError("position")
+
+@lru_cache(maxsize=None)
+def _rejection_table(alphabet):
+    """
+    Строит таблицы для bytes.translate: байт b < limit отображается в alphabet[b % k],
+    остальные байты удаляются (несмещенная выборка с отклонением).
+    """
+    k = len(alphabet)
+    limit = 256 - 256 % k
+    table = bytes(ord(alphabet[b % k]) if b < limit else 0 for b in range(256))
+    return table, bytes(range(limit, 256)), limit
+
+def _random_chars(count, table, rejected, limit, source):
+    """Возвращает count равномерно распределенных символов алфавита (в виде bytes)."""
+    parts = []
+    received = 0
+    while received < count:
+        # Запрашиваем с запасом на отклоненные байты
+        chunk = source.read((count - received) * 256 // limit + 64).translate(table, rejected)
+        parts.append(chunk)
+        received += len(chunk)
+    return b''.join(parts)[:count]
+
+def _group_columns(batch, length):
+    """
+    Возвращает младший и старший байты номера пароля для каждой позиции порции.
+    Они записываются в старшие байты ключей сортировки, чтобы одна сортировка
+    перемешивала символы только внутри своего пароля.
+    """
+    total = batch * length
+    low = b''.join(bytes((x,)) * length for x in range(256))
+    low = (low * (total // len(low) + 1))[:total]
+    high = b''.join(bytes((x,)) * (256 * length) for x in range((batch + 255) // 256))[:total]
+    return low, high
+
+def _generate_batch(n, policy, columns, source):
+    """Генерирует порцию из n паролей по скомпилированной политике."""
+    length = policy.password_length
+    counts = policy.counts
+    total = n * length
+
+    # Раскладываем символы: в каждом пароле сначала цифры, затем буквы и символы
+    chars = bytearray(total)
+    offset = 0
+    for tables, count in zip(policy.tables, counts):
+        if not count:
+            continue
+        stream = _random_chars(n * count, *tables, source)
+        for i in range(count):
+            chars[offset + i::length] = stream[i::count]
+        offset += count
+
+    if max(counts) == length:
+        # Используется один тип символов: символы независимы, перемешивать нечего
+        password_chars = chars.decode("latin-1")
+    else:
+        # Ключ сортировки (little-endian): байт 0 — символ, байты 1-5 — случайные,
+        # байты 6-7 — номер пароля. Одна сортировка перемешивает все пароли порции.
+        keys = bytearray(source.read(8 * total))
+        keys[0::8] = chars
+        keys[6::8] = columns[0][:total]
+        keys[7::8] = columns[1][:total]
+        shuffled = sorted(memoryview(keys).cast("Q").tolist())
+        password_chars = array("Q", shuffled).tobytes()[0::8].decode("latin-1")
+
+    return [password_chars[i:i + length] for i in range(0, total, length)]
+
+def generate_passwords(n, policy, source=None):
+    """
+    Генерирует список из n паролей по политике PasswordPolicy.
+    Случайные байты берутся большими блоками из source (по умолчанию —
+    os.urandom, см. entropy.get_default_source), количество
+    символов каждого типа совпадает с generate_password_with_counts.
+    Пароли, нарушающие ограничения на первый/последний символ, отбрасываются
+    и генерируются заново, поэтому подходящие расстановки равновероятны.
+    """
+    if n < 0:
+        raise PasswordGenerationError("batch")
+
+    length = policy.password_length
+    if not length:
+        return [""] * n
+
+    source = source or get_default_source()
+    batch = max(1, min(MAX_BATCH, MAX_BATCH_CHARS // length, n))
+    columns = _group_columns(batch, length)
+
+    passwords = []
+    while len(passwords) < n:
+        chunk = _generate_batch(min(batch, n - len(passwords)), policy, columns, source)
+        if policy.has_position_rules:
+            chunk = [password for password in chunk if policy.accepts(password)]
+        passwords.extend(chunk)
+    return passwords
+
+def _choose(weights, source):
+    """Выбирает индекс с вероятностью, пропорциональной весу."""
+    value = source.randbelow(sum(weights))
+    for index, weight in enumerate(weights):
+        if value < weight:
+            return index
+        value -= weight
+
+def _reserve_ends(policy, remaining, source):
+    """
+    Выбирает классы первого и последнего символов с учетом ограничений и
+    исключает их из remaining. Вероятности выбора такие же, как у равномерно
+    случайной допустимой расстановки. Без ограничений возвращает (None, None).
+    """
+    if not policy.has_position_rules:
+        return None, None
+    classes = range(len(CLASSES))
+    allowed_first = [CLASSES[i] not in policy.forbidden_first for i in classes]
+    allowed_last = [CLASSES[i] not in policy.forbidden_last for i in classes]
+
+    if sum(remaining) == 1:
+        only = _choose([remaining[i] if allowed_first[i] and allowed_last[i] else 0 for i in classes], source)
+        remaining[only] -= 1
+        return only, None
+
+    # Вес класса первого символа: число его символов, умноженное на число
+    # символов, которые после этого смогут стоять последними
+    last_total = sum(remaining[i] for i in classes if allowed_last[i])
+    first = _choose([
+        remaining[i] * (last_total - (1 if allowed_last[i] else 0)) if allowed_first[i] else 0
+        for i in classes
+    ], source)
+    remaining[first] -= 1
+    last = _choose([remaining[i] if allowed_last[i] else 0 for i in classes], source)
+    remaining[last] -= 1
+    return first, last
+
+def _class_chars(policy, index, count, source):
+    return _random_chars(count, *policy.tables[index], source)
+
+def _stream_chunk(m, remaining, policy, source):
+    """
+    Генерирует следующие m символов секрета. Класс каждой позиции выбирается
+    с вероятностью, пропорциональной оставшемуся количеству символов класса,
+    поэтому символы классов равномерно распределены по всему секрету.
+    """
+    active = [i for i, count in enumerate(remaining) if count]
+    if len(active) == 1:
+        remaining[active[0]] -= m
+        return _class_chars(policy, active[0], m, source)
+
+    r0, r1, r2 = remaining
+    chars = [iter(_class_chars(policy, i, min(m, count), source)) if count else None for i, count in enumerate(remaining)]
+    digits, letters, symbols = chars
+    words = memoryview(source.read(8 * m)).cast("Q").tolist()
+
+    out = bytearray()
+    append = out.append
+    total = r0 + r1 + r2
+    for word in words:
+        # Несмещенное число в [0, total): отбрасываем слова из неполного последнего интервала
+        while word >= _WORD - _WORD % total:
+            word = int.from_bytes(source.read(8), "little")
+        value = word % total
+        if value < r0:
+            append(next(digits))
+            r0 -= 1
+        elif value < r0 + r1:
+            append(next(letters))
+            r1 -= 1
+        else:
+            append(next(symbols))
+            r2 -= 1
+        total -= 1
+
+    remaining[:] = [r0, r1, r2]
+    return bytes(out)
+
+_WORD = 1 << 64
+
+def _writer(out):
+    """Возвращает функцию записи байтов в файловый дескриптор, бинарный или текстовый файл."""
+    if isinstance(out, int):
+        def write(data):
+            view = memoryview(data)
+            while view:
+                view = view[os.write(out, view):]
+        return write
+    if isinstance(out, io.TextIOBase):
+        return lambda data: out.write(data.decode("latin-1"))
+    return out.write
+
+def stream_secret(policy, out, chunk_size=STREAM_CHUNK, source=None, progress=None):
+    """
+    Записывает один секрет длиной policy.password_length в out (файловый дескриптор,
+    бинарный или текстовый файл) порциями по chunk_size символов. Память не зависит
+    от длины секрета; количество символов каждого класса точно соответствует
+    политике, и расстановка классов равномерна по всему секрету, а не только внутри порции.
+    progress(written) вызывается после каждой порции.
+    """
+    source = source or get_default_source()
+    write = _writer(out)
+    remaining = list(policy.counts)
+    first, last = _reserve_ends(policy, remaining, source)
+
+    if first is not None:
+        write(_class_chars(policy, first, 1, source))
+    middle = sum(remaining)
+    written = 0
+    while written < middle:
+        size = min(chunk_size, middle - written)
+        write(_stream_chunk(size, remaining, policy, source))
+        written += size
+        if progress:
+            progress(written)
+    if last is not None:
+        write(_class_chars(policy, last, 1, source))
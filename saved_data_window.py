@@ -1,27 +1,325 @@
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QHeaderView, QMenu, 
+    QDialog, QVBoxLayout, QTableView, QPushButton, QHeaderView, QMenu, QStyledItemDelegate, QStyle,
     QMessageBox, QApplication, QHBoxLayout, QCheckBox, QInputDialog, QLabel, QLineEdit
 )
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QAction
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QThreadPool, QTimer, Signal
+from PySide6.QtGui import QAction, QKeySequence, QShortcut
 from qt_material import apply_stylesheet  # Импортируем apply_stylesheet
+from database import Database
+from workers import BuildSearchIndexTask, FutureCallbacks
+import vault_crypto
+
+# Сколько записей модель читает из базы за один раз
+FETCH_SIZE = 256
+# Символ, которым закрывается скрытый пароль
+MASK_CHARACTER = "\u25cf"
+# Длина маски зашифрованного пароля: его длина неизвестна, пока он не расшифрован
+ENCRYPTED_MASK_LENGTH = 8
+# Задержка поиска после последнего нажатия клавиши (мс)
+SEARCH_DELAY = 150
+# Запросы короче этого подходят большинству записей: они проверяются на загруженных
+# строках, а не ищутся по индексу триграмм
+MIN_INDEXED_QUERY = 3
+
+
+def replay_history(db, redo=False):
+    """
+    Выполняется в потоке базы: отменяет (или повторяет) шаг журнала и читает затронутые записи.
+    Возвращает (ids, строки существующих записей) или None, если шагов нет.
+    """
+    ids = db.redo() if redo else db.undo()
+    if ids is None:
+        return None
+    rows = []
+    for start in range(0, len(ids), FETCH_SIZE):
+        rows += db.get_passwords(ids[start:start + FETCH_SIZE])
+    return ids, rows
+
+
+class PasswordTableModel(QAbstractTableModel):
+    """
+    Модель сохраненных записей. Строки читаются из базы данных порциями по мере
+    прокрутки (canFetchMore/fetchMore), поэтому открытие не зависит от размера базы.
+    Порция запрашивается у потока-читателя (DatabaseWorker с соединением только для чтения)
+    и добавляется, когда придет ответ;
+    пока порция читается, следующая не запрашивается.
+    Если задан список ids, читаются только записи из него (результаты поиска).
+    Изменения сайта и логина хранятся в модели до сохранения (dirty_rows).
+    Пароли зашифрованной базы хранятся в модели зашифрованными. По запросу REVEAL_ROLE
+    (показ в ячейке с фокусом) пароль расшифровывается в потоке базы; пока ответ не пришел,
+    возвращается None, а затем ячейка обновляется. В открытом виде хранится только последний
+    расшифрованный пароль.
+    """
+
+    dirty_changed = Signal(int)  # Количество несохраненных строк
+    reveal_failed = Signal(object)  # Ошибка расшифровки (например, база заблокирована)
+
+    SITE, LOGIN, PASSWORD, DATE = range(4)
+    REVEAL_ROLE = Qt.ItemDataRole.UserRole + 1  # Пароль строки в открытом виде
+
+    def __init__(self, worker, language="ru", parent=None, reader=None):
+        super().__init__(parent)
+        self.worker = worker  # Поток базы: изменения и расшифровка
+        self.reader = reader or worker  # Поток, из которого читаются порции записей
+        self.callbacks = FutureCallbacks(self)
+        self.revealed = None  # (зашифрованное значение, пароль) последней расшифровки
+        self.revealing = None  # Зашифрованное значение, которое сейчас расшифровывается (или не расшифровалось)
+        self.headers = ["Сайт/Приложение", "Логин", "Пароль", "Дата"] if language == "ru" else ["Website/Application", "Login", "Password", "Date"]
+        self.rows = []  # Загруженные строки: [id, site, login, password, created_at]
+        # Последнее сохраненное состояние загруженных строк: id -> (site, login, password)
+        self.last_state = {}
+        # Измененные, но еще не сохраненные строки: id -> (id, site, login, password)
+        self.dirty_rows = {}
+        self.ids = None  # id найденных записей или None, если показываются все записи
+        self.position = 0  # Сколько id из ids уже прочитано
+        self.last_id = None  # id последней загруженной записи (для постраничного чтения)
+        self.exhausted = False
+        self.fetching = False  # Порция запрошена, ответ еще не пришел
+        self.generation = 0  # Номер чтения: ответы, запрошенные до reload, отбрасываются
+        self.fetch_all_callback = None  # Вызывается, когда fetch_all загрузит все записи
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 4
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            value = row[index.column() + 1]
+            if isinstance(value, bytes):
+                return MASK_CHARACTER * ENCRYPTED_MASK_LENGTH  # Зашифрованный пароль не расшифровывается для отрисовки
+            return value
+        if role == Qt.ItemDataRole.UserRole:
+            return row[0]  # ID записи
+        if role == self.REVEAL_ROLE:
+            return self.reveal(row)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def reveal(self, row):
+        """Пароль строки в открытом виде или None, если его расшифровка еще запрошена у потока базы."""
+        id, value = row[0], row[3]
+        if not isinstance(value, bytes):
+            return value
+        if self.revealed is not None and self.revealed[0] == value:
+            return self.revealed[1]
+        if self.revealing != value:
+            # Ячейка перерисовывается часто: одно значение запрашивается один раз
+            self.revealing = value
+            self.callbacks.watch(
+                self.worker.submit(Database.reveal, value),
+                lambda password: self.password_revealed(id, value, password),
+                self.reveal_failed.emit
+            )
+        return None
+
+    def password_revealed(self, id, value, password):
+        self.revealed = (value, password)
+        if self.revealing == value:
+            self.revealing = None
+        for number, row in enumerate(self.rows):
+            if row[0] == id:
+                index = self.index(number, self.PASSWORD)
+                self.dataChanged.emit(index, index)
+                break
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() in (self.SITE, self.LOGIN):
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        """Изменяет сайт или логин и сравнивает строку с последним сохраненным состоянием."""
+        if role != Qt.ItemDataRole.EditRole or not index.isValid():
+            return False
+        row = self.rows[index.row()]
+        row[index.column() + 1] = value
+        id, site, login, password = row[:4]
+        if self.last_state.get(id) == (site, login, password):
+            self.dirty_rows.pop(id, None)
+        else:
+            self.dirty_rows[id] = (id, site, login, password)
+        self.dataChanged.emit(index, index)
+        self.dirty_changed.emit(len(self.dirty_rows))
+        return True
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted and not self.fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Запрашивает у потока базы следующую порцию всех записей или найденных записей."""
+        if parent.isValid() or self.exhausted or self.fetching:
+            return
+        self.fetching = True
+        if self.ids is not None:
+            future = self.reader.submit(Database.get_passwords, self.ids[self.position:self.position + FETCH_SIZE])
+            self.position += FETCH_SIZE
+            if self.position >= len(self.ids):
+                self.exhausted = True
+        else:
+            future = self.reader.submit(Database.page, self.last_id, FETCH_SIZE)
+        generation = self.generation
+        self.callbacks.watch(future, lambda batch: self.rows_fetched(generation, batch))
+
+    def loaded_all(self):
+        """Все записи (или все найденные записи) уже загружены."""
+        return self.exhausted and not self.fetching
+
+    def rows_fetched(self, generation, batch):
+        """Добавляет в модель порцию, прочитанную потоком базы."""
+        if generation != self.generation:
+            return  # Модель перезагружена после запроса
+        self.fetching = False
+        if self.ids is None:
+            if batch:
+                self.last_id = batch[-1][0]
+            if len(batch) < FETCH_SIZE:
+                self.exhausted = True
+        if batch:
+            self.insert_batch(batch)
+        if self.fetch_all_callback is not None:
+            if self.loaded_all():
+                callback, self.fetch_all_callback = self.fetch_all_callback, None
+                callback()
+            else:
+                self.fetchMore()
+
+    def insert_batch(self, batch):
+        """Добавляет строки в конец модели; несохраненные изменения остаются поверх данных базы."""
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(batch) - 1)
+        for id, site, login, password, created_at in batch:
+            self.last_state[id] = (site, login, password)
+            if id in self.dirty_rows:
+                # Несохраненные изменения показываются поверх данных базы
+                id, site, login, password = self.dirty_rows[id]
+            self.rows.append([id, site, login, password, created_at])
+        self.endInsertRows()
+
+    def fetch_all(self, callback):
+        """Загружает все оставшиеся записи порция за порцией и затем вызывает callback()."""
+        if self.loaded_all():
+            callback()
+            return
+        self.fetch_all_callback = callback
+        self.fetchMore()
+
+    def reload(self, ids=None):
+        """Начинает чтение заново: всех записей или только записей с id из ids (в их порядке)."""
+        self.beginResetModel()
+        self.rows = []
+        self.ids = list(ids) if ids is not None else None
+        self.position = 0
+        self.last_id = None
+        self.exhausted = False
+        self.fetching = False
+        self.generation += 1
+        self.fetch_all_callback = None
+        self.revealing = None  # После перезагрузки неудачная расшифровка запрашивается снова
+        self.endResetModel()
+        self.fetchMore()
+
+    def reset_changes(self):
+        """Сбрасывает несохраненные изменения и запомненное состояние строк."""
+        self.last_state = {}
+        self.dirty_rows = {}
+        self.dirty_changed.emit(0)
+
+    def save_changes(self):
+        """Отправляет измененные строки в поток базы (одна транзакция). Возвращает Future."""
+        rows = list(self.dirty_rows.values())
+        future = self.worker.submit(Database.update_many, rows)
+        for id, site, login, password in rows:
+            self.last_state[id] = (site, login, password)
+        self.dirty_rows = {}
+        self.dirty_changed.emit(0)
+        return future
+
+    def remove_rows(self, rows):
+        """Убирает строки из модели; соседние строки удаляются одним диапазоном."""
+        for row in sorted(rows, reverse=True):  # Удаляем с конца, чтобы избежать смещения индексов
+            id = self.rows[row][0]
+            self.last_state.pop(id, None)
+            self.dirty_rows.pop(id, None)
+        ranges = []
+        for row in sorted(rows, reverse=True):
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1][0] = row
+            else:
+                ranges.append([row, row])
+        for first, last in ranges:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.rows[first:last + 1]
+            self.endRemoveRows()
+        self.dirty_changed.emit(len(self.dirty_rows))
+
+
+class PasswordFilterProxyModel(QSortFilterProxyModel):
+    """
+    Показывает только строки, id которых входят в matches (если matches не None)
+    и у которых сайт или логин содержит text. Без фильтра показываются все строки.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.matches = None
+        self.text = ""
+
+    def set_filter(self, matches=None, text=""):
+        self.matches = matches
+        self.text = text.lower()
+        self.invalidateRowsFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        id, site, login = self.sourceModel().rows[source_row][:3]
+        if self.matches is not None and id not in self.matches:
+            return False
+        return not self.text or self.text in f"{site or ''}\n{login or ''}".lower()
+
+
+class PasswordDelegate(QStyledItemDelegate):
+    """Рисует пароль закрытым; открывает (и расшифровывает) его только в ячейке, на которой стоит фокус."""
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        password = index.data(PasswordTableModel.REVEAL_ROLE) if option.state & QStyle.StateFlag.State_HasFocus else None
+        if password is not None:
+            option.text = password
+        else:
+            option.text = MASK_CHARACTER * len(option.text)
+
 
 class SavedDataWindow(QDialog):
-    def __init__(self, db, language="ru", parent=None, theme_name=None):
+    """
+    Окно сохраненных записей. Все обращения к базе идут через очередь потока базы
+    (DatabaseWorker); результаты обрабатываются в обработчиках, вызываемых в потоке интерфейса.
+    Записи для таблицы и индекса поиска читаются через reader — поток с соединением только
+    для чтения (если он не задан, через worker).
+    """
+
+    def __init__(self, worker, language="ru", parent=None, theme_name=None, reader=None):
         super().__init__(parent)
-        self.db = db
+        self.worker = worker
+        self.reader = reader or worker
+        self.db_path = str(worker.db.db_path)  # Состояние базы (журнал, расшифровка) — только через очередь worker
+        self.callbacks = FutureCallbacks(self)
         self.language = language
         self.theme_name = theme_name
         self.setWindowTitle("Сохраненные данные" if self.language == "ru" else "Saved Data")
         self.setGeometry(150, 150, 800, 450)  # Увеличим размер окна
-        self.db.create_backup()  # Создание временной копии данных при открытии
-
-        # Переменная для хранения текущего открытого пароля
-        self.current_open_password = None   # Переменная для хранения текущего открытого пароля
+        self.worker.submit(Database.create_backup)  # Начало сеанса: снимок базы будет сделан перед первым изменением
 
-        # Флаг для отслеживания двойного нажатия
-        self.is_double_click = False
-        
         # Основной layout
         layout = QVBoxLayout()
         
@@ -29,8 +327,8 @@ class SavedDataWindow(QDialog):
         self.search_layout = QHBoxLayout()
         self.search_label = QLabel("Поиск:" if self.language == "ru" else "Search:")
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Введите название сайта/приложения..." if self.language == "ru" else "Enter website/application name...")
-        self.search_input.textChanged.connect(self.filter_table)
+        self.search_input.setPlaceholderText("Введите сайт/приложение или логин..." if self.language == "ru" else "Enter website/application or login...")
+        self.search_input.textChanged.connect(self.search_timer_restart)
         self.search_layout.addWidget(self.search_label)
         self.search_layout.addWidget(self.search_input)
         layout.addLayout(self.search_layout)
@@ -41,17 +339,41 @@ class SavedDataWindow(QDialog):
         self.select_all_checkbox.stateChanged.connect(self.toggle_select_all)
         layout.addWidget(self.select_all_checkbox)
 
+        # Чекбокс "Только повторяющиеся пароли": записи, пароль которых сохранен и для других записей
+        self.reused_checkbox = QCheckBox("Только повторяющиеся пароли" if self.language == "ru" else "Only reused passwords")
+        self.reused_checkbox.stateChanged.connect(self.toggle_reused)
+        layout.addWidget(self.reused_checkbox)
+
+        # Модель загружает записи из базы порциями по мере прокрутки
+        self.model = PasswordTableModel(self.worker, self.language, self, self.reader)
+        self.model.dirty_changed.connect(self.update_save_button)
+        self.model.reveal_failed.connect(self.show_error)
+        # Фильтр поверх модели: уточнение запроса скрывает строки без повторного чтения из базы
+        self.proxy = PasswordFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+
+        # Поиск запускается после паузы в наборе текста; индекс триграмм строится в фоне
+        # при первом длинном запросе, поэтому открытие окна не держит в памяти все записи
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.filter_table)
+        self.search_index = None
+        self.index_task = None  # Текущее построение индекса: ответы прежних построений отбрасываются
+        self.loaded_matches = None  # Результат поиска, записи которого читает модель
+        self.reused = None  # id записей с повторяющимися паролями, если включен фильтр повторов
+
         # Таблица для отображения данных
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(
-            ["Сайт/Приложение", "Логин", "Пароль", "Дата"] if self.language == "ru" else ["Website/Application", "Login", "Password", "Date"]
-        )
-        self.table.setEditTriggers(QTableWidget.EditTrigger.DoubleClicked)  # Разрешаем редактирование по двойному клику
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)  # Выделение строк
-        self.table.setSelectionMode(QTableWidget.SelectionMode.MultiSelection)  # Разрешаем выделение нескольких строк
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setItemDelegateForColumn(PasswordTableModel.PASSWORD, PasswordDelegate(self.table))  # Пароль скрыт, пока на ячейке нет фокуса
+        self.table.setEditTriggers(QTableView.EditTrigger.DoubleClicked)  # Разрешаем редактирование по двойному клику
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)  # Выделение строк
+        self.table.setSelectionMode(QTableView.SelectionMode.MultiSelection)  # Разрешаем выделение нескольких строк
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)  # Растягиваем столбцы
         self.table.verticalHeader().setVisible(False)  # Скрываем вертикальные заголовки
+        # Все строки одной высоты: таблица не измеряет каждую строку
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
 
         # Включаем контекстное меню для копирования
         self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
@@ -67,7 +389,18 @@ class SavedDataWindow(QDialog):
         self.save_button.clicked.connect(self.save_changes)
         button_layout.addWidget(self.save_button)
 
-        # Кнопка "Отменить изменения"
+        # Кнопки пошаговой отмены и повтора (Ctrl+Z / Ctrl+Y)
+        self.undo_step_button = QPushButton("Шаг назад" if self.language == "ru" else "Undo")
+        self.undo_step_button.clicked.connect(self.undo_step)
+        button_layout.addWidget(self.undo_step_button)
+        QShortcut(QKeySequence.StandardKey.Undo, self, self.undo_step)
+
+        self.redo_step_button = QPushButton("Шаг вперед" if self.language == "ru" else "Redo")
+        self.redo_step_button.clicked.connect(self.redo_step)
+        button_layout.addWidget(self.redo_step_button)
+        QShortcut(QKeySequence.StandardKey.Redo, self, self.redo_step)
+
+        # Кнопка "Отменить изменения" (все изменения сеанса)
         self.undo_button = QPushButton("Отменить изменения" if self.language == "ru" else "Undo Changes")
         self.undo_button.clicked.connect(self.undo_changes)
         button_layout.addWidget(self.undo_button)
@@ -82,6 +415,11 @@ class SavedDataWindow(QDialog):
         self.delete_button.clicked.connect(self.delete_entry)
         button_layout.addWidget(self.delete_button)
 
+        # Кнопка "Мастер-пароль": включение шифрования или смена мастер-пароля
+        self.master_password_button = QPushButton("Мастер-пароль" if self.language == "ru" else "Master Password")
+        self.master_password_button.clicked.connect(self.change_master_password)
+        button_layout.addWidget(self.master_password_button)
+
         # Кнопка "Назад"
         self.back_button = QPushButton("Назад" if self.language == "ru" else "Back")
         self.back_button.clicked.connect(self.close)
@@ -91,14 +429,28 @@ class SavedDataWindow(QDialog):
 
         self.setLayout(layout)
 
-        # Загружаем данные из базы данных
+        # Загружаем первую порцию данных из базы данных
         self.load_data()
+        self.update_history_buttons()
 
         # Применяем стили qt_material
         self.apply_theme()
 
-        # Переменная для хранения последнего состояния данных
-        self.last_state = self.get_current_table_data()
+    def update_save_button(self, count=0):
+        """Показывает на кнопке сохранения количество несохраненных строк."""
+        text = "Сохранить изменения" if self.language == "ru" else "Save Changes"
+        if count:
+            text += f" ({count})"
+        self.save_button.setText(text)
+
+    def update_history_buttons(self):
+        """Включает кнопки отмены и повтора, только если в журнале есть такие шаги."""
+        self.callbacks.watch(self.worker.submit(Database.history_state), self.history_state_received, self.show_error)
+
+    def history_state_received(self, state):
+        can_undo, can_redo = state
+        self.undo_step_button.setEnabled(can_undo)
+        self.redo_step_button.setEnabled(can_redo)
 
     def apply_theme(self):
         """Применяет тему из qt_material."""
@@ -108,100 +460,107 @@ class SavedDataWindow(QDialog):
             apply_stylesheet(self, theme='dark_teal.xml')
             
     def load_data(self):
-        """Загружает данные из базы данных и отображает их в таблице."""
-        data = self.db.get_all_passwords()
-        self.table.setRowCount(len(data))
-
-        # Устанавливаем ширину столбцов
-        self.table.setColumnWidth(0, 250)  # Ширина столбца "Сайт/Приложение"
-        self.table.setColumnWidth(1, 150)  # Ширина столбца "Логин"
-        self.table.setColumnWidth(2, 150)  # Ширина столбца "Пароль"
-        self.table.setColumnWidth(3, 150)  # Ширина столбца "Дата добавления"
-
-        for row, (id, site, login, password, created_at) in enumerate(data):
-            # Добавляем данные в таблицу
-            self.table.setItem(row, 0, QTableWidgetItem(site))
-            self.table.setItem(row, 1, QTableWidgetItem(login))
-
-            # Создаем QLineEdit для пароля
-            password_edit = QLineEdit(password)
-            password_edit.setEchoMode(QLineEdit.EchoMode.Password)  # Скрываем пароль
-            password_edit.setReadOnly(True)  # Запрещаем редактирование
-            password_edit.setFocusPolicy(Qt.FocusPolicy.StrongFocus)  # Разрешаем фокус
+        """
+        Загружает из базы данных записи, подходящие под строку поиска (или все записи).
+        Остальные порции модель читает при прокрутке; несохраненные изменения строк остаются.
+        """
+        self.loaded_matches = None
+        self.model.reload()
+        if self.reused is not None:
+            self.find_reused()  # Изменения могли добавить или убрать повторы
+        self.filter_table()
+
+    def toggle_reused(self, state):
+        if self.reused_checkbox.isChecked():
+            self.find_reused()
+        else:
+            self.reused = None
+            self.filter_table()
 
-            # Показываем пароль при получении фокуса
-            password_edit.installEventFilter(self)  # Устанавливаем фильтр событий
+    def find_reused(self):
+        """Ищет повторяющиеся пароли в потоке базы: группировка по отпечаткам выполняется в SQLite."""
+        self.callbacks.watch(self.worker.submit(Database.find_reused), self.reused_found, self.show_error)
 
-            self.table.setCellWidget(row, 2, password_edit)
+    def reused_found(self, groups):
+        if not self.reused_checkbox.isChecked():
+            return
+        # Записи с одинаковым паролем идут подряд
+        self.reused = dict.fromkeys(id for group in groups for id in group)
+        self.loaded_matches = None
+        self.filter_table()
+
+    def build_search_index(self):
+        """
+        Строит индекс триграмм в пуле потоков: записи читаются порциями через соединение
+        только для чтения, поэтому видны только зафиксированные изменения. Изменения, сделанные
+        во время построения, учитываются перестроением после их фиксации (см. index_outdated).
+        """
+        self.search_index = None
+        self.index_task = BuildSearchIndexTask(self.db_path)
+        self.index_task.signals.finished.connect(self.search_index_ready)
+        self.index_task.signals.failed.connect(self.search_index_failed)
+        QThreadPool.globalInstance().start(self.index_task)
+
+    def search_index_ready(self, index):
+        if self.index_task is None or self.sender() is not self.index_task.signals:
+            return  # Индекс устарел: после его запуска построение начато заново
+        self.search_index = index
+        self.index_task = None
+        self.filter_table()
+
+    def search_index_failed(self, message):
+        if self.index_task is not None and self.sender() is self.index_task.signals:
+            self.index_task = None
+            self.show_error(message)
+
+    def index_outdated(self):
+        """
+        Вызывается после фиксации изменения: если индекс еще строится, он мог прочитать
+        базу до изменения, поэтому построение начинается заново.
+        """
+        if self.search_index is None and self.index_task is not None:
+            self.build_search_index()
+
+    def rebuild_search_index(self):
+        """Перестраивает индекс после изменения многих записей, если индекс уже построен или строится."""
+        if self.search_index is not None or self.index_task is not None:
+            self.build_search_index()
+
+    def search_timer_restart(self):
+        self.search_timer.start()
 
-            self.table.setItem(row, 3, QTableWidgetItem(created_at))
+    def filter_table(self):
+        """
+        Оставляет в таблице только записи, у которых сайт или логин содержит введенный текст
+        (и, если включен фильтр повторов, только записи с повторяющимися паролями).
+        Короткий запрос проверяется на строках по мере их чтения из базы. Более длинный
+        ищется по индексу триграмм: если модель уже прочитала все записи прошлого поиска,
+        а новый результат входит в них (запрос уточнен), строки только фильтруются;
+        иначе модель заново читает из базы только найденные записи.
+        """
+        search_text = self.search_input.text().strip()
+        if len(search_text) >= MIN_INDEXED_QUERY and self.search_index is None and self.index_task is None:
+            self.build_search_index()  # Первый длинный запрос: когда индекс будет готов, поиск повторится
+        # Пока индекс строится, длинный запрос тоже проверяется на загруженных строках
+        indexed = len(search_text) >= MIN_INDEXED_QUERY and self.search_index is not None
+        if indexed:
+            matches = self.search_index.search(search_text)
+            if self.reused is not None:
+                matches = {id: None for id in matches if id in self.reused}
+        else:
+            matches = self.reused
 
-            # Сохраняем ID в скрытом виде
-            self.table.item(row, 0).setData(Qt.ItemDataRole.UserRole, id)
+        if matches is None:
+            if self.loaded_matches is not None:
+                self.loaded_matches = None
+                self.model.reload()
+            self.proxy.set_filter(text=search_text)
+            return
 
-            # Выравниваем текст по левому краю
-            for col in range(4):
-                if col != 2:  # Пропускаем столбец с паролем
-                    self.table.item(row, col).setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-    
-    def eventFilter(self, obj, event):
-        """Обрабатывает события фокуса для QLineEdit."""
-        if isinstance(obj, QLineEdit):
-            if event.type() == event.Type.FocusIn:
-                obj.setEchoMode(QLineEdit.EchoMode.Normal)  # Показываем пароль
-            elif event.type() == event.Type.FocusOut:
-                obj.setEchoMode(QLineEdit.EchoMode.Password)  # Скрываем пароль
-                obj.deselect()  # Сбрасываем выделение текста
-        return super().eventFilter(obj, event)  # Передаем событие дальше
-                    
-    def show_password(self, widget):
-        """Показывает пароль при нажатии на поле."""
-        widget.setEchoMode(QLineEdit.EchoMode.Normal)  # Показываем пароль
-        widget.setFocus()  # Устанавливаем фокус на поле
-        
-    def hide_password(self, widget, event):
-        """Скрывает пароль, когда поле теряет фокус."""
-        widget.setEchoMode(QLineEdit.EchoMode.Password)  # Скрываем пароль
-        widget.deselect()  # Сбрасываем выделение текста
-        event.ignore()  # Позволяем событию focusOutEvent продолжить обработку
-    
-    def toggle_password_visibility(self, widget):
-        """Переключает видимость пароля."""
-        if self.current_open_password and self.current_open_password != widget:
-            # Скрываем предыдущий открытый пароль
-            self.current_open_password.setEchoMode(QLineEdit.EchoMode.Password)
-        
-        if widget.echoMode() == QLineEdit.EchoMode.Password:
-            widget.setEchoMode(QLineEdit.EchoMode.Normal)  # Показываем пароль
-            self.current_open_password = widget  # Запоминаем текущий открытый пароль
-        else:
-            widget.setEchoMode(QLineEdit.EchoMode.Password)  # Скрываем пароль
-            self.current_open_password = None  # Сбрасываем текущий открытый пароль
-            
-    def mousePressEvent(self, event):
-        """Обрабатывает клик по окну."""
-        if self.current_open_password and not self.is_double_click:
-            # Скрываем пароль, если клик был вне поля с паролем и это не двойное нажатие
-            self.current_open_password.setEchoMode(QLineEdit.EchoMode.Password)
-            self.current_open_password = None  # Сбрасываем текущий открытый пароль
-
-        self.is_double_click = False  # Сбрасываем флаг
-        super().mousePressEvent(event)  # Вызываем родительский метод
-        
-    def mouseDoubleClickEvent(self, event):
-        """Обрабатывает двойное нажатие мыши."""
-        self.is_double_click = True  # Устанавливаем флаг
-        super().mouseDoubleClickEvent(event)  # Вызываем родительский метод
-    
-    def filter_table(self):
-        """Фильтрует таблицу по введенному тексту."""
-        search_text = self.search_input.text().lower()
-        for row in range(self.table.rowCount()):
-            site = self.table.item(row, 0).text().lower()
-            if search_text in site:
-                self.table.setRowHidden(row, False)
-            else:
-                self.table.setRowHidden(row, True)
+        if self.loaded_matches is None or not self.model.loaded_all() or not matches.keys() <= self.loaded_matches.keys():
+            self.loaded_matches = matches
+            self.model.reload(matches)
+        self.proxy.set_filter(matches, "" if indexed else search_text)
 
     def show_context_menu(self, position):
         """Показывает контекстное меню для копирования данных."""
@@ -209,38 +568,48 @@ class SavedDataWindow(QDialog):
         copy_action = QAction("Копировать" if self.language == "ru" else "Copy", self)
         copy_action.triggered.connect(self.copy_selected_data)
         menu.addAction(copy_action)
+        copy_password_action = QAction("Копировать пароль" if self.language == "ru" else "Copy Password", self)
+        copy_password_action.triggered.connect(self.copy_password)
+        menu.addAction(copy_password_action)
         menu.exec(self.table.viewport().mapToGlobal(position))
 
     def copy_selected_data(self):
-        """Копирует выделенные данные в буфер обмена."""
-        selected_items = self.table.selectedItems()
-        if selected_items:
-            text = "\t".join(item.text() for item in selected_items)  # Копируем данные через табуляцию
+        """Копирует выделенные данные (без паролей) в буфер обмена."""
+        indexes = sorted(
+            (index for index in self.table.selectionModel().selectedIndexes() if index.column() != PasswordTableModel.PASSWORD),
+            key=lambda index: (index.row(), index.column())
+        )
+        if indexes:
+            text = "\t".join(index.data() for index in indexes)  # Копируем данные через табуляцию
             QApplication.clipboard().setText(text)
 
+    def copy_password(self):
+        """Копирует в буфер обмена пароль текущей строки (расшифровывается только он, в потоке базы)."""
+        index = self.table.currentIndex()
+        if index.isValid():
+            value = self.model.rows[self.proxy.mapToSource(index).row()][3]
+            self.callbacks.watch(self.worker.submit(Database.reveal, value), QApplication.clipboard().setText, self.show_error)
+
     def save_changes(self):
         """Сохраняет изменения в базе данных."""
-        for row in range(self.table.rowCount()):
-            id = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole)
-            site = self.table.item(row, 0).text()
-            login = self.table.item(row, 1).text()
-
-            # Получаем пароль из QLineEdit
-            password_edit = self.table.cellWidget(row, 2)
-            password = password_edit.text()
-
-            self.db.update_password(id, site, login, password)
-
-        # Обновляем последнее состояние данных
-        self.last_state = self.get_current_table_data()
-
+        if self.search_index is not None:
+            for id, site, login, password in self.model.dirty_rows.values():
+                self.search_index.add(id, site, login)
+        # Записываем только измененные строки одной транзакцией
+        self.callbacks.watch(self.model.save_changes(), self.changes_saved, self.show_error)
+
+    def changes_saved(self, result=None):
+        self.index_outdated()
+        self.update_history_buttons()
         QMessageBox.information(self, "Успех", "Изменения сохранены." if self.language == "ru" else "Changes saved.")
 
+    def show_error(self, error):
+        """Показывает ошибку запроса к базе."""
+        QMessageBox.critical(self, "Ошибка" if self.language == "ru" else "Error", str(error))
+
     def delete_entry(self):
         """Удаляет выделенные записи из базы данных."""
-        selected_rows = set()  # Используем set для хранения уникальных индексов строк
-        for item in self.table.selectedItems():
-            selected_rows.add(item.row())  # Добавляем индекс строки в set
+        selected_rows = [self.proxy.mapToSource(index).row() for index in self.table.selectionModel().selectedRows()]
 
         if not selected_rows:
             QMessageBox.warning(
@@ -261,25 +630,27 @@ class SavedDataWindow(QDialog):
 
         # Если пользователь подтвердил удаление
         if reply == QMessageBox.StandardButton.Yes:
-            # Удаляем записи из базы данных
-            for row in sorted(selected_rows, reverse=True):  # Удаляем с конца, чтобы избежать смещения индексов
-                id = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole)  # Получаем ID из скрытых данных
-                self.db.delete_password(id)
-                self.table.removeRow(row)  # Удаляем строку из таблицы
-
-            # Обновляем последнее состояние данных
-            self.last_state = self.get_current_table_data()
-
-            QMessageBox.information(
-                self,
-                "Успех" if self.language == "ru" else "Success",
-                "Записи удалены." if self.language == "ru" else "Entries deleted."
-            )
+            # Удаляем записи из базы данных одной транзакцией
+            ids = [self.model.rows[row][0] for row in selected_rows]
+            self.callbacks.watch(self.worker.submit(Database.delete_many, ids), self.entries_deleted, self.show_error)
+            self.model.remove_rows(selected_rows)  # Удаляем строки из таблицы, не дожидаясь базы
+            if self.search_index is not None:
+                for id in ids:
+                    self.search_index.remove(id)
+
+    def entries_deleted(self, result=None):
+        self.index_outdated()
+        self.update_history_buttons()
+        QMessageBox.information(
+            self,
+            "Успех" if self.language == "ru" else "Success",
+            "Записи удалены." if self.language == "ru" else "Entries deleted."
+        )
 
     def toggle_select_all(self):
         """Выделяет или снимает выделение со всех строк."""
         if self.select_all_checkbox.isChecked():
-            self.table.selectAll()  # Выделить все строки
+            self.model.fetch_all(self.table.selectAll)  # Выделяем все строки, в том числе еще не загруженные
         else:
             self.table.clearSelection()  # Снять выделение со всех строк
 
@@ -292,35 +663,51 @@ class SavedDataWindow(QDialog):
 
         if ok1 and ok2 and ok3:
             # Добавляем запись в базу данных
-            self.db.save_password(site, login, password)
-
-            # Обновляем таблицу
-            self.load_data()
-
-            # Обновляем последнее состояние данных
-            self.last_state = self.get_current_table_data()
-
-            QMessageBox.information(
-                self,
-                "Успех" if self.language == "ru" else "Success",
-                "Запись добавлена." if self.language == "ru" else "Entry added."
+            self.callbacks.watch(
+                self.worker.submit(Database.save_password, site, login, password),
+                lambda id: self.entry_added(id, site, login), self.show_error
             )
 
-    def get_current_table_data(self):
-        """Возвращает текущие данные из таблицы в виде списка кортежей."""
-        data = []
-        for row in range(self.table.rowCount()):
-            id = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole)
-            site = self.table.item(row, 0).text()
-            login = self.table.item(row, 1).text()
+    def entry_added(self, id, site, login):
+        if self.search_index is not None:
+            self.search_index.add(id, site, login)
+        else:
+            self.index_outdated()
+
+        # Обновляем таблицу (несохраненные изменения других строк остаются)
+        self.load_data()
+        self.update_history_buttons()
 
-            # Получаем пароль из QLineEdit
-            password_edit = self.table.cellWidget(row, 2)
-            password = password_edit.text()
+        QMessageBox.information(
+            self,
+            "Успех" if self.language == "ru" else "Success",
+            "Запись добавлена." if self.language == "ru" else "Entry added."
+        )
 
-            created_at = self.table.item(row, 3).text()
-            data.append((id, site, login, password, created_at))
-        return data
+    def undo_step(self):
+        """Отменяет последнее изменение базы (сохранение, добавление или удаление записей)."""
+        self.callbacks.watch(self.worker.submit(replay_history), self.apply_history_step, self.show_error)
+
+    def redo_step(self):
+        """Повторяет последнее отмененное изменение."""
+        self.callbacks.watch(self.worker.submit(replay_history, redo=True), self.apply_history_step, self.show_error)
+
+    def apply_history_step(self, step):
+        """Обновляет индекс поиска для затронутых шагом записей и перечитывает таблицу."""
+        if step is None:
+            return  # Журнал пуст
+        ids, rows = step
+        if self.search_index is not None:
+            rows = {id: (site, login) for id, site, login, password, created_at in rows}
+            for id in ids:
+                if id in rows:
+                    self.search_index.add(id, *rows[id])
+                else:
+                    self.search_index.remove(id)
+        else:
+            self.index_outdated()
+        self.load_data()
+        self.update_history_buttons()
 
     def undo_changes(self):
         """Восстанавливает данные из временного файла при отмене изменений."""
@@ -333,16 +720,81 @@ class SavedDataWindow(QDialog):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            self.db.restore_backup()  # Восстановление базы данных
-            self.load_data()  # Перезагрузка данных в таблицу
-            QMessageBox.information(
+            # Восстановление базы данных
+            self.callbacks.watch(self.worker.submit(Database.restore_backup), self.backup_restored, self.show_error)
+
+    def backup_restored(self, result=None):
+        self.model.reset_changes()  # Несохраненные изменения тоже отменяются
+        self.rebuild_search_index()
+        self.load_data()  # Перезагрузка данных в таблицу
+        self.update_history_buttons()  # Журнал шагов очищается вместе с восстановлением
+        QMessageBox.information(
             self,
             "Успех" if self.language == "ru" else "Success",
             "Изменения отменены. Удаленные записи восстановлены." if self.language == "ru" else "Changes undone. Deleted entries restored."
         )
     
+    def change_master_password(self):
+        """
+        Включает шифрование паролей или меняет мастер-пароль; пустой мастер-пароль снимает шифрование.
+        Все пароли перешифровываются одной транзакцией, порциями.
+        """
+        title = "Мастер-пароль" if self.language == "ru" else "Master Password"
+        error_title = "Ошибка" if self.language == "ru" else "Error"
+        if not vault_crypto.available():
+            QMessageBox.critical(
+                self, error_title,
+                "Для шифрования установите пакет cryptography." if self.language == "ru" else "Install the cryptography package to enable encryption."
+            )
+            return
+        if self.model.dirty_rows:
+            QMessageBox.warning(
+                self, error_title,
+                "Сначала сохраните или отмените изменения." if self.language == "ru" else "Save or undo your changes first."
+            )
+            return
+
+        master_password, ok = QInputDialog.getText(
+            self, title,
+            "Новый мастер-пароль (пустой — снять шифрование):" if self.language == "ru" else "New master password (empty to remove encryption):",
+            QLineEdit.EchoMode.Password
+        )
+        if not ok:
+            return
+        repeated, ok = QInputDialog.getText(
+            self, title, "Повторите мастер-пароль:" if self.language == "ru" else "Repeat the master password:",
+            QLineEdit.EchoMode.Password
+        )
+        if not ok:
+            return
+        if master_password != repeated:
+            QMessageBox.warning(self, error_title, "Пароли не совпадают." if self.language == "ru" else "Passwords do not match.")
+            return
+
+        # Перешифровка идет в потоке базы; окно не принимает ввод, пока она не закончится
+        self.setEnabled(False)
+        self.callbacks.watch(
+            self.worker.submit(Database.set_master_password, master_password),
+            lambda result: self.master_password_changed(master_password),
+            self.master_password_failed
+        )
+
+    def master_password_failed(self, error):
+        self.setEnabled(True)
+        self.show_error(error)
+
+    def master_password_changed(self, master_password):
+        self.setEnabled(True)
+        self.load_data()  # Пароли в базе перешифрованы: загруженные строки устарели
+        self.update_history_buttons()
+        QMessageBox.information(
+            self,
+            "Успех" if self.language == "ru" else "Success",
+            ("Мастер-пароль изменен." if master_password else "Шифрование снято.") if self.language == "ru"
+            else ("Master password changed." if master_password else "Encryption removed.")
+        )
+
     def closeEvent(self, event):
-        """Удаляет временную копию базы данных при закрытии окна."""
-        self.db.delete_backup()
+        """Удаляет снимок базы данных при закрытии окна."""
+        self.worker.submit(Database.delete_backup)
         event.accept()
-
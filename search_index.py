@@ -0,0 +1,64 @@
+"""
+Индекс триграмм для поиска подстроки в сайтах и логинах сохраненных записей.
+
+Для каждой записи хранится строка "сайт\\nлогин" в нижнем регистре, а для каждой
+триграммы (трех подряд идущих символов) — список id записей, где она встречается.
+Запрос из трех и более символов проверяется только на записях из самого короткого
+списка его триграмм. Если новый запрос продолжает предыдущий, проверяются только
+записи, найденные в прошлый раз.
+"""
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    def __init__(self, rows=()):
+        self.keys = {}  # id -> "site\nlogin" в нижнем регистре
+        self.postings = {}  # триграмма -> список id (после удаления или изменения могут остаться лишние id)
+        self.last_query = None
+        self.last_matches = None
+        for id, site, login in rows:
+            self.add(id, site, login)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, id, site, login):
+        """Добавляет запись или обновляет ее сайт и логин."""
+        key = f"{site or ''}\n{login or ''}".lower()
+        self.keys[id] = key
+        postings = self.postings
+        for trigram in _trigrams(key):
+            ids = postings.get(trigram)
+            if ids is None:
+                postings[trigram] = [id]
+            else:
+                ids.append(id)
+        self.last_query = None
+
+    def remove(self, id):
+        """Удаляет запись; ее id в списках триграмм отбрасываются при проверке."""
+        self.keys.pop(id, None)
+        self.last_query = None
+
+    def search(self, query):
+        """
+        Возвращает id записей, у которых сайт или логин содержит query (без учета регистра),
+        в виде словаря id -> None: порядок ключей — порядок добавления записей, а проверка
+        вхождения и сравнение keys() работают как у множества.
+        """
+        query = query.lower()
+        keys = self.keys
+        if self.last_query is not None and self.last_query in query:
+            # Запрос продолжает предыдущий: сужаем прошлый результат
+            candidates = self.last_matches
+        elif len(query) >= 3:
+            candidates = min((self.postings.get(trigram, ()) for trigram in _trigrams(query)), key=len)
+        else:
+            candidates = keys
+        matches = dict.fromkeys(id for id in candidates if query in keys.get(id, ""))
+        self.last_query = query
+        self.last_matches = matches
+        return matches
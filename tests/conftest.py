@@ -0,0 +1,13 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Модули приложения лежат в корне репозитория
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Путь к новой базе во временной папке (Database принимает и абсолютный путь)."""
+    return str(tmp_path / "vault.db")
@@ -0,0 +1,63 @@
+import pytest
+
+from database import Database
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "journal-cache"])
+def db(request, db_path):
+    db = Database(db_path, journal=request.param, cache=request.param)
+    yield db
+    db.close()
+
+
+def rows(db):
+    return [(id, site, login, password) for id, site, login, password, _ in db.get_all_passwords()]
+
+
+def test_snapshot_is_taken_before_first_change(db):
+    db.save_password("site", "user", "password")
+    db.create_backup()
+    assert db.snapshot is None
+
+    db.get_all_passwords()
+    assert db.snapshot is None  # Чтение снимок не делает
+
+    db.save_password("other", "user", "password")
+    assert db.snapshot is not None
+
+
+def test_restore_returns_session_start(db):
+    first = db.save_password("first", "user", "password")
+    second = db.save_password("second", "user", "password")
+    before = rows(db)
+
+    db.create_backup()
+    db.delete_password(first)
+    db.update_password(second, "changed", "user", "new")
+    db.save_password("third", "user", "password")
+    db.restore_backup()
+
+    assert rows(db) == before  # id записей сохраняются
+    assert db.history_state() == (False, False)
+
+    # Снимок остается: изменения после восстановления тоже можно отменить
+    db.delete_password(second)
+    db.restore_backup()
+    assert rows(db) == before
+
+
+def test_restore_without_changes_does_nothing(db):
+    db.save_password("site", "user", "password")
+    before = rows(db)
+    db.create_backup()
+    db.restore_backup()
+    assert rows(db) == before
+
+
+def test_delete_backup_ends_session(db):
+    db.create_backup()
+    db.save_password("site", "user", "password")
+    db.delete_backup()
+    db.restore_backup()
+    assert len(rows(db)) == 1
+    assert db.snapshot is None
@@ -0,0 +1,71 @@
+import pytest
+
+from database import Database
+
+
+@pytest.fixture
+def db(db_path):
+    db = Database(db_path)
+    yield db
+    db.conn.close()
+
+
+def rows(db):
+    """Записи базы в виде (site, login, password) в порядке id."""
+    return [(site, login, password) for _, site, login, password, _ in db.get_all_passwords()]
+
+
+def test_reject_keeps_existing_entry(db):
+    assert db.upsert_password("site", "user", "first")
+    assert not db.upsert_password("site", "user", "second", "reject")
+    assert rows(db) == [("site", "user", "first")]
+
+
+def test_overwrite_replaces_existing_entry(db):
+    db.upsert_password("site", "user", "first")
+    assert db.upsert_password("site", "user", "second", "overwrite")
+    assert rows(db) == [("site", "user", "second")]
+
+
+def test_keep_both_numbers_duplicates(db):
+    db.upsert_password("site", "user", "first")
+    assert db.upsert_password("site", "user", "second", "keep_both")
+    db.cursor.execute("SELECT dup_index FROM passwords ORDER BY id")
+    assert [dup_index for dup_index, in db.cursor.fetchall()] == [0, 1]
+
+
+@pytest.mark.parametrize("on_conflict, expected", [
+    ("reject", [("site", "user", "second")]),
+    ("overwrite", [("site", "user", "third")]),
+])
+def test_duplicate_found_after_first_entry_deleted(db, on_conflict, expected):
+    # После удаления записи с dup_index = 0 ее дубликат с dup_index = 1 остается в базе
+    db.save_password("site", "user", "first")
+    db.save_password("site", "user", "second")
+    db.delete_password(db.get_all_passwords()[0][0])
+
+    assert db.upsert_password("site", "user", "third", on_conflict) == (on_conflict == "overwrite")
+    assert rows(db) == expected
+
+
+@pytest.mark.parametrize("site, login", [(None, "user"), ("site", None), (None, None)])
+def test_missing_site_or_login_is_a_duplicate(db, site, login):
+    db.upsert_password(site, login, "first")
+    assert not db.upsert_password(site, login, "second", "reject")
+    assert db.upsert_password(site, login, "third", "overwrite")
+    assert db.upsert_password(site, login, "fourth", "keep_both")
+    assert rows(db) == [(site, login, "third"), (site, login, "fourth")]
+
+
+def test_upsert_many_counts_saved_rows(db):
+    db.upsert_password("old", "user", "password")
+    batch = [("old", "user", "new"), ("new", "user", "first"), ("new", "user", "second")]
+
+    assert db.upsert_many(batch, "reject") == 1
+    assert db.upsert_many(batch, "overwrite") == 3
+    assert rows(db) == [("old", "user", "new"), ("new", "user", "second")]
+
+
+def test_unknown_rule_is_rejected(db):
+    with pytest.raises(ValueError):
+        db.upsert_password("site", "user", "password", "ignore")
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from database import Database
+from db_worker import DatabaseWorker
+
+
+class Trace:
+    """Запоминает запросы SQLite, выполненные соединением."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, statement):
+        self.statements.append(statement.split()[0].upper())
+
+
+def run_group(worker, requests):
+    """Ставит запросы в очередь, пока поток базы занят, чтобы они выполнились одной группой."""
+    gate = threading.Event()
+    worker.submit(lambda db: gate.wait())
+    futures = [worker.submit(function, *args) for function, *args in requests]
+    gate.set()
+    for future in futures:
+        future.exception()
+    return futures
+
+
+@pytest.fixture(params=[False, True], ids=["no-journal", "journal"])
+def worker(request, db_path):
+    worker = DatabaseWorker(db_path, journal=request.param)
+    yield worker
+    worker.close()
+
+
+def test_group_is_one_transaction(worker):
+    trace = Trace()
+    worker.call(lambda db: db.conn.set_trace_callback(trace))
+    run_group(worker, [(Database.save_password, f"site{i}", "user", "password") for i in range(5)])
+    worker.call(lambda db: db.conn.set_trace_callback(None))
+
+    assert trace.statements.count("BEGIN") == 1
+    assert trace.statements.count("COMMIT") == 1
+    assert trace.statements.count("SAVEPOINT") == trace.statements.count("RELEASE") == 5
+    assert worker.call(Database.count_passwords) == 5
+
+
+def test_failed_request_rolls_back_only_itself(worker):
+    futures = run_group(worker, [
+        (Database.save_password, "first", "user", "password"),
+        # Первая строка вставляется, вторая падает: откатывается весь запрос
+        (Database.save_many, [("partial", "user", "password"), ("bad", "user", 12345)]),
+        (Database.save_password, "last", "user", "password"),
+    ])
+
+    assert futures[0].exception() is None
+    assert futures[1].exception() is not None
+    assert futures[2].exception() is None
+    assert sorted(row[1] for row in worker.call(Database.get_all_passwords)) == ["first", "last"]
+
+
+def test_group_requests_are_separate_undo_steps(db_path):
+    worker = DatabaseWorker(db_path, journal=True)
+    try:
+        run_group(worker, [(Database.save_password, f"site{i}", "user", "password") for i in range(3)])
+        worker.call(Database.undo)
+        assert sorted(row[1] for row in worker.call(Database.get_all_passwords)) == ["site0", "site1"]
+    finally:
+        worker.close()
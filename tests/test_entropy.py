@@ -0,0 +1,35 @@
+import string
+
+import entropy
+from password_generator import generate_password_with_counts
+
+
+class CountingSource(entropy.SystemSource):
+    """os.urandom, который считает запросы."""
+
+    def __init__(self):
+        self.reads = 0
+
+    def read(self, n):
+        self.reads += 1
+        return super().read(n)
+
+
+def test_default_source_is_unbuffered_urandom():
+    assert type(entropy.get_default_source()) is entropy.SystemSource
+
+
+def test_password_with_counts_uses_given_source():
+    source = CountingSource()
+    password = generate_password_with_counts(20, True, True, False, numbers_count=5, source=source)
+
+    assert len(password) == 20
+    assert sum(ch in string.digits for ch in password) == 5
+    assert sum(ch in string.ascii_letters for ch in password) == 15
+    assert source.reads >= 20 + 19  # Выбор каждого символа и каждый шаг перемешивания
+
+
+def test_password_with_counts_is_reproducible_from_seed():
+    first = generate_password_with_counts(32, True, True, True, source=entropy.DeterministicSource(7))
+    second = generate_password_with_counts(32, True, True, True, source=entropy.DeterministicSource(7))
+    assert first == second
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+
+import instrumentation
+
+
+@pytest.fixture
+def conn():
+    instrumentation.profiler.reset()
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (x)")
+    conn.set_trace_callback(instrumentation.SqlTrace(conn))
+    yield conn
+    conn.close()
+    instrumentation.profiler.reset()
+
+
+def commits():
+    return instrumentation.profiler.snapshot()["counters"].get("commits", 0)
+
+
+def test_commit_is_counted(conn):
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+    assert commits() == 1
+
+
+def test_release_of_outer_savepoint_commits(conn):
+    conn.execute("SAVEPOINT request")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.execute("RELEASE request")
+    assert not conn.in_transaction
+    assert commits() == 1
+
+
+def test_savepoints_inside_transaction_are_not_commits(conn):
+    conn.execute("BEGIN")
+    for _ in range(3):
+        conn.execute("SAVEPOINT request")
+        conn.execute("INSERT INTO t VALUES (1)")
+        conn.execute("RELEASE SAVEPOINT request")
+    conn.commit()
+    assert commits() == 1
+
+
+def test_nested_savepoints_commit_once(conn):
+    conn.execute("SAVEPOINT outer")
+    conn.execute("SAVEPOINT inner")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.execute("RELEASE inner")
+    assert commits() == 0
+    conn.execute("RELEASE outer")
+    assert commits() == 1
@@ -0,0 +1,89 @@
+import pytest
+
+import database
+from database import Database
+
+
+@pytest.fixture
+def db(db_path):
+    db = Database(db_path, journal=True)
+    yield db
+    db.close()
+
+
+def rows(db):
+    return [(id, site, login, password) for id, site, login, password, _ in db.get_all_passwords()]
+
+
+def test_undo_and_redo_each_kind_of_change(db):
+    id = db.save_password("site", "user", "first")
+    added = rows(db)
+    db.update_password(id, "site", "other", "second")
+    updated = rows(db)
+    db.delete_password(id)
+
+    assert db.undo() == [id]
+    assert rows(db) == updated
+    assert db.undo() == [id]
+    assert rows(db) == added
+    assert db.undo() == [id]
+    assert rows(db) == []
+    assert db.undo() is None
+
+    db.redo()
+    assert rows(db) == added  # Запись возвращается с тем же id
+    db.redo()
+    assert rows(db) == updated
+    db.redo()
+    assert rows(db) == []
+    assert db.redo() is None
+
+
+def test_new_change_clears_redo(db):
+    db.save_password("first", "user", "password")
+    db.undo()
+    assert db.history_state() == (False, True)
+
+    db.save_password("second", "user", "password")
+    assert db.history_state() == (True, False)
+    assert db.redo() is None
+
+
+def test_batch_is_one_step(db):
+    db.save_many([(f"site{i}", "user", "password") for i in range(10)])
+    ids = [row[0] for row in rows(db)]
+
+    assert sorted(db.undo()) == ids
+    assert rows(db) == []
+    assert db.history_state() == (False, True)
+
+
+def test_savepoints_are_separate_steps(db):
+    with db.transaction():
+        with db.savepoint():
+            db.save_password("first", "user", "password")
+        with db.savepoint():
+            db.save_password("second", "user", "password")
+
+    db.undo()
+    assert [row[1] for row in rows(db)] == ["first"]
+
+
+def test_failed_transaction_records_no_step(db):
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.save_password("site", "user", "password")
+            raise ValueError
+    assert rows(db) == []
+    assert db.history_state() == (False, False)
+
+
+def test_old_steps_are_dropped(db, monkeypatch):
+    monkeypatch.setattr(database, "MAX_JOURNAL_STEPS", 3)
+    for i in range(5):
+        db.save_password(f"site{i}", "user", "password")
+
+    for _ in range(3):
+        assert db.undo() is not None
+    assert db.undo() is None
+    assert [row[1] for row in rows(db)] == ["site0", "site1"]
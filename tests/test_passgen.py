@@ -0,0 +1,23 @@
+import pytest
+
+import passgen
+from database import Database
+
+
+@pytest.mark.parametrize("template", ["{site}", "{0}", "{n.x}", "{n[0]}", "{"])
+def test_invalid_template_is_a_usage_error(db_path, template, capsys):
+    with pytest.raises(SystemExit) as exit:
+        passgen.main(["generate", "--count", "2", "--db", db_path, "--site", template])
+    assert exit.value.code == 2
+    assert "may only contain {n}" in capsys.readouterr().err
+
+
+def test_generate_saves_numbered_entries(db_path):
+    assert passgen.main(["generate", "--count", "3", "--db", db_path, "--site", "site-{n}", "--login", "user"]) == 0
+    db = Database(db_path)
+    try:
+        assert [(site, login) for _, site, login, _, _ in db.get_all_passwords()] == [
+            ("site-1", "user"), ("site-2", "user"), ("site-3", "user")
+        ]
+    finally:
+        db.close()
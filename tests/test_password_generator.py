@@ -0,0 +1,89 @@
+import pickle
+import string
+from collections import Counter
+
+import pytest
+
+from entropy import DeterministicSource
+from password_generator import (
+    AMBIGUOUS_CHARACTERS, PasswordGenerationError, PasswordPolicy, _random_chars, _rejection_table,
+    generate_passwords,
+)
+
+
+def class_counts(password):
+    return (
+        sum(ch in string.digits for ch in password),
+        sum(ch in string.ascii_letters for ch in password),
+        sum(ch in string.punctuation for ch in password),
+    )
+
+
+def test_rejection_table_drops_biased_bytes():
+    alphabet = string.digits
+    table, rejected, limit = _rejection_table(alphabet)
+    assert limit == 250  # 256 - 256 % 10
+    assert bytes(range(256)).translate(table, rejected) == (alphabet * 25).encode()
+
+
+def test_random_chars_are_uniform():
+    alphabet = "abcdefg"  # 256 не делится на 7: без отклонения первые символы выпадали бы чаще
+    chars = _random_chars(70000, *_rejection_table(alphabet), DeterministicSource(1))
+    counts = Counter(chars.decode())
+    assert len(chars) == 70000 and set(counts) == set(alphabet)
+    assert all(abs(count - 10000) < 400 for count in counts.values())
+
+
+def test_passwords_follow_exact_counts():
+    policy = PasswordPolicy(20, numbers_count=4, symbols_count=2)
+    passwords = generate_passwords(500, policy, DeterministicSource(2))
+    assert len(passwords) == 500
+    assert all(class_counts(password) == (4, 14, 2) for password in passwords)
+
+
+def test_characters_are_shuffled():
+    passwords = generate_passwords(2000, PasswordPolicy(3, True, True, False), DeterministicSource(3))
+    # Один символ одного класса и два другого: цифра должна встречаться на каждой позиции
+    positions = Counter(i for password in passwords for i, ch in enumerate(password) if ch in string.digits)
+    assert set(positions) == {0, 1, 2}
+
+
+def test_policy_constraints():
+    policy = PasswordPolicy(
+        12, exclude_ambiguous=True, alphabets={"symbols": "!@#"}, min_counts={"numbers": 5},
+        forbidden_first=("symbols", "numbers"), forbidden_last=("symbols",),
+    )
+    for password in generate_passwords(300, policy, DeterministicSource(4)):
+        assert not set(password) & set(AMBIGUOUS_CHARACTERS)
+        assert set(password) - set(string.ascii_letters + string.digits) <= set("!@#")
+        assert class_counts(password)[0] >= 5
+        assert password[0] in string.ascii_letters
+        assert password[-1] not in "!@#"
+
+
+@pytest.mark.parametrize("arguments, kwargs, key", [
+    ((0,), {}, "length"),
+    ((8, False, False, False), {}, "types"),
+    ((4,), {"numbers_count": 3, "letters_count": 3}, "total"),
+    ((4, True, True, False), {"numbers_count": 1, "min_counts": {"numbers": 2}}, "minimum"),
+    ((8,), {"alphabets": {"symbols": "a!"}}, "alphabet"),
+    ((1, True, False, False), {"forbidden_first": ("numbers",)}, "position"),
+])
+def test_invalid_policies_are_rejected(arguments, kwargs, key):
+    with pytest.raises(PasswordGenerationError) as error:
+        PasswordPolicy(*arguments, **kwargs)
+    assert error.value.key == key
+
+
+def test_policy_is_immutable_and_picklable():
+    policy = PasswordPolicy(16, min_counts={"symbols": 2}, forbidden_first=("symbols",))
+    with pytest.raises(AttributeError):
+        policy.length = 8
+    copy = pickle.loads(pickle.dumps(policy))
+    assert copy == policy and hash(copy) == hash(policy)
+    assert copy.counts == policy.counts
+
+
+def test_same_seed_gives_same_passwords():
+    policy = PasswordPolicy(16)
+    assert generate_passwords(10, policy, DeterministicSource(5)) == generate_passwords(10, policy, DeterministicSource(5))
@@ -0,0 +1,86 @@
+import io
+
+import pytest
+
+import vault_io
+from database import Database
+
+ENTRIES = [
+    ("example.com", "alice", "p@ss,word\"1"),
+    ("пример.рф", "боб", "пароль\nс переводом строки"),
+    ("no-login.org", "", "secret"),
+]
+
+
+@pytest.fixture
+def db(db_path):
+    db = Database(db_path)
+    db.save_many(ENTRIES)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def target(tmp_path):
+    db = Database(str(tmp_path / "target.db"))
+    yield db
+    db.close()
+
+
+def entries(db):
+    return [(site, login, password) for _, site, login, password, _ in db.get_all_passwords()]
+
+
+@pytest.mark.parametrize("name", ["vault.csv", "vault.jsonl", "vault.csv.gz", "vault.jsonl.gz"])
+def test_round_trip_by_extension(db, target, tmp_path, name):
+    path = tmp_path / name
+    assert vault_io.export_file(db, path) == len(ENTRIES)
+    assert vault_io.import_file(target, path) == (len(ENTRIES), len(ENTRIES))
+    assert entries(target) == ENTRIES
+
+
+@pytest.mark.parametrize("fmt", ["bitwarden", "keepass"])
+def test_round_trip_password_manager_csv(db, target, tmp_path, fmt):
+    path = tmp_path / f"{fmt}.csv"
+    vault_io.export_file(db, path, fmt)
+    # Формат CSV определяется по заголовку
+    assert vault_io.import_file(target, path, "csv") == (len(ENTRIES), len(ENTRIES))
+    assert entries(target) == ENTRIES
+
+
+def test_import_applies_on_conflict(db, target, tmp_path):
+    path = tmp_path / "vault.jsonl"
+    vault_io.export_file(db, path)
+    vault_io.import_file(target, path, chunk_size=2)
+
+    assert vault_io.import_file(target, path) == (len(ENTRIES), 0)
+    assert vault_io.import_file(target, path, on_conflict="keep_both") == (len(ENTRIES), len(ENTRIES))
+    assert len(entries(target)) == 2 * len(ENTRIES)
+
+
+def test_progress_is_reported_per_chunk(db, target, tmp_path):
+    path = tmp_path / "vault.csv"
+    vault_io.export_file(db, path)
+    calls = []
+    vault_io.import_file(target, path, chunk_size=2, progress=lambda read, saved: calls.append((read, saved)))
+    assert calls == [(2, 2), (3, 3)]
+
+
+@pytest.mark.parametrize("text", [
+    '{"site": "a", "login": "b"}\n',  # Нет пароля
+    '{"site": 1, "login": "b", "password": "c"}\n',  # Сайт не строка
+    'not json\n',
+])
+def test_invalid_jsonl_is_rejected(text):
+    with pytest.raises(vault_io.VaultFormatError):
+        list(vault_io.read_rows(io.StringIO(text), "jsonl"))
+
+
+def test_unknown_csv_header_is_rejected():
+    with pytest.raises(vault_io.VaultFormatError):
+        list(vault_io.read_rows(io.StringIO("a,b,c\n1,2,3\n"), "csv"))
+
+
+def test_jsonl_null_is_empty_string():
+    text = '{"site": "a", "login": null, "password": "c"}\n\n'
+    assert list(vault_io.read_rows(io.StringIO(text), "jsonl")) == [("a", "", "c")]
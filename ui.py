@@ -1,20 +1,39 @@
 from PySide6.QtWidgets import (    
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QCheckBox, QMessageBox, QComboBox, QGroupBox
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QCheckBox, QMessageBox, QComboBox, QGroupBox,
+    QFileDialog, QInputDialog
 )
-from PySide6.QtGui import QIcon
+from PySide6.QtCore import QThreadPool
+from PySide6.QtGui import QIcon, QKeySequence, QShortcut
 from qt_material import apply_stylesheet, list_themes
 from saved_data_window import SavedDataWindow
-from database import Database
-from password_generator import generate_password
+from batch_window import BatchGenerationWindow
+from debug_panel import DebugPanel
+from database import Database, close_connections
+from password_generator import policy_from_inputs, PasswordGenerationError
+from db_worker import DatabaseWorker
+from workers import FutureCallbacks, StreamSecretTask
+from vault_crypto import InvalidMasterPasswordError
+import instrumentation
 import os
 
+# Пароли длиннее этого значения не выводятся в поле, а записываются в файл в фоновом потоке
+MAX_DISPLAY_LENGTH = 10000
+
 class PasswordGeneratorApp(QWidget):
     def __init__(self):
         super().__init__()
         self.dark_theme = True  # По умолчанию включена темная тема
         self.language = "ru"  # По умолчанию язык — русский
         self.translations = self.load_translations()  # Загружаем переводы
-        self.db = Database()  # Инициализируем базу данных
+        # База данных (с журналом для пошаговой отмены) принадлежит отдельному потоку:
+        # интерфейс только ставит запросы в очередь и не ждет диск. Кэш записей отвечает
+        # на чтения этого потока (например, записи, затронутые отменой шага), если база не менялась.
+        self.db_worker = DatabaseWorker(journal=True, cache=True)
+        # Окна просмотра читают записи порциями через отдельный поток с соединением только для чтения:
+        # чтение не ждет записи, и в памяти не держится вся база
+        self.db_reader = DatabaseWorker(readonly=True)
+        self.db = self.db_worker.db  # Только для атрибутов без обращения к базе (db_path, cipher); состояние — через очередь
+        self.callbacks = FutureCallbacks(self)
 
         # Устанавливаем иконку для окна
         scriptDir = os.path.dirname(os.path.realpath(__file__))
@@ -26,6 +45,10 @@ class PasswordGeneratorApp(QWidget):
         # Применяем Material Design тему по умолчанию
         apply_stylesheet(self, theme='dark_purple.xml')  # Применяем темную тему с акцентом на teal
 
+        # Окно замеров производительности (Ctrl+Shift+D), если замеры включены
+        if instrumentation.enabled():
+            QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.show_debug_panel)
+
     def load_translations(self):
         """Загружает переводы для интерфейса."""
         return {
@@ -42,14 +65,24 @@ class PasswordGeneratorApp(QWidget):
                 "symbols_count_label": "Количество символов:",
                 "password_label": "Сгенерированный пароль:",
                 "save_button": "Сохранить данные",
+                "batch_button": "Пакетная генерация",
                 "theme_label": "Выберите тему:",
                 "open_file_button": "Открыть сохраненные данные",
                 "change_language": "Сменить язык на английский",
                 "error_length": "Введите корректную длину пароля (целое число больше 0).",
                 "error_symbols": "Выберите хотя бы один тип символов.",
                 "error_password": "Сначала сгенерируйте пароль.",
-                "error_duplicate": "Пароль для этого сайта уже существует.",
+                "error_duplicate": "Пароль для этого сайта и логина уже существует. Заменить его или сохранить оба?",
+                "overwrite_button": "Заменить",
+                "keep_both_button": "Сохранить оба",
                 "success_save": "Данные успешно сохранены.",
+                "warning_reused": "Этот пароль уже сохранен для другой записи. Все равно сохранить?",
+                "master_password_title": "Мастер-пароль",
+                "master_password_prompt": "Сохраненные пароли зашифрованы. Введите мастер-пароль:",
+                "error_master_password": "Неверный мастер-пароль.",
+                "long_password": "Пароль слишком длинный для отображения. Сгенерировать его в файл?",
+                "long_password_progress": "Запись в файл: {percent}%",
+                "long_password_saved": "Пароль записан в файл {path}.",
                 "back_button": "Назад"
             },
             "en": {
@@ -65,14 +98,24 @@ class PasswordGeneratorApp(QWidget):
                 "symbols_count_label": "Number of symbols:",
                 "password_label": "Generated password:",
                 "save_button": "Save data",
+                "batch_button": "Batch generation",
                 "theme_label": "Select theme:",
                 "open_file_button": "Open saved data",
                 "change_language": "Switch to Russian",
                 "error_length": "Please enter a valid password length (integer greater than 0).",
                 "error_symbols": "Please select at least one type of symbols.",
                 "error_password": "Please generate a password first.",
-                "error_duplicate": "A password for this website already exists.",
+                "error_duplicate": "A password for this website and login already exists. Replace it or keep both?",
+                "overwrite_button": "Replace",
+                "keep_both_button": "Keep both",
                 "success_save": "Data successfully saved.",
+                "warning_reused": "This password is already saved for another entry. Save it anyway?",
+                "master_password_title": "Master Password",
+                "master_password_prompt": "Saved passwords are encrypted. Enter the master password:",
+                "error_master_password": "Invalid master password.",
+                "long_password": "The password is too long to display. Generate it into a file?",
+                "long_password_progress": "Writing to file: {percent}%",
+                "long_password_saved": "The password has been written to {path}.",
                 "back_button": "Back"
             }
         }
@@ -187,6 +230,11 @@ class PasswordGeneratorApp(QWidget):
         self.save_button.clicked.connect(self.save_data)
         buttons_layout.addWidget(self.save_button)
 
+        # Кнопка пакетной генерации
+        self.batch_button = QPushButton(self.translations[self.language]["batch_button"])
+        self.batch_button.clicked.connect(self.show_batch_generation)
+        buttons_layout.addWidget(self.batch_button)
+
         self.buttons_group.setLayout(buttons_layout)
         bottom_layout.addWidget(self.buttons_group)
 
@@ -244,6 +292,7 @@ class PasswordGeneratorApp(QWidget):
         self.symbols_count_label.setText(self.translations[self.language]["symbols_count_label"])
         self.password_label.setText(self.translations[self.language]["password_label"])
         self.save_button.setText(self.translations[self.language]["save_button"])
+        self.batch_button.setText(self.translations[self.language]["batch_button"])
         self.theme_label.setText(self.translations[self.language]["theme_label"])
         self.open_file_button.setText(self.translations[self.language]["open_file_button"])
         self.change_language_button.setText(self.translations[self.language]["change_language"])
@@ -257,20 +306,74 @@ class PasswordGeneratorApp(QWidget):
 
     def generate_password(self):
         """Генерирует пароль с использованием функции из password_generator.py."""
-        password = generate_password(
-            self.length_input,
-            self.numbers_check,
-            self.letters_check,
-            self.symbols_check,
-            self.numbers_count_input,
-            self.letters_count_input,
-            self.symbols_count_input,
-            self.language,
-            self
-        )
+        try:
+            policy = policy_from_inputs(
+                self.length_input,
+                self.numbers_check,
+                self.letters_check,
+                self.symbols_check,
+                self.numbers_count_input,
+                self.letters_count_input,
+                self.symbols_count_input
+            )
+        except PasswordGenerationError as e:
+            QMessageBox.critical(self, "Ошибка" if self.language == "ru" else "Error", e.translate(self.language))
+            return
+
+        # Очень длинный пароль заморозил бы поле вывода: пишем его в файл в фоне
+        if policy.password_length > MAX_DISPLAY_LENGTH:
+            self.generate_to_file(policy)
+            return
+
+        password = policy.generate()
         if password:
             self.password_output.setText(password)
 
+    def generate_to_file(self, policy):
+        """Генерирует длинный пароль в выбранный файл в пуле потоков."""
+        reply = QMessageBox.question(
+            self,
+            "Генератор паролей" if self.language == "ru" else "Password Generator",
+            self.translations[self.language]["long_password"],
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить пароль" if self.language == "ru" else "Save Password", "password.txt")
+        if not path:
+            return
+
+        self.password_output.clear()
+        self.generate_button.setEnabled(False)
+
+        # Храним ссылку на задачу, пока она выполняется
+        self.secret_task = StreamSecretTask(policy, path)
+        self.secret_task.signals.progress.connect(self.show_file_progress)
+        self.secret_task.signals.finished.connect(self.file_generation_finished)
+        self.secret_task.signals.failed.connect(self.file_generation_failed)
+        QThreadPool.globalInstance().start(self.secret_task)
+
+    def show_file_progress(self, percent):
+        self.password_output.setPlaceholderText(self.translations[self.language]["long_password_progress"].format(percent=percent))
+
+    def file_generation_finished(self, path):
+        self.generate_button.setEnabled(True)
+        self.password_output.setPlaceholderText("")
+        self.secret_task = None
+        QMessageBox.information(
+            self,
+            "Успех" if self.language == "ru" else "Success",
+            self.translations[self.language]["long_password_saved"].format(path=path)
+        )
+
+    def file_generation_failed(self, message):
+        self.generate_button.setEnabled(True)
+        self.password_output.setPlaceholderText("")
+        self.secret_task = None
+        QMessageBox.critical(self, "Ошибка" if self.language == "ru" else "Error", message)
+
     def save_data(self):
         site = self.site_input.text().strip()
         login = self.login_input.text().strip()
@@ -280,20 +383,146 @@ class PasswordGeneratorApp(QWidget):
             QMessageBox.warning(self, "Ошибка", self.translations[self.language]["error_password"])
             return
 
-        # Проверка на дубликаты
-        if self.db.password_exists(site):
-            QMessageBox.warning(self, "Ошибка", self.translations[self.language]["error_duplicate"])
-            return
+        self.ensure_unlocked(lambda: self.check_reused(site, login, password))
 
-        # Сохранение пароля в исходном виде
-        self.db.save_password(site, login, password)
+    def check_reused(self, site, login, password):
+        """Проверяет по индексу отпечатков, не сохранен ли уже такой пароль, и затем сохраняет его."""
+        self.callbacks.watch(
+            self.db_worker.submit(Database.password_in_use, password),
+            lambda in_use: self.reuse_checked(in_use, site, login, password),
+            self.show_db_error
+        )
+
+    def reuse_checked(self, in_use, site, login, password):
+        if in_use:
+            reply = QMessageBox.question(
+                self,
+                "Предупреждение" if self.language == "ru" else "Warning",
+                self.translations[self.language]["warning_reused"],
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                QMessageBox.StandardButton.No
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        self.submit_password(site, login, password, "reject")
+
+    def submit_password(self, site, login, password, on_conflict):
+        """
+        Ставит сохранение пароля в очередь потока базы (в зашифрованной базе пароль шифруется);
+        дубликат ищется по индексу пары (site, login) в том же запросе.
+        """
+        self.callbacks.watch(
+            self.db_worker.submit(Database.upsert_password, site, login, password, on_conflict),
+            lambda saved: self.password_saved(saved, site, login, password),
+            self.show_db_error
+        )
 
+    def password_saved(self, saved, site, login, password):
+        if not saved:
+            on_conflict = self.ask_duplicate_action()
+            if on_conflict is not None:
+                self.submit_password(site, login, password, on_conflict)
+            return
         QMessageBox.information(self, "Успех", self.translations[self.language]["success_save"])
 
+    def show_db_error(self, error):
+        QMessageBox.critical(self, "Ошибка" if self.language == "ru" else "Error", str(error))
+
+    def ask_duplicate_action(self):
+        """Спрашивает, что делать с дубликатом: overwrite, keep_both или None (отмена)."""
+        box = QMessageBox(self)
+        box.setIcon(QMessageBox.Icon.Warning)
+        box.setWindowTitle("Ошибка" if self.language == "ru" else "Error")
+        box.setText(self.translations[self.language]["error_duplicate"])
+        overwrite_button = box.addButton(self.translations[self.language]["overwrite_button"], QMessageBox.ButtonRole.AcceptRole)
+        keep_both_button = box.addButton(self.translations[self.language]["keep_both_button"], QMessageBox.ButtonRole.AcceptRole)
+        box.addButton(QMessageBox.StandardButton.Cancel)
+        box.exec()
+        if box.clickedButton() is overwrite_button:
+            return "overwrite"
+        if box.clickedButton() is keep_both_button:
+            return "keep_both"
+        return None
+
+    def ensure_unlocked(self, action):
+        """
+        Выполняет action(). Если база зашифрована и мастер-пароль в этом сеансе еще не вводился,
+        сначала запрашивает его; ключ выводится один раз в потоке базы и хранится в Database.
+        Если ввод отменен, action не выполняется. Состояние базы узнается через очередь ее потока.
+        """
+        self.callbacks.watch(
+            self.db_worker.submit(Database.is_locked),
+            lambda locked: self.ask_master_password(action) if locked else action(),
+            self.show_db_error
+        )
+
+    def ask_master_password(self, action):
+        """Запрашивает мастер-пароль и, если он верный, выполняет action()."""
+        master_password, ok = QInputDialog.getText(
+            self,
+            self.translations[self.language]["master_password_title"],
+            self.translations[self.language]["master_password_prompt"],
+            QLineEdit.EchoMode.Password
+        )
+        if ok:
+            self.callbacks.watch(
+                self.db_worker.submit(Database.unlock, master_password),
+                lambda result: action(),
+                lambda error: self.unlock_failed(error, action)
+            )
+
+    def unlock_failed(self, error, action):
+        if not isinstance(error, InvalidMasterPasswordError):
+            self.show_db_error(error)
+            return
+        QMessageBox.warning(
+            self, "Ошибка" if self.language == "ru" else "Error", self.translations[self.language]["error_master_password"]
+        )
+        self.ensure_unlocked(action)
+
     def show_saved_data(self):
         """Открывает новое окно с сохраненными данными."""
+        self.ensure_unlocked(self.open_saved_data)
+
+    def open_saved_data(self):
         current_theme = self.theme_combobox.currentText()
-        self.saved_data_window = SavedDataWindow(self.db, self.language, self, current_theme)
+        self.saved_data_window = SavedDataWindow(self.db_worker, self.language, self, current_theme, self.db_reader)
         self.saved_data_window.show()
-        
-        
\ No newline at end of file
+
+    def show_batch_generation(self):
+        """Открывает окно пакетной генерации с текущими параметрами пароля."""
+        try:
+            policy = policy_from_inputs(
+                self.length_input,
+                self.numbers_check,
+                self.letters_check,
+                self.symbols_check,
+                self.numbers_count_input,
+                self.letters_count_input,
+                self.symbols_count_input
+            )
+        except PasswordGenerationError as e:
+            QMessageBox.critical(self, "Ошибка" if self.language == "ru" else "Error", e.translate(self.language))
+            return
+
+        self.ensure_unlocked(lambda: self.open_batch_generation(policy))
+
+    def open_batch_generation(self, policy):
+        current_theme = self.theme_combobox.currentText()
+        self.batch_window = BatchGenerationWindow(self.db, policy, self.language, self, current_theme)
+        self.batch_window.show()
+
+    def show_debug_panel(self):
+        self.debug_panel = DebugPanel(self.language, self, self.theme_combobox.currentText())
+        self.debug_panel.show()
+
+    def closeEvent(self, event):
+        """
+        Дожидается записи запросов, уже поставленных в очередь, и закрывает базу данных,
+        а после окончания фоновых задач — их соединения из ConnectionManager.
+        """
+        self.db_worker.close()
+        self.db_reader.close()
+        QThreadPool.globalInstance().waitForDone()
+        close_connections()
+        event.accept()
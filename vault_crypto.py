@@ -0,0 +1,92 @@
+"""
+Шифрование сохраненных паролей мастер-паролем.
+
+Ключ выводится из мастер-пароля функцией scrypt (требует много памяти, поэтому
+перебор паролей дорог) один раз за сеанс и хранится в Database. Каждый пароль
+шифруется отдельно AES-256-GCM со случайным nonce и хранится в базе как BLOB:
+nonce (12 байт) + шифртекст с тегом. Расшифровывается только тот пароль,
+который показывают или копируют.
+
+Шифрование требует пакета cryptography (необязательная зависимость).
+"""
+import hashlib
+import os
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # cryptography — необязательная зависимость
+    AESGCM = None
+    InvalidTag = None
+
+# Параметры scrypt по умолчанию: около 32 МБ памяти и десятков миллисекунд на вывод ключа
+SCRYPT_N = 1 << 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_SIZE = 16
+NONCE_SIZE = 12
+# Открытый текст, по зашифрованной копии которого проверяется мастер-пароль
+VERIFIER = "PasswordGeneratorV2 vault"
+# Размер отпечатка пароля (байт): одинаковые пароли дают одинаковый отпечаток
+FINGERPRINT_SIZE = 16
+
+
+class VaultLockedError(Exception):
+    """База зашифрована, а мастер-пароль еще не введен."""
+
+
+class InvalidMasterPasswordError(Exception):
+    """Неверный мастер-пароль (или поврежденное зашифрованное значение)."""
+
+
+def available():
+    """Возвращает True, если пакет cryptography установлен."""
+    return AESGCM is not None
+
+
+def new_salt():
+    return os.urandom(SALT_SIZE)
+
+
+def fingerprint(key, password):
+    """Ключевой отпечаток BLAKE2b пароля: без ключа по отпечатку нельзя перебрать пароли."""
+    return hashlib.blake2b(password.encode("utf-8"), digest_size=FINGERPRINT_SIZE, key=key).digest()
+
+
+def derive_key(master_password, salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """Выводит 256-битный ключ из мастер-пароля."""
+    return hashlib.scrypt(
+        master_password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32
+    )
+
+
+class Cipher:
+    """Шифрует и расшифровывает отдельные значения ключом, выведенным из мастер-пароля."""
+
+    def __init__(self, key):
+        if AESGCM is None:
+            raise RuntimeError("encryption requires the 'cryptography' package")
+        self.key = key
+        self.aead = AESGCM(key)
+        # Отдельный ключ отпечатков выводится из ключа шифрования и нигде не хранится
+        self.fingerprint_key = hashlib.blake2b(b"fingerprint", digest_size=32, key=key).digest()
+
+    def encrypt(self, text):
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + self.aead.encrypt(nonce, text.encode("utf-8"), None)
+
+    def decrypt(self, blob):
+        try:
+            data = self.aead.decrypt(blob[:NONCE_SIZE], blob[NONCE_SIZE:], None)
+        except InvalidTag:
+            raise InvalidMasterPasswordError("invalid master password") from None
+        return data.decode("utf-8")
+
+    def verifier(self):
+        """Зашифрованная контрольная строка, которая хранится в базе."""
+        return self.encrypt(VERIFIER)
+
+    def check(self, verifier):
+        """Проверяет ключ по контрольной строке из базы."""
+        if self.decrypt(verifier) != VERIFIER:
+            raise InvalidMasterPasswordError("invalid master password")
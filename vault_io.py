@@ -0,0 +1,176 @@
+"""
+Потоковый импорт и экспорт сохраненных записей.
+
+Поддерживаемые форматы:
+    csv       — site,login,password,created_at;
+    jsonl     — по одному объекту {"site", "login", "password", "created_at"} в строке;
+    bitwarden — CSV-экспорт Bitwarden (name, login_uri, login_username, login_password, ...);
+    keepass   — CSV-экспорт KeePass/KeePassXC (Title, Username, Password, URL, ...).
+
+Файлы с расширением .gz читаются и пишутся через gzip. Записи читаются из файла
+и из базы порциями, поэтому память не зависит от размера файла. Импорт сохраняет
+каждую порцию одной транзакцией; записи с уже существующей парой (site, login)
+обрабатываются по правилу on_conflict (см. database.ON_CONFLICT).
+"""
+import csv
+import gzip
+import json
+from itertools import islice
+
+FORMATS = ("csv", "jsonl", "bitwarden", "keepass")
+
+# Сколько записей импортируется одной транзакцией
+IMPORT_CHUNK = 10000
+
+# Заголовки CSV для экспорта в каждом формате
+CSV_HEADERS = {
+    "csv": ["site", "login", "password", "created_at"],
+    "bitwarden": [
+        "folder", "favorite", "type", "name", "notes", "fields", "reprompt",
+        "login_uri", "login_username", "login_password", "login_totp"
+    ],
+    "keepass": ["Group", "Title", "Username", "Password", "URL", "Notes"],
+}
+
+
+class VaultFormatError(ValueError):
+    """Файл не похож на выбранный формат."""
+
+
+def open_file(path, mode):
+    """Открывает текстовый файл для чтения ("r") или записи ("w"), через gzip для .gz."""
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def detect_format(path):
+    """Определяет формат по расширению: .jsonl и .ndjson — jsonl, остальное — csv."""
+    name = str(path).lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return "jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def csv_kind(fieldnames):
+    """Определяет по заголовку, чей это CSV: наш, Bitwarden или KeePass."""
+    fields = set(fieldnames or ())
+    if {"login_username", "login_password"} <= fields:
+        return "bitwarden"
+    if {"Title", "Username", "Password"} <= fields:
+        return "keepass"
+    if {"site", "login", "password"} <= fields:
+        return "csv"
+    raise VaultFormatError(f"unknown CSV header: {', '.join(fieldnames or ())}")
+
+
+def read_rows(file, fmt="csv"):
+    """
+    Перебирает записи (site, login, password) из открытого файла.
+    Для CSV формат (наш, Bitwarden или KeePass) определяется по заголовку;
+    fmt=bitwarden/keepass только проверяет, что заголовок совпадает.
+    """
+    if fmt == "jsonl":
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                row = item.get("site"), item.get("login"), item["password"]
+            except (ValueError, KeyError, AttributeError) as e:
+                raise VaultFormatError(f"line {line_number}: {e}") from None
+            # null считается пустой строкой, как пустая ячейка в CSV; числа и прочее — ошибка формата
+            for name, value in zip(("site", "login", "password"), row):
+                if value is not None and not isinstance(value, str):
+                    raise VaultFormatError(f"line {line_number}: {name} must be a string")
+            yield tuple(value or "" for value in row)
+        return
+
+    reader = csv.DictReader(file)
+    kind = csv_kind(reader.fieldnames)
+    if fmt != "csv" and kind != fmt:
+        raise VaultFormatError(f"expected {fmt} CSV, got {kind}")
+    if kind == "bitwarden":
+        for item in reader:
+            if item.get("type", "login") not in ("", "login"):
+                continue  # Заметки, карты и т.п. не содержат пароля
+            yield item["name"] or item.get("login_uri") or "", item["login_username"] or "", item["login_password"] or ""
+    elif kind == "keepass":
+        for item in reader:
+            yield item["Title"] or item.get("URL") or "", item["Username"] or "", item["Password"] or ""
+    else:
+        for item in reader:
+            yield item["site"] or "", item["login"] or "", item["password"] or ""
+
+
+def write_rows(file, rows, fmt="csv"):
+    """Записывает записи (id, site, login, password, created_at) в открытый файл. Возвращает их количество."""
+    count = 0
+    if fmt == "jsonl":
+        for id, site, login, password, created_at in rows:
+            file.write(json.dumps(
+                {"site": site, "login": login, "password": password, "created_at": created_at}, ensure_ascii=False
+            ) + "\n")
+            count += 1
+        return count
+
+    writer = csv.writer(file)
+    writer.writerow(CSV_HEADERS[fmt])
+    for id, site, login, password, created_at in rows:
+        if fmt == "bitwarden":
+            writer.writerow(["", "", "login", site, "", "", "0", "", login, password, ""])
+        elif fmt == "keepass":
+            writer.writerow(["", site, login, password, "", ""])
+        else:
+            writer.writerow([site, login, password, created_at])
+        count += 1
+    return count
+
+
+def import_file(db, path, fmt=None, on_conflict="reject", chunk_size=IMPORT_CHUNK, progress=None):
+    """
+    Импортирует записи из файла в Database порциями по chunk_size, по транзакции на порцию.
+    progress(read, saved) вызывается после каждой порции. Возвращает (прочитано, сохранено).
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}")
+    read = saved = 0
+    with open_file(path, "r") as file:
+        rows = read_rows(file, fmt)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            read += len(chunk)
+            saved += db.upsert_many(chunk, on_conflict)
+            if progress is not None:
+                progress(read, saved)
+    return read, saved
+
+
+def export_file(db, path, fmt=None, progress=None, progress_every=IMPORT_CHUNK):
+    """
+    Выгружает все записи Database в файл, читая их из базы порциями.
+    progress(written) вызывается через каждые progress_every записей. Возвращает количество записей.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}")
+    # Пароли зашифрованной базы расшифровываются по одному по мере записи
+    rows = (
+        (id, site, login, db.reveal(password), created_at) for id, site, login, password, created_at in db.iter_passwords()
+    )
+    if progress is not None:
+        rows = _report_progress(rows, progress, progress_every)
+    with open_file(path, "w") as file:
+        return write_rows(file, rows, fmt)
+
+
+def _report_progress(rows, progress, every):
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % every == 0:
+            progress(count)
@@ -0,0 +1,174 @@
+import sqlite3
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from database import Database
+from password_generator import generate_passwords, stream_secret
+from search_index import TrigramIndex
+from vault_crypto import VaultLockedError
+
+# Размер порции пакетной генерации. Сортировка порции выполняется одним вызовом
+# без освобождения GIL, поэтому порция должна быть небольшой, чтобы не тормозить интерфейс.
+BATCH_CHUNK = 1024
+# Размер порции (строк) при сохранении пакета в базу данных: подготовка порции (шаблоны
+# и отпечатки) занимает GIL, поэтому с большими порциями интерфейс замирает дольше
+SAVE_CHUNK = 1000
+
+
+class TaskSignals(QObject):
+    """Сигналы фоновой задачи (QRunnable не может объявлять сигналы сам)."""
+    progress = Signal(int)  # Процент выполнения
+    chunk = Signal(list)  # Очередная порция результатов
+    finished = Signal(object)  # Результат задачи
+    failed = Signal(str)  # Текст ошибки
+
+
+class FutureCallbacks(QObject):
+    """
+    Вызывает обработчики результатов DatabaseWorker в потоке интерфейса: Future завершается
+    в потоке базы, а сигнал доставляется через очередь событий потока, где создан объект.
+    """
+    resolved = Signal(object, object)  # (обработчик результата, обработчик ошибки), завершенный Future
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.resolved.connect(self.deliver)
+
+    def watch(self, future, callback=None, error=None):
+        """
+        Когда future завершится, вызовет в потоке интерфейса callback(результат)
+        или error(исключение). Без error исключение выводится как ошибка обработчика сигнала.
+        """
+        future.add_done_callback(lambda future: self.resolved.emit((callback, error), future))
+        return future
+
+    def deliver(self, handlers, future):
+        callback, error = handlers
+        exception = future.exception()
+        if exception is not None:
+            if error is None:
+                raise exception
+            error(exception)
+        elif callback is not None:
+            callback(future.result())
+
+
+class StreamSecretTask(QRunnable):
+    """Записывает длинный секрет в файл в пуле потоков, не блокируя интерфейс."""
+
+    def __init__(self, policy, path):
+        super().__init__()
+        self.policy = policy
+        self.path = path
+        self.signals = TaskSignals()
+        # Объектом задачи владеет Python: пул не должен удалять его после run()
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            with open(self.path, "wb") as out:
+                stream_secret(self.policy, out, progress=self.report_progress)
+        except OSError as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(self.path)
+
+    def report_progress(self, written):
+        self.signals.progress.emit(written * 100 // max(1, self.policy.password_length))
+
+
+class BatchGenerationTask(QRunnable):
+    """Генерирует count паролей по политике порциями; выполнение можно отменить."""
+
+    def __init__(self, policy, count):
+        super().__init__()
+        self.policy = policy
+        self.count = count
+        self.cancelled = False
+        self.signals = TaskSignals()
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        generated = 0
+        while generated < self.count and not self.cancelled:
+            passwords = generate_passwords(min(BATCH_CHUNK, self.count - generated), self.policy)
+            generated += len(passwords)
+            self.signals.chunk.emit(passwords)
+            self.signals.progress.emit(generated * 100 // self.count)
+        self.signals.finished.emit(generated)
+
+
+class SaveBatchTask(QRunnable):
+    """
+    Сохраняет пароли в базу данных в отдельном потоке через соединение этого потока.
+    В шаблонах сайта и логина {n} заменяется на номер пароля, начиная с 1.
+    Результат — (сохранено паролей, сколько из них уже было в базе до сохранения).
+    """
+
+    def __init__(self, db_path, passwords, site_template, login_template, key=None):
+        super().__init__()
+        self.db_path = db_path
+        self.key = key  # Ключ шифрования основного соединения (для зашифрованной базы)
+        self.passwords = passwords
+        self.site_template = site_template
+        self.login_template = login_template
+        self.cancelled = False
+        self.signals = TaskSignals()
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        saved = 0
+        reused = 0
+        try:
+            db = Database.shared(self.db_path)
+            if self.key is not None:
+                db.set_key(self.key)
+            try:
+                total = len(self.passwords)
+                while saved < total and not self.cancelled:
+                    rows = [
+                        (self.site_template.format(n=n), self.login_template.format(n=n), password)
+                        for n, password in enumerate(self.passwords[saved:saved + SAVE_CHUNK], start=saved + 1)
+                    ]
+                    # Повтор проверяется по индексу отпечатков до сохранения порции
+                    reused += len(db.passwords_in_use([password for site, login, password in rows]))
+                    db.save_many(rows)
+                    saved += len(rows)
+                    self.signals.progress.emit(saved * 100 // total)
+            finally:
+                db.close()
+        except (sqlite3.Error, VaultLockedError) as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit((saved, reused))
+
+
+class BuildSearchIndexTask(QRunnable):
+    """
+    Строит индекс триграмм по сайтам и логинам записей, читая их порциями через соединение
+    только для чтения: в памяти остаются только id, сайт и логин, а не вся база с паролями.
+    """
+
+    def __init__(self, db_path):
+        super().__init__()
+        self.db_path = db_path
+        self.signals = TaskSignals()
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            db = Database.shared(self.db_path, readonly=True)
+            try:
+                index = TrigramIndex((id, site, login) for id, site, login, password, created_at in db.iter_passwords())
+            finally:
+                db.close()
+        except sqlite3.Error as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(index)